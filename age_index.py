@@ -0,0 +1,92 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class AgeIndex:
+    """
+    AgeIndex is a sorted index of the ages of the parked drivers, used for range and aggregate queries by age.
+    The Fenwick tree is indexed by the position of the age in keys instead of the age itself, so its size depends
+    on the number of distinct ages and not on the largest age, example- driver_age 99999999999.
+       Usage:
+         keys: sorted distinct ages covered by the tree, rebuilt from the parked ages when a new age comes in,
+               the ages which left stay in keys with a count of 0 till the next rebuild
+         tree: Fenwick tree of the number of parked drivers of each age in keys, range counts take O(log n)
+         counts: dict of age mapped to the number of parked drivers of that age
+         ages: sorted list of the distinct ages of the parked drivers, used to list the ages of a range
+               in O(log n + k) and to get the youngest / oldest driver
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict()
+        self.ages = list()
+        self.keys = list()
+        self.tree = [0]
+        for age, count in (counts or {}).items():
+            if count:
+                self.add(age, count)
+
+    def _rebuild(self):
+        """ Rebuilds the tree over the ages of the parked drivers in O(n) """
+        self.keys = list(self.ages)
+        tree = [0] + [self.counts[age] for age in self.keys]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def _update(self, age, delta):
+        index = bisect_left(self.keys, age) + 1
+        tree = self.tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _prefix_count(self, age):
+        """ Number of parked drivers with age <= given age """
+        index = bisect_right(self.keys, age)
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def add(self, age, count=1):
+        if not self.counts.get(age):
+            insort(self.ages, age)
+        self.counts[age] = self.counts.get(age, 0) + count
+        index = bisect_left(self.keys, age)
+        if index == len(self.keys) or self.keys[index] != age:
+            self._rebuild()
+        else:
+            self._update(age, count)
+
+    def remove(self, age):
+        count = self.counts.get(age)
+        if not count:
+            return
+        if count == 1:
+            del self.counts[age]
+            del self.ages[bisect_left(self.ages, age)]
+        else:
+            self.counts[age] = count - 1
+        self._update(age, -1)
+
+    def count_between(self, min_age, max_age):
+        """
+        :return: Integer: number of parked drivers with min_age <= age <= max_age
+        """
+        if min_age > max_age:
+            return 0
+        return self._prefix_count(max_age) - self._prefix_count(min_age - 1)
+
+    def ages_between(self, min_age, max_age):
+        """
+        :return: List: sorted distinct ages of the parked drivers with min_age <= age <= max_age
+        """
+        return self.ages[bisect_left(self.ages, min_age):bisect_right(self.ages, max_age)]
+
+    def youngest(self):
+        return self.ages[0] if self.ages else None
+
+    def oldest(self):
+        return self.ages[-1] if self.ages else None
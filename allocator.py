@@ -0,0 +1,121 @@
+from array import array
+
+
+class SegmentTreeAllocator:
+    """
+    SegmentTreeAllocator is a free slot allocator backed by a segment tree of free slot counts.
+    It hands out the same slots as the avail_slot + slot_heap allocator of ParkingLot (always the least
+    empty slot) and also answers queries the heap can not, all in O(log n):
+         allocate() - least empty slot
+         allocate_from(start) - first empty slot at or after the given slot, for per level / per zone allocation
+         free_count(start, end) - number of empty slots in a range of slots
+    Its memory is fixed at 2 * next_power_of_two(n) counters, it does not grow under churn like the heap.
+       Usage:
+         size: number of leaves of the tree, the smallest power of two >= number of slots
+         tree: array of free slot counts, tree[1] is the root, the leaf of slot i is tree[size + i]
+    """
+
+    def __init__(self, num_slots, occupied=()):
+        size = 1
+        while size < num_slots:
+            size *= 2
+        self.num_slots = num_slots
+        self.size = size
+        tree = array('i', bytes(4 * 2 * size))
+        tree[size:size + num_slots] = array('i', [1]) * num_slots
+        for slot in occupied:
+            tree[size + slot] = 0
+        for node in range(size - 1, 0, -1):
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+        self.tree = tree
+
+    def _take(self, node):
+        """ Marks the leaf as occupied and returns its slot """
+        slot = node - self.size
+        tree = self.tree
+        while node:
+            tree[node] -= 1
+            node >>= 1
+        return slot
+
+    def _leftmost_free(self, node):
+        """ Descends from a node with free slots to its leftmost free leaf """
+        tree, size = self.tree, self.size
+        while node < size:
+            node <<= 1
+            if not tree[node]:
+                node += 1
+        return node
+
+    def allocate(self):
+        """
+        :return: Integer: least empty slot, None if there are no empty slots
+        """
+        if not self.tree[1]:
+            return None
+        return self._take(self._leftmost_free(1))
+
+    def allocate_from(self, start):
+        """
+        :param start: Integer: slot index from which the search starts
+        :return: Integer: first empty slot at or after start, None if there is no such slot
+        """
+        if start < 0 or start >= self.num_slots:
+            return None
+        tree = self.tree
+        node = self.size + start
+        if not tree[node]:
+            while node > 1:
+                if not node & 1 and tree[node + 1]:
+                    node += 1
+                    break
+                node >>= 1
+            else:
+                return None
+            node = self._leftmost_free(node)
+        return self._take(node)
+
+    def allocate_many(self, count):
+        """
+        :return: List: up to count least empty slots in increasing order
+        """
+        slots = []
+        while len(slots) < count and self.tree[1]:
+            slots.append(self._take(self._leftmost_free(1)))
+        return slots
+
+    def release(self, slot):
+        if slot < 0:
+            slot += self.num_slots
+        node = self.size + slot
+        tree = self.tree
+        if tree[node]:
+            return
+        while node:
+            tree[node] += 1
+            node >>= 1
+
+    def release_many(self, slots):
+        for slot in slots:
+            self.release(slot)
+
+    def free_count(self, start=0, end=None):
+        """
+        :param start: Integer: first slot index of the range
+        :param end: Integer: slot index after the last slot of the range, by default the number of slots
+        :return: Integer: number of empty slots in the range
+        """
+        end = self.num_slots if end is None else min(end, self.num_slots)
+        tree = self.tree
+        low, high = self.size + max(start, 0), self.size + end
+        total = 0
+        while low < high:
+            if low & 1:
+                total += tree[low]
+                low += 1
+            if high & 1:
+                high -= 1
+                total += tree[high]
+            low >>= 1
+            high >>= 1
+        return total
@@ -0,0 +1,65 @@
+"""
+Benchmark: heap allocator (avail_slot + slot_heap) vs the segment tree allocator of ParkingLot.
+
+A full lot is churned with random Leave / Park pairs, then the time per Park / Leave pair and the memory of
+the allocator are reported. The range queries of the segment tree (per level allocation and free counts)
+are timed against a linear scan of the slots.
+
+Usage:
+    python3 benchmarks/bench_allocator.py [num_slots] [num_ops]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import ParkingLot  # noqa: E402
+
+
+def churned_lot(allocator, num_slots, num_ops):
+    plot = ParkingLot(allocator=allocator)
+    plot.emit = lambda line: None
+    plot.create_parkinglot(["Create_parking_lot", str(num_slots)])
+    for slot in plot.get_emptyslots(num_slots):
+        plot.occupy_slot(slot, f"KA-01-HH-{slot % 10000:04d}", 30)
+    rng = random.Random(1)
+    leaves = [rng.randrange(num_slots) for _ in range(num_ops)]
+    start = time.perf_counter()
+    for slot in leaves:
+        if plot.slots[slot]:
+            plot.vacate_slot(slot)
+        if rng.random() < 0.5:
+            slot = plot.get_emptyslot()
+            if slot is not None:
+                plot.occupy_slot(slot, f"KA-01-HH-{slot % 10000:04d}", 30)
+    return plot, (time.perf_counter() - start) / num_ops
+
+
+def allocator_bytes(plot):
+    if plot.allocator is not None:
+        return sys.getsizeof(plot.allocator.tree)
+    return sys.getsizeof(plot.slot_heap) + sum(sys.getsizeof(slot) for slot in plot.slot_heap)
+
+
+if __name__ == '__main__':
+    num_slots = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    plots = {}
+    for allocator in ("heap", "segment_tree"):
+        plot, per_op = churned_lot(allocator, num_slots, num_ops)
+        plots[allocator] = plot
+        print(f"{allocator:>12}: {per_op * 1e6:>8.3f} us per Leave / Park  allocator memory "
+              f"{allocator_bytes(plot) / 2 ** 20:>8.2f} MiB  free slots {plot.get_free_slot_count()}")
+    plot = plots["segment_tree"]
+    level_size = num_slots // 10
+    start = time.perf_counter()
+    counts = [plot.get_free_slot_count(level * level_size, (level + 1) * level_size) for level in range(10)]
+    tree_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scan_counts = [sum(1 for vehicle_data in plot.slots[level * level_size:(level + 1) * level_size]
+                       if not vehicle_data) for level in range(10)]
+    scan_time = time.perf_counter() - start
+    assert counts == scan_counts
+    print(f"free count of 10 levels: segment tree {tree_time * 1e6:.1f} us  linear scan {scan_time * 1e6:.1f} us")
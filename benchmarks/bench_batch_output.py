@@ -0,0 +1,62 @@
+"""
+Benchmark: throughput in lines per second of CommandProcessor.execute_commands() (one print() per command)
+against execute_commands_batch() (output written in large chunks), both writing to a file.
+The output of both modes is compared to check it is byte identical.
+
+Usage:
+    python3 benchmarks/bench_batch_output.py [num_commands]
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import CommandProcessor, FileUtility, ParkingLot, ParkingProcessor  # noqa: E402
+
+NUM_OF_SLOTS = 1000
+
+
+def write_commands(path, num_commands):
+    with open(path, 'w') as commands_file:
+        commands_file.write(f"Create_parking_lot {NUM_OF_SLOTS}\n")
+        for index in range(num_commands - 1):
+            kind = index % 5
+            if kind in (0, 1):
+                commands_file.write(f"Park KA-{index // 10000 % 100:02d}-HH-{index % 10000:04d} driver_age {18 + index % 60}\n")
+            elif kind == 2:
+                commands_file.write(f"Leave {1 + index * 7 % NUM_OF_SLOTS}\n")
+            elif kind == 3:
+                commands_file.write(f"Slot_numbers_for_driver_of_age {18 + index % 60}\n")
+            else:
+                commands_file.write(f"Slot_number_for_car_with_number KA-00-HH-{index % 10000:04d}\n")
+
+
+def run(commands_path, output_path, batch):
+    file_obj = FileUtility()
+    file_obj.load_file(commands_path)
+    cmd_proc_obj = CommandProcessor(file_obj, ParkingProcessor(ParkingLot()))
+    start = time.perf_counter()
+    if batch:
+        with open(output_path, 'wb') as output:
+            cmd_proc_obj.execute_commands_batch(output)
+    else:
+        with open(output_path, 'w') as output, redirect_stdout(output):
+            cmd_proc_obj.execute_commands()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    num_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        commands_path = os.path.join(tmp_dir, "commands.txt")
+        write_commands(commands_path, num_commands)
+        outputs = {}
+        for mode in ("print", "batch"):
+            outputs[mode] = os.path.join(tmp_dir, f"{mode}.out")
+            elapsed = run(commands_path, outputs[mode], mode == "batch")
+            print(f"{mode:>6}: {num_commands / elapsed:>12,.0f} lines/sec")
+        with open(outputs["print"], 'rb') as printed, open(outputs["batch"], 'rb') as batched:
+            print("outputs identical:", printed.read() == batched.read())
@@ -0,0 +1,48 @@
+"""
+Benchmark: Billing_report over a month long history of parking sessions.
+
+num_sessions sessions of a 1000 slot lot over 30 days are appended to a SessionStore, then the report is
+computed with the pure Python pass and, when NumPy is installed, with the vectorized pass.
+
+Usage:
+    python3 benchmarks/bench_billing.py [num_sessions]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionStore, import_numpy  # noqa: E402
+
+MONTH = 30 * 24 * 3600
+
+
+def month_of_sessions(num_sessions, num_slots=1000):
+    sessions = SessionStore()
+    rng = random.Random(1)
+    for _ in range(num_sessions):
+        slot = rng.randrange(num_slots)
+        park_time = rng.randrange(MONTH)
+        sessions.open(slot, rng.randint(18, 80), park_time)
+        sessions.close(slot, park_time + int(rng.expovariate(1 / 7200)))
+    return sessions
+
+
+if __name__ == '__main__':
+    num_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    start = time.perf_counter()
+    sessions = month_of_sessions(num_sessions)
+    print(f"{num_sessions} sessions generated in {time.perf_counter() - start:.2f}s")
+    passes = [("pure python", sessions._report_python)]
+    np = import_numpy()
+    if np is not None:
+        passes.append(("numpy", lambda start, end: sessions._report_numpy(np, start, end)))
+    else:
+        print("NumPy is not installed, only the pure Python pass is timed")
+    for name, report in passes:
+        start = time.perf_counter()
+        total, count, per_slot, per_age, percentiles = report(None, None)
+        print(f"{name:>12}: report in {time.perf_counter() - start:.3f}s  revenue {total} from {count} sessions  "
+              f"dwell {percentiles}")
@@ -0,0 +1,63 @@
+"""
+Benchmark: Park_many / Leave_many against one Park / Leave command per car.
+
+A bus convoy of k cars arrives at a lot with churned free slots in the heap and later leaves at once,
+the convoy is executed with sequential commands and with the bulk commands.
+
+Usage:
+    python3 benchmarks/bench_bulk.py [num_slots]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+
+
+def churned_lot(num_slots):
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    cmd_proc_obj.set_emit(lambda line: None)
+    cmd_proc_obj.process_command(["Create_parking_lot", str(num_slots)])
+    cmd_proc_obj.process_command(["Park_many"] + [tok for index in range(num_slots // 2) for tok in
+                                                  (f"KA-01-HH-{index % 10000:04d}", "driver_age", "30")])
+    rng = random.Random(1)
+    cmd_proc_obj.process_command(["Leave_many"] + [str(rng.randint(1, num_slots // 2)) for _ in range(num_slots // 8)])
+    return cmd_proc_obj
+
+
+def bench(num_slots, convoy_size, bulk):
+    cmd_proc_obj = churned_lot(num_slots)
+    cars = [(f"TN-{index // 10000 % 100:02d}-BS-{index % 10000:04d}", "driver_age", str(20 + index % 50))
+            for index in range(convoy_size)]
+    if bulk:
+        park_commands = [["Park_many"] + [tok for car in cars for tok in car]]
+    else:
+        park_commands = [["Park", *car] for car in cars]
+    start = time.perf_counter()
+    for command_toks in park_commands:
+        cmd_proc_obj.process_command(command_toks)
+    park_time = time.perf_counter() - start
+    reg_slot_dict = cmd_proc_obj.process_parking_obj.parkinglot_obj.reg_slot_dict
+    slots = [str(reg_slot_dict[car[0]] + 1) for car in cars if car[0] in reg_slot_dict]
+    if bulk:
+        leave_commands = [["Leave_many"] + slots]
+    else:
+        leave_commands = [["Leave", slot] for slot in slots]
+    start = time.perf_counter()
+    for command_toks in leave_commands:
+        cmd_proc_obj.process_command(command_toks)
+    return park_time, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    num_slots = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{'convoy':>8} {'park seq (ms)':>14} {'park_many (ms)':>15} {'leave seq (ms)':>15} {'leave_many (ms)':>16}")
+    for convoy_size in (10, 100, 1000, 10000):
+        park_seq, leave_seq = bench(num_slots, convoy_size, bulk=False)
+        park_bulk, leave_bulk = bench(num_slots, convoy_size, bulk=True)
+        print(f"{convoy_size:>8} {park_seq * 1000:>14.3f} {park_bulk * 1000:>15.3f} "
+              f"{leave_seq * 1000:>15.3f} {leave_bulk * 1000:>16.3f}   "
+              f"speedup park x{park_seq / park_bulk:.2f} leave x{leave_seq / leave_bulk:.2f}")
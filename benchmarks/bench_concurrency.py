@@ -0,0 +1,102 @@
+"""
+Benchmark: read throughput of ConcurrentParkingLot under a mixed load, reader-writer lock vs a single mutex.
+
+Query kiosk threads run age and registration queries in a loop while gate threads park and leave cars,
+for a few seconds each. The reads/sec, writes/sec and p99 read latency are reported with the reader-writer
+lock of the facade and with one mutex for every command (the baseline without concurrent readers).
+With the GIL the readers still take turns on the interpreter, so the read lock does not add read throughput
+over the mutex here, it keeps the queries from queueing behind each other and lets the waiting gates in ahead
+of new queries. On a free threaded build of Python the readers run in parallel.
+
+Usage:
+    python3 benchmarks/bench_concurrency.py [num_kiosks] [num_gates] [seconds]
+"""
+import gc
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrency import ConcurrentParkingLot  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+
+NUM_SLOTS = 100000
+
+
+class MutexLock:
+    """ A single mutex in place of the ReadWriteLock, readers exclude each other too """
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.acquire_read = self.acquire_write = self.mutex.acquire
+        self.release_read = self.release_write = self.mutex.release
+
+
+def filled_facade():
+    facade = ConcurrentParkingLot(CommandProcessor(None, ParkingProcessor(ParkingLot())))
+    facade.execute(["Create_parking_lot", str(NUM_SLOTS)])
+    rng = random.Random(1)
+    for index in range(NUM_SLOTS // 2):
+        facade.execute(["Park", f"KA-{index % 100:02d}-HH-{index // 100:04d}", "driver_age", str(rng.randint(18, 80))])
+    return facade
+
+
+def run(facade, num_kiosks, num_gates, seconds):
+    done = threading.Event()
+    latencies = [[] for _ in range(num_kiosks)]
+    writes = [0] * num_gates
+
+    def kiosk(kiosk_num):
+        rng = random.Random(kiosk_num)
+        kiosk_latencies = latencies[kiosk_num]
+        while not done.is_set():
+            if rng.random() < 0.5:
+                command_toks = ["Slot_number_for_car_with_number", f"KA-{rng.randrange(100):02d}-HH-{rng.randrange(500):04d}"]
+            else:
+                command_toks = ["Count_of_drivers_of_age_between", str(rng.randint(18, 50)), str(rng.randint(50, 80))]
+            start = time.perf_counter()
+            facade.execute(command_toks)
+            kiosk_latencies.append(time.perf_counter() - start)
+
+    def gate(gate_num):
+        rng = random.Random(1000 + gate_num)
+        index = 0
+        while not done.is_set():
+            if rng.random() < 0.5:
+                facade.execute(["Park", f"G{chr(65 + gate_num)}-01-HH-{index % 10000:04d}", "driver_age", "30"])
+                index += 1
+            else:
+                facade.execute(["Leave", str(rng.randint(1, NUM_SLOTS))])
+            writes[gate_num] += 1
+            time.sleep(0.0005)
+
+    threads = [threading.Thread(target=kiosk, args=(num,)) for num in range(num_kiosks)]
+    threads += [threading.Thread(target=gate, args=(num,)) for num in range(num_gates)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    done.set()
+    for thread in threads:
+        thread.join()
+    all_latencies = sorted(latency for kiosk_latencies in latencies for latency in kiosk_latencies)
+    p99 = all_latencies[int(len(all_latencies) * 0.99)] if all_latencies else 0.0
+    return len(all_latencies) / seconds, sum(writes) / seconds, p99
+
+
+if __name__ == '__main__':
+    num_kiosks = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    num_gates = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 3
+    for name in ("mutex", "rw_lock"):
+        facade = filled_facade()
+        if name == "mutex":
+            facade.lock = MutexLock()
+        gc.collect()
+        gc.freeze()
+        reads, writes, p99 = run(facade, num_kiosks, num_gates, seconds)
+        del facade
+        gc.unfreeze()
+        print(f"{name:>8}: {reads:>10.0f} reads/sec  {writes:>8.0f} writes/sec  p99 read latency {p99 * 1e6:>8.1f} us")
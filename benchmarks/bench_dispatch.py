@@ -0,0 +1,112 @@
+"""
+Benchmark: per-command parse and dispatch overhead of CommandProcessor.process_command.
+
+Compares the precompiled patterns and the dispatch table of CommandProcessor with the previous path: every
+argument parsed with re.match on the raw pattern string and the commands routed by an if/elif chain of string
+comparisons. The chain is generated from the command names of the dispatch table, in the same order.
+Both paths run the real handlers on the same parking lot with a no-op emit, so the difference is the parsing
+and the routing. The commands run in a cycle which parks a car in the one free slot and takes it out again,
+the parking lot is in the same state at the start of every cycle.
+
+Usage:
+    python3 benchmarks/bench_dispatch.py [repeat]
+"""
+import os
+import re
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import virtual_parking  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+
+NUM_SLOTS = 6
+# the lot is full except for the last slot, Park takes it and Leave frees it again
+CYCLE = [
+    "Park KA-01-HH-1234 driver_age 21".split(),
+    "Slot_numbers_for_driver_of_age 21".split(),
+    "Slot_number_for_car_with_number KA-01-HH-1234".split(),
+    "Vehicle_registration_number_for_driver_of_age 21".split(),
+    "Oldest_driver_age".split(),
+    f"Leave {NUM_SLOTS}".split(),
+]
+
+
+class RawPattern:
+    """ Pattern parsed as before the precompiled patterns, every match looks the pattern string up in the re cache """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def match(self, string):
+        return re.match(self.pattern, string)
+
+    def fullmatch(self, string):
+        return re.fullmatch(self.pattern, string)
+
+
+def legacy_process_command(command_names):
+    """
+    :param command_names: names of the commands in the order of the if/elif chain
+    :return: function: process_command() routing the commands with an if/elif chain of the command names
+    """
+    source = ["def process_command(self, command_toks):",
+              "    if not command_toks or not len(command_toks) > 0:",
+              "        self.emit('Cannot process the command. Invalid Command Format')",
+              "        return"]
+    for index, name in enumerate(command_names):
+        source.append(f"    {'elif' if index else 'if'} command_toks[0] == {name!r}:")
+        source.append(f"        self.commands[{name!r}](command_toks)")
+    source += ["    else:", "        self.emit('Command Not matched with valid commands set')"]
+    namespace = {}
+    exec("\n".join(source), namespace)
+    return namespace["process_command"]
+
+
+def filled_processor():
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    cmd_proc_obj.set_emit(lambda line: None)
+    cmd_proc_obj.process_command(["Create_parking_lot", str(NUM_SLOTS)])
+    for index in range(NUM_SLOTS - 1):
+        cmd_proc_obj.process_command(["Park", f"KA-02-HH-{index:04d}", "driver_age", str(20 + index)])
+    return cmd_proc_obj
+
+
+def bench(cmd_proc_obj, repeat):
+    """
+    :return: List: mean nanoseconds of process_command() for every command of CYCLE
+    """
+    totals = [0] * len(CYCLE)
+    process_command = cmd_proc_obj.process_command
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        for index, command_toks in enumerate(CYCLE):
+            start = clock()
+            process_command(command_toks)
+            totals[index] += clock() - start
+    return [total / repeat for total in totals]
+
+
+def bench_legacy(repeat):
+    """ Runs bench() with the raw re parsing of the handlers and the if/elif routing """
+    compiled_patterns = virtual_parking.NUMBER_PATTERN, virtual_parking.REG_NUM_PATTERN
+    virtual_parking.NUMBER_PATTERN, virtual_parking.REG_NUM_PATTERN = (RawPattern(pattern.pattern)
+                                                                         for pattern in compiled_patterns)
+    try:
+        cmd_proc_obj = filled_processor()
+        cmd_proc_obj.process_command = types.MethodType(legacy_process_command(list(cmd_proc_obj.commands)),
+                                                        cmd_proc_obj)
+        return bench(cmd_proc_obj, repeat)
+    finally:
+        virtual_parking.NUMBER_PATTERN, virtual_parking.REG_NUM_PATTERN = compiled_patterns
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    legacy = bench_legacy(repeat)
+    table = bench(filled_processor(), repeat)
+    print(f"{'command':<48} {'re + if/elif (ns)':>18} {'table (ns)':>12}")
+    for command_toks, legacy_ns, table_ns in zip(CYCLE, legacy, table):
+        print(f"{command_toks[0]:<48} {legacy_ns:>18.0f} {table_ns:>12.0f}")
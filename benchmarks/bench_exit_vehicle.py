@@ -0,0 +1,52 @@
+"""
+Benchmark: latency of the "Leave" command as the parking lot grows.
+
+Every car in the lot is parked with the same driver age, which is the worst case for the
+age_slot_dict bucket. The Leave latency should stay flat from 10^3 up to 10^6 slots.
+
+Usage:
+    python3 benchmarks/bench_exit_vehicle.py [max_slots]
+"""
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import ParkingLot, ParkingProcessor  # noqa: E402
+
+LEAVES_PER_RUN = 10000
+
+
+def reg_num_for(index):
+    return f"KA-{index // 260000 % 100:02d}-{chr(65 + index // 10000 % 26)}{chr(65 + index // 260000 % 26)}-{index % 10000:04d}"
+
+
+def bench(num_slots):
+    plot = ParkingLot()
+    processor = ParkingProcessor(plot)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        plot.create_parkinglot(["Create_parking_lot", str(num_slots)])
+        for index in range(num_slots):
+            processor.park_vehicle(["Park", reg_num_for(index), "driver_age", "30"])
+        rng = random.Random(num_slots)
+        leaves = [["Leave", str(rng.randint(1, num_slots))] for _ in range(LEAVES_PER_RUN)]
+        parks = [["Park", reg_num_for(num_slots + index), "driver_age", "30"] for index in range(LEAVES_PER_RUN)]
+        elapsed = 0
+        for leave, park in zip(leaves, parks):
+            start = time.perf_counter_ns()
+            processor.exit_vehicle(leave)
+            elapsed += time.perf_counter_ns() - start
+            processor.park_vehicle(park)
+    return elapsed / LEAVES_PER_RUN / 1000
+
+
+if __name__ == '__main__':
+    max_slots = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    num_slots = 1000
+    print(f"{'slots':>10} {'leave (us)':>12}")
+    while num_slots <= max_slots:
+        print(f"{num_slots:>10} {bench(num_slots):>12.2f}")
+        num_slots *= 10
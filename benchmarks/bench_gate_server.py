@@ -0,0 +1,111 @@
+"""
+Load generator for the gate server.
+
+Opens many concurrent gate connections, each pipelining Park / Leave / query commands, and reports
+the p50 / p99 latency of the responses and the requests per second. A gate server is started on a Unix
+socket in a subprocess, unless the address of a running server is given.
+
+Usage:
+    python3 benchmarks/bench_gate_server.py [--connections=50] [--requests=2000] [--depth=8]
+                                            [--slots=100000] [--port=8765 [--host=127.0.0.1] | --unix=path]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from gate_server import END_OF_RESPONSE  # noqa: E402
+
+END_LINE = (END_OF_RESPONSE + "\n").encode()
+
+
+async def open_gate(options):
+    if options.get("unix"):
+        return await asyncio.open_unix_connection(options["unix"])
+    return await asyncio.open_connection(options.get("host", "127.0.0.1"), int(options["port"]))
+
+
+async def read_response(reader):
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line or line == END_LINE:
+            return lines
+        lines.append(line)
+
+
+def gate_command(gate, index, num_slots):
+    kind = index % 4
+    if kind == 0:
+        return f"Park KA-{gate % 100:02d}-{chr(65 + gate // 100 % 26)}H-{index % 10000:04d} driver_age {18 + index % 60}\n"
+    elif kind == 1:
+        return f"Slot_numbers_for_driver_of_age {18 + index % 60}\n"
+    elif kind == 2:
+        return f"Leave {1 + (gate * 7919 + index) % num_slots}\n"
+    return f"Slot_number_for_car_with_number KA-{gate % 100:02d}-AH-{index % 10000:04d}\n"
+
+
+async def run_gate(gate, options, latencies):
+    reader, writer = await open_gate(options)
+    num_requests, depth, num_slots = int(options["requests"]), int(options["depth"]), int(options["slots"])
+    window = asyncio.Semaphore(depth)
+    sent_at = deque()
+
+    async def receive():
+        for _ in range(num_requests):
+            await read_response(reader)
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            window.release()
+
+    receiver = asyncio.ensure_future(receive())
+    for index in range(num_requests):
+        await window.acquire()
+        sent_at.append(time.perf_counter())
+        writer.write(gate_command(gate, index, num_slots).encode())
+    await receiver
+    writer.close()
+
+
+async def load(options):
+    reader, writer = await open_gate(options)
+    writer.write(f"Create_parking_lot {options['slots']}\n".encode())
+    print((b"".join(await read_response(reader))).decode(), end="")
+    writer.close()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_gate(gate, options, latencies) for gate in range(int(options["connections"]))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"connections {options['connections']}, pipeline depth {options['depth']}, requests {len(latencies)}")
+    print(f"requests/sec {len(latencies) / elapsed:,.0f}")
+    print(f"p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms")
+
+
+def main(options):
+    options.setdefault("connections", "50")
+    options.setdefault("requests", "2000")
+    options.setdefault("depth", "8")
+    options.setdefault("slots", "100000")
+    if options.get("port") or options.get("unix"):
+        asyncio.run(load(options))
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        options["unix"] = os.path.join(tmp_dir, "gate.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "gate_server.py"), f"--unix={options['unix']}"],
+                                  stdout=subprocess.PIPE)
+        try:
+            server.stdout.readline()
+            asyncio.run(load(options))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main(dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--")))
@@ -0,0 +1,57 @@
+"""
+Benchmark: streaming of command files by FileUtility.iter_commands().
+
+Reports commands/sec and the peak memory allocated while streaming plain and gzip compressed
+files of growing size. The peak memory should stay constant whatever the file size.
+
+Usage:
+    python3 benchmarks/bench_ingestion.py [max_commands]
+"""
+import gzip
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import FileUtility  # noqa: E402
+
+
+def write_commands(path, num_commands):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'wt') as commands_file:
+        commands_file.write("Create_parking_lot 1000\n")
+        for index in range(num_commands - 1):
+            commands_file.write(f"Park KA-{index // 10000 % 100:02d}-HH-{index % 10000:04d} driver_age {18 + index % 60}\n"
+                                if index % 2 else f"Leave {1 + index % 1000}\n")
+
+
+def bench(path):
+    file_obj = FileUtility()
+    file_obj.load_file(path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    num_commands = 0
+    for _ in file_obj.iter_commands():
+        num_commands += 1
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    file_obj.file.close()
+    return num_commands / elapsed, peak
+
+
+if __name__ == '__main__':
+    max_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    print(f"{'commands':>10} {'format':>7} {'commands/sec':>14} {'peak memory (KiB)':>18}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        num_commands = 10 ** 4
+        while num_commands <= max_commands:
+            for extension in (".txt", ".txt.gz"):
+                path = os.path.join(tmp_dir, f"commands{extension}")
+                write_commands(path, num_commands)
+                rate, peak = bench(path)
+                print(f"{num_commands:>10} {extension[1:]:>7} {rate:>14,.0f} {peak / 1024:>18,.0f}")
+            num_commands *= 10
@@ -0,0 +1,43 @@
+"""
+Benchmark: overhead of the instrumentation layer on CommandProcessor.process_command.
+
+Runs a generated churn workload with instrumentation never attached, attached then detached (disabled),
+and attached (enabled), and reports the time per command of each mode.
+
+Usage:
+    python3 benchmarks/bench_instrumentation.py [num_commands] [repeat]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import Instrumentation  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import generate_commands  # noqa: E402
+
+
+def run(commands, mode):
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    cmd_proc_obj.set_emit(lambda line: None)
+    if mode != "never attached":
+        instrumentation = Instrumentation()
+        instrumentation.attach(cmd_proc_obj)
+        if mode == "disabled":
+            instrumentation.detach()
+    start = time.perf_counter_ns()
+    for command_toks in commands:
+        cmd_proc_obj.process_command(command_toks)
+    return (time.perf_counter_ns() - start) / len(commands)
+
+
+if __name__ == '__main__':
+    num_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    commands = [line.split() for line in generate_commands("churn", num_commands, num_slots=1000)]
+    baseline = None
+    for mode in ("never attached", "disabled", "enabled"):
+        best = min(run(commands, mode) for _ in range(repeat))
+        baseline = baseline or best
+        print(f"{mode:>15}: {best:>8.0f} ns/command  overhead {best / baseline - 1:>+7.1%}")
@@ -0,0 +1,92 @@
+"""
+Benchmark: lookup throughput and memory of the "packed" registration numbers vs the "list" and "compact" storage.
+
+For each storage a fresh process parks num_cars cars, then times registration lookups (the
+Slot_number_for_car_with_number command and get_slot_by_reg) and reports the max RSS of the process.
+
+Usage:
+    python3 benchmarks/bench_packed_registration.py [num_cars] [num_lookups]
+"""
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import STATES  # noqa: E402
+
+# seconds the benchmark of one storage may run before it is reported as hung
+RUN_TIMEOUT = 3600
+
+
+def max_rss_mib():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (max_rss / 1024 if sys.platform == "darwin" else max_rss) / 1024
+
+
+def run(storage, num_cars, num_lookups, results):
+    rng = random.Random(1)
+    reg_nums = list({f"{rng.choice(STATES)}-{rng.randint(1, 99):02d}-{chr(rng.randint(65, 90))}"
+                     f"{chr(rng.randint(65, 90))}-{rng.randint(0, 9999):04d}": None for _ in range(num_cars)})
+    base_rss = max_rss_mib()
+    plot = ParkingLot(storage=storage)
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+    cmd_proc_obj.set_emit(lambda line: None)
+    cmd_proc_obj.process_command(["Create_parking_lot", str(len(reg_nums))])
+    start = time.perf_counter()
+    for reg_num in reg_nums:
+        # the tokens are split from a new line like the input file, so the lot does not share the strings of reg_nums
+        cmd_proc_obj.process_command(f"Park {reg_num} driver_age 30".split())
+    park_rate = len(reg_nums) / (time.perf_counter() - start)
+    lookups = [f" {reg_nums[rng.randrange(len(reg_nums))]}".split()[0] for _ in range(num_lookups)]
+    start = time.perf_counter()
+    for reg_num in lookups:
+        cmd_proc_obj.process_command(["Slot_number_for_car_with_number", reg_num])
+    command_rate = num_lookups / (time.perf_counter() - start)
+    get_slot_by_reg = plot.get_slot_by_reg
+    start = time.perf_counter()
+    for reg_num in lookups:
+        get_slot_by_reg(reg_num)
+    lookup_rate = num_lookups / (time.perf_counter() - start)
+    results.put((park_rate, command_rate, lookup_rate, max_rss_mib() - base_rss))
+
+
+def storage_result(process, results):
+    """
+    Waits for the result of the benchmark process, a process killed by the OOM killer or a crash
+    never puts its result on the queue
+    :return: the result put on the queue by the process, RuntimeError if it exited or hung without one
+    """
+    deadline = time.monotonic() + RUN_TIMEOUT
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if process.exitcode is not None:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    raise RuntimeError(f"benchmark process exited with code {process.exitcode} without a result")
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"benchmark process did not finish in {RUN_TIMEOUT} seconds")
+
+
+if __name__ == '__main__':
+    num_cars = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    print(f"{'storage':>8} {'Park/sec':>10} {'lookup cmd/sec':>15} {'get_slot_by_reg/sec':>20} {'lot RSS (MiB)':>14}")
+    for storage in ("list", "compact", "packed"):
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run, args=(storage, num_cars, num_lookups, results))
+        process.start()
+        park_rate, command_rate, lookup_rate, rss = storage_result(process, results)
+        process.join()
+        if process.exitcode:
+            raise RuntimeError(f"benchmark process exited with code {process.exitcode}")
+        print(f"{storage:>8} {park_rate:>10,.0f} {command_rate:>15,.0f} {lookup_rate:>20,.0f} {rss:>14.1f}")
@@ -0,0 +1,52 @@
+"""
+Benchmark: age queries with and without the query cache of ParkingLot.
+
+Runs the generated query_heavy workload (kiosks querying a busy lot) with the cache disabled and enabled,
+and reports the time per age query, the overall commands/sec and the hit rate of the cache.
+
+Usage:
+    python3 benchmarks/bench_query_cache.py [num_commands] [num_slots]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import AGE_QUERIES  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import generate_commands  # noqa: E402
+
+
+def run(commands, max_entries):
+    plot = ParkingLot()
+    if max_entries:
+        plot.enable_query_cache(max_entries)
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+    cmd_proc_obj.set_emit(lambda line: None)
+    process_command = cmd_proc_obj.process_command
+    clock = time.perf_counter_ns
+    query_time = num_queries = 0
+    start = clock()
+    for command_toks in commands:
+        if command_toks[0] in AGE_QUERIES:
+            query_start = clock()
+            process_command(command_toks)
+            query_time += clock() - query_start
+            num_queries += 1
+        else:
+            process_command(command_toks)
+    total = clock() - start
+    return total, query_time / max(num_queries, 1), plot.query_cache
+
+
+if __name__ == '__main__':
+    num_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    num_slots = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    commands = [line.split() for line in generate_commands("query_heavy", num_commands, num_slots=num_slots)]
+    for max_entries in (0, 256, 4096):
+        total, per_query, query_cache = run(commands, max_entries)
+        label = f"cache {max_entries}" if max_entries else "no cache"
+        stats = f"  hit rate {query_cache.stats()['hit_rate']:.1%}" if query_cache else ""
+        print(f"{label:>10}: {len(commands) / (total / 1e9):>10,.0f} commands/sec  "
+              f"{per_query / 1000:>9.2f} us per age query{stats}")
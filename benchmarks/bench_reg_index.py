@@ -0,0 +1,64 @@
+"""
+Benchmark: registration prefix and pattern queries with the trie index vs a linear scan.
+
+num_cars cars with random registration numbers are parked, then state, district, series and partial plate
+prefix queries and wildcard pattern queries are timed with and without the registration index.
+
+Usage:
+    python3 benchmarks/bench_reg_index.py [num_cars]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import STATES  # noqa: E402
+
+QUERIES = [
+    "Slot_numbers_for_registration_prefix KA",
+    "Slot_numbers_for_registration_prefix KA-01",
+    "Slot_numbers_for_registration_prefix KA-01-H",
+    "Slot_numbers_for_registration_prefix KA-01-HH-12",
+    "Slot_numbers_for_registration_pattern *-01-HH-*",
+    "Slot_numbers_for_registration_pattern KA-*-*-1234",
+]
+
+
+def parked_lot(num_cars, reg_index):
+    plot = ParkingLot()
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+    cmd_proc_obj.set_emit(lambda line: None)
+    cmd_proc_obj.process_command(["Create_parking_lot", str(num_cars)])
+    rng = random.Random(1)
+    for slot in plot.get_emptyslots(num_cars):
+        plot.occupy_slot(slot, f"{rng.choice(STATES)}-{rng.randint(1, 99):02d}-{chr(rng.randint(65, 90))}"
+                               f"{chr(rng.randint(65, 90))}-{rng.randint(0, 9999):04d}", 30)
+    if reg_index:
+        start = time.perf_counter()
+        plot.enable_reg_index()
+        print(f"index of {len(plot.reg_slot_dict)} registration numbers built in {time.perf_counter() - start:.2f}s")
+    return cmd_proc_obj
+
+
+def time_query(cmd_proc_obj, command_toks, repeat):
+    output = []
+    cmd_proc_obj.set_emit(output.append)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cmd_proc_obj.process_command(command_toks)
+    return (time.perf_counter() - start) / repeat, output[-1].count(",") + 1 if "," in output[-1] else 1
+
+
+if __name__ == '__main__':
+    num_cars = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    scan_proc_obj = parked_lot(num_cars, reg_index=False)
+    index_proc_obj = parked_lot(num_cars, reg_index=True)
+    print(f"{'query':<55} {'matches':>8} {'scan (ms)':>10} {'trie (ms)':>10}")
+    for query in QUERIES:
+        scan_time, matches = time_query(scan_proc_obj, query.split(), 3)
+        index_time, _ = time_query(index_proc_obj, query.split(), 20)
+        print(f"{query:<55} {matches:>8} {scan_time * 1000:>10.3f} {index_time * 1000:>10.3f}   "
+              f"speedup x{scan_time / index_time:.0f}")
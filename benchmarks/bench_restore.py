@@ -0,0 +1,61 @@
+"""
+Benchmark: restart time of a parking lot from a snapshot and the journal tail,
+against replaying the whole command history.
+
+Usage:
+    python3 benchmarks/bench_restore.py [history_commands] [num_slots]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence import Journal, checkpoint, restore  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+
+
+def command(index, num_slots):
+    if index % 3 == 2:
+        return ["Leave", str(1 + index * 7 % num_slots)]
+    return ["Park", f"KA-{index // 10000 % 100:02d}-HH-{index % 10000:04d}", "driver_age", str(18 + index % 60)]
+
+
+def replay(commands):
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    cmd_proc_obj.set_emit(lambda line: None)
+    start = time.perf_counter()
+    for command_toks in commands:
+        cmd_proc_obj.process_command(command_toks)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    history = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    num_slots = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+    commands = [["Create_parking_lot", str(num_slots)]] + [command(index, num_slots) for index in range(history)]
+    print(f"full replay of {history} commands: {replay(commands):.3f}s")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "lot.snapshot")
+        journal_path = os.path.join(tmp_dir, "lot.journal")
+        for tail in (0, 1000, 10000, 100000):
+            if tail >= history:
+                break
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+            cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+            cmd_proc_obj.set_emit(lambda line: None)
+            cmd_proc_obj.journal = Journal(journal_path)
+            for index, command_toks in enumerate(commands):
+                if index == len(commands) - tail:
+                    checkpoint(cmd_proc_obj, snapshot_path)
+                cmd_proc_obj.process_command(command_toks)
+            if tail == 0:
+                checkpoint(cmd_proc_obj, snapshot_path)
+            cmd_proc_obj.journal.close()
+            start = time.perf_counter()
+            restored = restore(snapshot_path, journal_path)
+            elapsed = time.perf_counter() - start
+            restored.journal.close()
+            print(f"restore from snapshot + journal tail of {tail:>6} commands: {elapsed:.3f}s")
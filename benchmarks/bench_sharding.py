@@ -0,0 +1,59 @@
+"""
+Benchmark: throughput of MultiLotEngine as the number of worker processes grows.
+
+Generates interleaved commands for many independent lots and reports commands/sec for the
+in process engine (0 workers) and for 1 up to cpu_count workers.
+
+Usage:
+    python3 benchmarks/bench_sharding.py [num_lots] [commands_per_lot]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharding import MultiLotEngine  # noqa: E402
+from utils import FileUtility  # noqa: E402
+
+NUM_OF_SLOTS = 500
+
+
+def write_commands(path, num_lots, commands_per_lot):
+    with open(path, 'w') as commands_file:
+        for lot in range(num_lots):
+            commands_file.write(f"Lot L{lot} Create_parking_lot {NUM_OF_SLOTS}\n")
+        for index in range(commands_per_lot - 1):
+            for lot in range(num_lots):
+                if index % 3 == 2:
+                    commands_file.write(f"Lot L{lot} Leave {1 + (index * 7 + lot) % NUM_OF_SLOTS}\n")
+                else:
+                    commands_file.write(f"Lot L{lot} Park KA-{lot % 100:02d}-HH-{index % 10000:04d} "
+                                        f"driver_age {18 + index % 60}\n")
+
+
+def bench(path, workers, num_commands):
+    file_obj = FileUtility()
+    file_obj.load_file(path)
+    engine = MultiLotEngine(workers)
+    engine.emit = lambda line: None
+    start = time.perf_counter()
+    engine.execute_commands(file_obj)
+    elapsed = time.perf_counter() - start
+    file_obj.file.close()
+    return num_commands / elapsed
+
+
+if __name__ == '__main__':
+    num_lots = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    commands_per_lot = int(sys.argv[2]) if len(sys.argv) > 2 else 2500
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "commands.txt")
+        write_commands(path, num_lots, commands_per_lot)
+        num_commands = num_lots * commands_per_lot
+        print(f"{num_lots} lots, {num_commands} commands")
+        print(f"{'workers':>8} {'commands/sec':>14}")
+        for workers in range(0, multiprocessing.cpu_count() + 1):
+            print(f"{workers:>8} {bench(path, workers, num_commands):>14,.0f}")
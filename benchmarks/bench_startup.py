@@ -0,0 +1,80 @@
+"""
+Benchmark: start up time of a short virtual_parking.py run, like a gate kiosk running one small batch.
+
+Each case is a fresh interpreter running a batch of 20 commands on a lot of num_slots slots, the best wall clock
+time of repeat runs is reported next to an empty interpreter. "eager imports" imports every module of the
+project and re up front, like virtual_parking.py did before the imports were deferred.
+The modules imported by the run and their import time are listed from python3 -X importtime.
+The interpreter may write the bytecode cache, so the project modules are not compiled again on every run.
+
+Usage:
+    python3 benchmarks/bench_startup.py [num_slots] [repeat]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EAGER_IMPORTS = ("import re, gzip, allocator, query_cache, reg_index, registration, sessions, storage, runpy; "
+                 "sys.argv = sys.argv[1:]; runpy.run_path('virtual_parking.py', run_name='__main__')")
+
+
+def batch_file(directory, num_slots):
+    path = os.path.join(directory, "batch.txt")
+    with open(path, 'w') as batch:
+        batch.write(f"Create_parking_lot {num_slots}\n")
+        for index in range(8):
+            batch.write(f"Park KA-01-HH-{index:04d} driver_age {20 + index}\n")
+        batch.write("Leave 2\nLeave 5\nPark KA-02-HH-1234 driver_age 21\nSlot_numbers_for_driver_of_age 21\n")
+        batch.write("Slot_number_for_car_with_number KA-01-HH-0003\nVehicle_registration_number_for_driver_of_age 23\n")
+        batch.write("Count_of_drivers_of_age_between 20 30\nYoungest_driver_age\nOldest_driver_age\nLeave 1\nLeave 3\n")
+    return path
+
+
+def best_time(command, repeat, env):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_times(path, env):
+    """
+    :return: List: (module name, cumulative import time in us) of the top level imports of the run which are not
+             imported by an empty interpreter
+    """
+    def imports(command):
+        stderr = subprocess.run(command, cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True).stderr
+        for line in stderr.splitlines()[1:]:
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+            yield name, int(cumulative_us)
+
+    site_modules = set(name.strip() for name, _ in imports([sys.executable, "-X", "importtime", "-c", "pass"]))
+    return [(name.strip(), cumulative_us) for name, cumulative_us in
+            imports([sys.executable, "-X", "importtime", "virtual_parking.py", path])
+            if not name.startswith("  ") and name.strip() not in site_modules]
+
+
+if __name__ == '__main__':
+    num_slots = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    env = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = batch_file(tmp_dir, num_slots)
+        cases = [
+            ("empty interpreter", [sys.executable, "-c", "pass"]),
+            ("eager imports, list storage", [sys.executable, "-c", "import sys; " + EAGER_IMPORTS, "-", path]),
+            ("list storage", [sys.executable, "virtual_parking.py", path]),
+            ("lazy storage", [sys.executable, "virtual_parking.py", path, "--storage=lazy"]),
+        ]
+        subprocess.run(cases[1][1], cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, check=True)
+        for name, command in cases:
+            print(f"{name:>28}: {best_time(command, repeat, env) * 1000:>7.1f} ms")
+        print("\ntop level imports of virtual_parking.py (cumulative us):")
+        for name, cumulative_us in import_times(path, env):
+            print(f"    {name:<20} {cumulative_us:>7}")
@@ -0,0 +1,51 @@
+"""
+Benchmark: commands/sec of the write ahead log for each fsync policy.
+
+A generated churn workload is executed without a journal, then with a journal for the "none", "batch"
+(group commit, several batch sizes) and "always" fsync policies. The journal is written next to the
+given directory, fsync cost depends on its file system.
+
+Usage:
+    python3 benchmarks/bench_wal.py [num_commands] [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence import Journal  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import generate_commands  # noqa: E402
+
+POLICIES = [("no journal", None, 0), ("none", "none", 0), ("batch 1024", "batch", 1024), ("batch 64", "batch", 64),
+            ("batch 8", "batch", 8), ("always", "always", 0)]
+
+
+def run(commands, journal_path, fsync, batch_size):
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    cmd_proc_obj.set_emit(lambda line: None)
+    if fsync:
+        cmd_proc_obj.journal = Journal(journal_path, fsync, batch_size=batch_size or 1)
+    start = time.perf_counter()
+    for command_toks in commands:
+        cmd_proc_obj.process_command(command_toks)
+    if fsync:
+        cmd_proc_obj.journal.close()
+    elapsed = time.perf_counter() - start
+    num_syncs = cmd_proc_obj.journal.num_syncs if fsync else 0
+    if fsync:
+        os.remove(journal_path)
+    return len(commands) / elapsed, num_syncs
+
+
+if __name__ == '__main__':
+    num_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = sys.argv[2] if len(sys.argv) > 2 else None
+    commands = [line.split() for line in generate_commands("churn", num_commands, num_slots=1000)]
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        journal_path = os.path.join(tmp_dir, "lot.journal")
+        for name, fsync, batch_size in POLICIES:
+            rate, num_syncs = run(commands, journal_path, fsync, batch_size)
+            print(f"{name:>11}: {rate:>10,.0f} commands/sec  {num_syncs:>7} fsyncs")
@@ -0,0 +1,185 @@
+"""
+Benchmark suite: runs the generated workloads (see workloads.py) through CommandProcessor.
+
+Each workload and size runs in a fresh process, which reports ops/sec, the peak memory (max RSS) of the
+process and the latency of each command type. The latencies are counted in a fixed size histogram per command
+type, so the max RSS is the one of the parking lot and not of the latency samples. The results are written to a JSON file which can be given
+to a later run with --compare to print the ops/sec change of every case.
+
+Usage:
+    python3 benchmarks/run_suite.py [--workloads=rush_hour,churn,query_heavy] [--sizes=1000,10000,100000,1000000,10000000]
+                                    [--seed=1] [--storage=list] [--output=bench_results.json] [--compare=old.json]
+"""
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import FileUtility  # noqa: E402
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor  # noqa: E402
+from workloads import WORKLOADS, generate_commands  # noqa: E402
+
+DEFAULT_SIZES = "1000,10000,100000,1000000,10000000"
+# latency histograms have 2^SUB_BUCKET_BITS buckets per power of two of nanoseconds, a quantile is the lower bound of
+# its bucket, within 1/32 of the latency
+SUB_BUCKET_BITS = 5
+HISTOGRAM_SIZE = 64 << SUB_BUCKET_BITS
+# seconds a case may run before it is reported as hung
+CASE_TIMEOUT = 3600
+
+
+def max_rss_kib():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def bucket_of(latency_ns):
+    shift = max(latency_ns.bit_length() - SUB_BUCKET_BITS - 1, 0)
+    return (shift << SUB_BUCKET_BITS) + (latency_ns >> shift)
+
+
+def bucket_floor(bucket):
+    """
+    :return: Integer: smallest latency in nanoseconds counted in the bucket
+    """
+    if bucket < 2 << SUB_BUCKET_BITS:
+        return bucket
+    shift = (bucket >> SUB_BUCKET_BITS) - 1
+    return (bucket - (shift << SUB_BUCKET_BITS)) << shift
+
+
+def percentile(histogram, count, fraction):
+    rank = min(count - 1, int(count * fraction))
+    seen = 0
+    for bucket, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if seen > rank:
+            return bucket_floor(bucket)
+    return bucket_floor(len(histogram) - 1)
+
+
+def case_result(process, results):
+    """
+    Waits for the result of the benchmark process, a process killed by the OOM killer or a crash
+    never puts its result on the queue
+    :return: the result put on the queue by the process, RuntimeError if it exited or hung without one
+    """
+    deadline = time.monotonic() + CASE_TIMEOUT
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if process.exitcode is not None:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    raise RuntimeError(f"benchmark process exited with code {process.exitcode} without a result")
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"benchmark process did not finish in {CASE_TIMEOUT} seconds")
+
+
+def run_case(path, storage, results):
+    """
+    Runs the commands of the file and puts the measurements of the case in the results queue
+    """
+    file_obj = FileUtility()
+    file_obj.load_file(path)
+    cmd_proc_obj = CommandProcessor(file_obj, ParkingProcessor(ParkingLot(storage=storage)))
+    cmd_proc_obj.set_emit(lambda line: None)
+    process_command = cmd_proc_obj.process_command
+    clock = time.perf_counter_ns
+    histograms = {}
+    totals = {}
+    num_commands = 0
+    start = clock()
+    for command_toks in file_obj.iter_commands():
+        command_start = clock()
+        process_command(command_toks)
+        elapsed = clock() - command_start
+        name = command_toks[0]
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = array('q', bytes(8 * HISTOGRAM_SIZE))
+            totals[name] = 0
+        histogram[bucket_of(elapsed)] += 1
+        totals[name] += elapsed
+        num_commands += 1
+    total = clock() - start
+    per_command = {}
+    for name, histogram in histograms.items():
+        count = sum(histogram)
+        per_command[name] = {
+            "count": count,
+            "mean_us": round(totals[name] / count / 1000, 3),
+            "p50_us": round(percentile(histogram, count, 0.5) / 1000, 3),
+            "p99_us": round(percentile(histogram, count, 0.99) / 1000, 3),
+        }
+    results.put({
+        "commands": num_commands,
+        "seconds": round(total / 1e9, 4),
+        "ops_per_sec": round(num_commands / (total / 1e9)),
+        "max_rss_kib": max_rss_kib(),
+        "per_command": per_command,
+    })
+
+
+def run_suite(workloads, sizes, seed, storage):
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workload in workloads:
+            for size in sizes:
+                path = os.path.join(tmp_dir, f"{workload}_{size}.txt")
+                with open(path, 'w') as commands_file:
+                    for line in generate_commands(workload, size, seed):
+                        commands_file.write(line + "\n")
+                results = multiprocessing.Queue()
+                process = multiprocessing.Process(target=run_case, args=(path, storage, results))
+                process.start()
+                case = {"workload": workload, "size": size, "storage": storage, **case_result(process, results)}
+                process.join()
+                if process.exitcode:
+                    raise RuntimeError(f"benchmark process exited with code {process.exitcode}")
+                os.remove(path)
+                cases.append(case)
+                print(f"{workload:<12} {size:>9} commands {case['ops_per_sec']:>10,} ops/sec "
+                      f"{case['max_rss_kib'] / 1024:>8.1f} MiB max RSS")
+                for name, stats in sorted(case["per_command"].items()):
+                    print(f"    {name:<48} {stats['count']:>9} x  mean {stats['mean_us']:>9.3f}us  "
+                          f"p50 {stats['p50_us']:>9.3f}us  p99 {stats['p99_us']:>9.3f}us")
+    return cases
+
+
+def compare(cases, path):
+    with open(path) as old_file:
+        old_cases = {(case["workload"], case["size"], case["storage"]): case for case in json.load(old_file)["cases"]}
+    print(f"\nops/sec compared to {path}")
+    for case in cases:
+        old_case = old_cases.get((case["workload"], case["size"], case["storage"]))
+        if old_case:
+            change = case["ops_per_sec"] / old_case["ops_per_sec"] - 1
+            print(f"{case['workload']:<12} {case['size']:>9} {change:>+8.1%}")
+
+
+if __name__ == '__main__':
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    workloads = options.get("workloads", ",".join(WORKLOADS)).split(",")
+    sizes = [int(size) for size in options.get("sizes", DEFAULT_SIZES).split(",")]
+    seed = int(options.get("seed", 1))
+    storage = options.get("storage", "list")
+    cases = run_suite(workloads, sizes, seed, storage)
+    output = options.get("output", "bench_results.json")
+    with open(output, 'w') as output_file:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(), "seed": seed,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "cases": cases}, output_file, indent=2)
+    print(f"results written to {output}")
+    if options.get("compare"):
+        compare(cases, options["compare"])
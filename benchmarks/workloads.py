@@ -0,0 +1,131 @@
+"""
+Seeded generator of realistic command mixes for the benchmarks.
+
+Workloads:
+    rush_hour    the lot fills up, mostly Park with a few Leave and queries
+    churn        the lot stays near full, Park and Leave in equal parts
+    query_heavy  kiosks querying a busy lot, mostly age and registration queries
+
+The generator keeps a model of the lot (smallest free slot first, like ParkingLot), so Leave commands
+target occupied slots and queries ask for parked registration numbers and ages.
+The same workload, size and seed always give the same commands.
+
+Usage:
+    python3 benchmarks/workloads.py <workload> <num_commands> [--seed=1] [--slots=N] > commands.txt
+"""
+import random
+import sys
+from heapq import heappop, heappush
+
+CHUNK_SIZE = 100000
+STATES = ["KA", "MH", "DL", "TN", "AP", "TS", "PB", "HR", "UP", "GJ", "RJ", "KL", "WB", "MP"]
+
+# fraction of the lot filled before the mix starts, and weights of
+# Park, Leave, age query, registration query, registration by age query, age range query
+WORKLOADS = {
+    "rush_hour": (0.0, (70, 10, 8, 6, 4, 2)),
+    "churn": (0.9, (45, 45, 4, 3, 2, 1)),
+    "query_heavy": (0.5, (10, 10, 30, 30, 15, 5)),
+}
+
+
+class LotModel:
+    """
+    Model of the parking lot state used to generate valid commands
+    """
+
+    def __init__(self, num_slots, rng):
+        self.num_slots = num_slots
+        self.rng = rng
+        self.avail_slot = 0
+        self.slot_heap = []
+        self.parked = []
+        self.position = {}
+        self.vehicles = {}
+
+    def reg_num(self):
+        rng = self.rng
+        return (f"{rng.choice(STATES)}-{rng.randint(1, 99):02d}-"
+                f"{chr(rng.randint(65, 90))}{chr(rng.randint(65, 90))}-{rng.randint(0, 9999):04d}")
+
+    def age(self):
+        return min(90, max(18, int(self.rng.gauss(40, 14))))
+
+    def park(self):
+        reg_num, age = self.reg_num(), self.age()
+        slot = None
+        if self.slot_heap:
+            slot = heappop(self.slot_heap)
+        elif self.avail_slot < self.num_slots:
+            slot = self.avail_slot
+            self.avail_slot += 1
+        if slot is not None:
+            self.position[slot] = len(self.parked)
+            self.parked.append(slot)
+            self.vehicles[slot] = (reg_num, age)
+        return f"Park {reg_num} driver_age {age}"
+
+    def leave(self):
+        if not self.parked:
+            return f"Leave {self.rng.randint(1, self.num_slots)}"
+        index = self.rng.randrange(len(self.parked))
+        slot, last = self.parked[index], self.parked[-1]
+        self.parked[index] = last
+        self.position[last] = index
+        self.parked.pop()
+        del self.position[slot]
+        del self.vehicles[slot]
+        heappush(self.slot_heap, slot)
+        return f"Leave {slot + 1}"
+
+    def parked_vehicle(self):
+        if not self.parked:
+            return self.reg_num(), self.age()
+        return self.vehicles[self.rng.choice(self.parked)]
+
+
+def generate_commands(workload, num_commands, seed=1, num_slots=None):
+    """
+    :param workload: name of the workload, one of WORKLOADS
+    :param num_commands: number of commands including the Create_parking_lot command
+    :param seed: seed of the random generator
+    :param num_slots: size of the lot, by default a quarter of the number of commands (at least 1000)
+    :return: yields the command lines without the line separator
+    """
+    rng = random.Random(seed)
+    num_slots = num_slots or max(1000, num_commands // 4)
+    lot = LotModel(num_slots, rng)
+    prefill, weights = WORKLOADS[workload]
+    num_prefill = min(int(num_slots * prefill), (num_commands - 1) // 2)
+    yield f"Create_parking_lot {num_slots}"
+    for _ in range(num_prefill):
+        yield lot.park()
+    remaining = num_commands - 1 - num_prefill
+    while remaining > 0:
+        kinds = rng.choices(range(6), weights=weights, k=min(remaining, CHUNK_SIZE))
+        remaining -= len(kinds)
+        for kind in kinds:
+            if kind == 0:
+                yield lot.park()
+            elif kind == 1:
+                yield lot.leave()
+            elif kind == 2:
+                yield f"Slot_numbers_for_driver_of_age {lot.parked_vehicle()[1]}"
+            elif kind == 3:
+                yield f"Slot_number_for_car_with_number {lot.parked_vehicle()[0]}"
+            elif kind == 4:
+                yield f"Vehicle_registration_number_for_driver_of_age {lot.parked_vehicle()[1]}"
+            else:
+                min_age = lot.age()
+                yield f"Count_of_drivers_of_age_between {min_age} {min_age + rng.randint(0, 10)}"
+
+
+if __name__ == '__main__':
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 2 or args[0] not in WORKLOADS:
+        sys.exit(f"Usage: python3 benchmarks/workloads.py <{'|'.join(WORKLOADS)}> <num_commands> [--seed=1] [--slots=N]")
+    out = sys.stdout
+    for line in generate_commands(args[0], int(args[1]), int(options.get("seed", 1)),
+                                  int(options["slots"]) if options.get("slots") else None):
+        out.write(line + "\n")
@@ -0,0 +1,120 @@
+import threading
+
+# commands which only read the parking lot, they run concurrently under the read lock
+READ_COMMANDS = frozenset({
+    'Slot_numbers_for_driver_of_age', 'Slot_number_for_car_with_number',
+    'Vehicle_registration_number_for_driver_of_age', 'Slot_numbers_for_driver_of_age_between',
+    'Count_of_drivers_of_age_between', 'Count_of_drivers_per_age', 'Youngest_driver_age', 'Oldest_driver_age',
+    'Slot_numbers_for_registration_prefix', 'Slot_numbers_for_registration_pattern',
+})
+# age queries answered from the query cache, a cache hit reorders the LRU entries so they need the write lock
+CACHED_QUERIES = frozenset({'Slot_numbers_for_driver_of_age', 'Vehicle_registration_number_for_driver_of_age'})
+
+
+class ReadWriteLock:
+    """
+    ReadWriteLock lets many readers or a single writer hold the lock.
+    Writers are preferred: a writer holds the turnstile while it waits for the readers to finish, new readers wait
+    at the turnstile, so a steady stream of queries never starves the Park and Leave commands.
+    A reader only takes two uncontended locks, the Condition of a textbook reader-writer lock was slower than a
+    single mutex for the short queries of the parking lot.
+       Usage:
+         turnstile: held by the writer from the time it asks for the lock, readers pass through it to get in
+         no_readers: held while readers > 0 or by the writer
+         readers: number of threads holding the read lock, guarded by readers_lock
+    """
+
+    def __init__(self):
+        self.turnstile = threading.Lock()
+        self.no_readers = threading.Lock()
+        self.readers_lock = threading.Lock()
+        self.readers = 0
+
+    def acquire_read(self):
+        with self.turnstile:
+            pass
+        with self.readers_lock:
+            self.readers += 1
+            if self.readers == 1:
+                self.no_readers.acquire()
+
+    def release_read(self):
+        """ The last reader releases no_readers, it may have been acquired by another reader thread """
+        with self.readers_lock:
+            self.readers -= 1
+            if not self.readers:
+                self.no_readers.release()
+
+    def acquire_write(self):
+        self.turnstile.acquire()
+        self.no_readers.acquire()
+
+    def release_write(self):
+        self.no_readers.release()
+        self.turnstile.release()
+
+
+class ConcurrentParkingLot:
+    """
+    ConcurrentParkingLot is a thread safe facade of a CommandProcessor, for many query kiosks reading one parking lot
+    while a few gates park and leave cars from other threads.
+    The query commands (READ_COMMANDS) run concurrently under the read lock, all the other commands run alone under
+    the write lock, so a query never sees a half done Park or Leave. The output lines of a command are collected
+    per thread and returned by execute(), the output of concurrent commands is never mixed.
+       Usage:
+         cmd_proc_obj: CommandProcessor of the shared parking lot, it should not be used directly by the threads
+         lock: ReadWriteLock of the parking lot
+         local: thread local output lines of the command being executed
+    """
+
+    def __init__(self, cmd_proc_obj):
+        self.cmd_proc_obj = cmd_proc_obj
+        self.lock = ReadWriteLock()
+        self.local = threading.local()
+        cmd_proc_obj.set_emit(self.emit)
+
+    def emit(self, line):
+        self.local.lines.append(line)
+
+    def is_read_only(self, command_toks):
+        """
+        :param command_toks: Array with the command and value example- ["Slot_number_for_car_with_number", "KA-01-HH-1234"]
+        :return: True if the command can run under the read lock
+        """
+        name = command_toks[0] if command_toks else None
+        if name not in READ_COMMANDS:
+            return False
+        return name not in CACHED_QUERIES or self.cmd_proc_obj.process_parking_obj.parkinglot_obj.query_cache is None
+
+    def execute(self, command_toks):
+        """
+        Executes one command, can be called from any thread
+        :param command_toks: Array with the command and value example- ["Park", "KA-01-HH-1234", "driver_age", "21"]
+        :return: List: output lines of the command
+        """
+        lines = self.local.lines = []
+        if self.is_read_only(command_toks):
+            self.lock.acquire_read()
+            try:
+                self.cmd_proc_obj.process_command(command_toks)
+            finally:
+                self.lock.release_read()
+        else:
+            self.lock.acquire_write()
+            try:
+                self.cmd_proc_obj.process_command(command_toks)
+            finally:
+                self.lock.release_write()
+        return lines
+
+    def read(self, function):
+        """
+        Calls the function with the ParkingLot under the read lock, for reads which are not commands
+        :param function: function called with the ParkingLot object, it should not change the parking lot
+        :return: return value of the function
+        """
+        self.lock.acquire_read()
+        try:
+            return function(self.cmd_proc_obj.process_parking_obj.parkinglot_obj)
+        finally:
+            self.lock.release_read()
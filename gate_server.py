@@ -0,0 +1,169 @@
+import asyncio
+import sys
+
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor
+
+END_OF_RESPONSE = "."
+COMMAND_ERROR = "Cannot process the command"
+# responses of a gate waiting to be sent, a gate which does not read its responses stops being read
+MAX_PENDING_RESPONSES = 1024
+
+
+class GateServer:
+    """
+    GateServer serves one parking lot to many gate connections over TCP or a Unix socket.
+    The gates send the commands of the input file format, one command per line, and may pipeline
+    many commands without waiting for the responses. The response of each command is its output
+    lines followed by a line with a single "." (END_OF_RESPONSE).
+    Commands are executed one at a time on the event loop, so the commands of concurrent gates are never
+    interleaved inside the parking lot, and the responses of a gate come in the order of its commands.
+    With a "batch" journal a response is held till the fsync which covers its command is done. The commands
+    of a gate are executed as they arrive while their responses wait, so the pipelined commands of a gate and
+    the commands of all the other gates in the same interval share one fsync (group commit).
+       Usage:
+         cmd_proc_obj: CommandProcessor of the served parking lot, its output is collected in lines
+         lines: output lines of the command being executed
+         next_sync: future done by the next fsync of the journal, the responses of the pending commands wait for it
+         syncer: task which fsyncs a "batch" journal every journal.interval seconds, started by start()
+    """
+
+    def __init__(self, cmd_proc_obj):
+        self.cmd_proc_obj = cmd_proc_obj
+        self.lines = list()
+        self.next_sync = None
+        self.syncer = None
+        cmd_proc_obj.set_emit(self.lines.append)
+
+    def execute(self, line):
+        """
+        :param line: bytes - command line received from a gate example- b"Leave 2\\n"
+        :return: bytes - response of the command with the END_OF_RESPONSE line, a command which raises an error
+                 gets the COMMAND_ERROR response and the gate connection is kept
+        """
+        try:
+            self.cmd_proc_obj.process_command(line.decode().split())
+        except Exception:
+            self.lines.clear()
+            self.lines.append(COMMAND_ERROR)
+        self.lines.append(END_OF_RESPONSE)
+        response = "\n".join(str(line) for line in self.lines) + "\n"
+        self.lines.clear()
+        return response.encode()
+
+    async def handle_gate(self, reader, writer):
+        """
+        Executes the commands of a gate as they arrive, the responses are sent in order by send_responses()
+        """
+        responses = asyncio.Queue(MAX_PENDING_RESPONSES)
+        sender = asyncio.create_task(self.send_responses(writer, responses))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = self.execute(line)
+                await responses.put((response, self.durable()))
+            await responses.put(None)
+            await sender
+        except ConnectionError:
+            pass
+        finally:
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    async def send_responses(writer, responses):
+        """
+        Sends the responses of a gate in the order of its commands, each one once its command is durable.
+        The responses ready at once are written together with one drain
+        :param writer: asyncio.StreamWriter of the gate connection
+        :param responses: asyncio.Queue of (response, future of the fsync to wait for or None), None at the end
+        """
+        connected = True
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            response, synced = item
+            if synced is not None:
+                await synced
+            if not connected:
+                continue
+            try:
+                writer.write(response)
+                if responses.empty():
+                    await writer.drain()
+            except ConnectionError:
+                # the rest of the responses are dropped, the commands already read are still executed
+                connected = False
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        """
+        Starts listening for gate connections
+        :param host: host of the TCP server
+        :param port: port of the TCP server, 0 picks a free port
+        :param unix_path: path of the Unix socket, the server listens on it instead of TCP when given
+        :return: asyncio.Server object
+        """
+        journal = self.cmd_proc_obj.journal
+        if journal is not None and journal.fsync == "batch" and self.syncer is None:
+            self.syncer = asyncio.create_task(self.sync_journal())
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle_gate, path=unix_path)
+        return await asyncio.start_server(self.handle_gate, host, port)
+
+    def durable(self):
+        """
+        :return: future done once the commands executed so far are fsynced, None when the journal has no pending
+                 commands: no journal, the "none" policy (no durability guarantee) or a journal fsynced by the last
+                 append
+        """
+        journal = self.cmd_proc_obj.journal
+        if journal is None or not journal.pending:
+            return None
+        if self.next_sync is None:
+            self.next_sync = asyncio.get_running_loop().create_future()
+        return self.next_sync
+
+    def release_responses(self):
+        """ Releases the responses waiting for the fsync which was just done """
+        if self.next_sync is not None:
+            self.next_sync.set_result(None)
+            self.next_sync = None
+
+    async def sync_journal(self):
+        """ Fsyncs the commands pending in a "batch" journal every interval and releases their responses """
+        journal = self.cmd_proc_obj.journal
+        while True:
+            await asyncio.sleep(journal.interval)
+            if self.next_sync is not None or journal.pending:
+                journal.sync()
+                self.release_responses()
+
+
+async def serve(host, port, unix_path, wal_path=None, fsync="batch"):
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+    if wal_path:
+        from persistence import recover
+        print(f"Recovered {recover(cmd_proc_obj, wal_path, fsync)} commands from {wal_path}", flush=True)
+    gate_server = GateServer(cmd_proc_obj)
+    server = await gate_server.start(host, port, unix_path)
+    address = unix_path or "{}:{}".format(*server.sockets[0].getsockname()[:2])
+    print(f"Gate server listening on {address}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if gate_server.syncer is not None:
+            gate_server.syncer.cancel()
+        if cmd_proc_obj.journal is not None:
+            cmd_proc_obj.journal.close()
+
+
+if __name__ == '__main__':
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    try:
+        asyncio.run(serve(options.get("host", "127.0.0.1"), int(options.get("port", 8765)), options.get("unix"),
+                          options.get("wal"), options.get("fsync", "batch")))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+import time
+
+# latency histograms use power of two buckets of nanoseconds, bucket i counts latencies < 2^i ns
+NUM_BUCKETS = 36
+# label of the commands which are not in the dispatch table, so bad input cannot create a series per token
+UNKNOWN_COMMAND = "unknown"
+
+
+def escape_label_value(value):
+    """ Escapes a label value for the Prometheus text format: backslash, double quote and line feed """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Instrumentation:
+    """
+    Instrumentation is an opt-in profiling layer for CommandProcessor.
+    attach() replaces process_command of the CommandProcessor object with a timed wrapper and detach()
+    removes it, so a CommandProcessor without instrumentation runs exactly the same code as before.
+       Usage:
+         counters: dict of command name mapped to the number of executed commands, the commands which are not in
+                   the dispatch table of the CommandProcessor are counted under UNKNOWN_COMMAND
+         histograms: dict of command name mapped to the latency histogram of the command (NUM_BUCKETS counts)
+         latency_sums: dict of command name mapped to the total latency of the command in nanoseconds
+         hooks: functions called after every command with the command tokens and its latency in nanoseconds
+         interval: a stats line is written to the stream every interval commands, 0 disables it
+         lock: guards the counters and histograms, the queries of a concurrency.ConcurrentParkingLot are recorded
+               by many threads at once
+    """
+
+    def __init__(self, interval=0, stream=None):
+        self.interval = interval
+        self.stream = stream if stream is not None else sys.stderr
+        self.counters = dict()
+        self.histograms = dict()
+        self.latency_sums = dict()
+        self.hooks = list()
+        self.num_commands = 0
+        self.lock = threading.Lock()
+        self.parkinglot_obj = None
+        self.cmd_proc_obj = None
+
+    def register_hook(self, hook):
+        """
+        :param hook: function called with (command_toks, latency_ns) after every command
+        :return: None
+        """
+        self.hooks.append(hook)
+
+    def attach(self, cmd_proc_obj):
+        self.cmd_proc_obj = cmd_proc_obj
+        self.parkinglot_obj = cmd_proc_obj.process_parking_obj.parkinglot_obj
+        process_command = type(cmd_proc_obj).process_command.__get__(cmd_proc_obj)
+        clock = time.perf_counter_ns
+        record = self.record
+
+        def instrumented_process_command(command_toks):
+            start = clock()
+            process_command(command_toks)
+            record(command_toks, clock() - start)
+        cmd_proc_obj.process_command = instrumented_process_command
+
+    def detach(self):
+        if self.cmd_proc_obj is not None:
+            self.cmd_proc_obj.__dict__.pop('process_command', None)
+            self.cmd_proc_obj = None
+
+    def record(self, command_toks, latency_ns):
+        name = command_toks[0] if command_toks else UNKNOWN_COMMAND
+        if self.cmd_proc_obj is not None and name not in self.cmd_proc_obj.commands:
+            name = UNKNOWN_COMMAND
+        stats_line = None
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [0] * NUM_BUCKETS
+                self.counters[name] = 0
+                self.latency_sums[name] = 0
+            self.counters[name] += 1
+            self.latency_sums[name] += latency_ns
+            histogram[min(latency_ns.bit_length(), NUM_BUCKETS - 1)] += 1
+            self.num_commands += 1
+            if self.interval and self.num_commands % self.interval == 0:
+                stats_line = self.stats_line()
+        for hook in self.hooks:
+            hook(command_toks, latency_ns)
+        if stats_line is not None:
+            self.stream.write(stats_line + "\n")
+            self.stream.flush()
+
+    def gauges(self):
+        """
+        :return: Dict: current heap size, free slot count, total slots and occupancy of the parking lot,
+                 and the hit rate of its query cache when the cache is enabled
+        """
+        plot = self.parkinglot_obj
+        total_slots = (plot.total_slots or 0) if plot else 0
+        free_slots = plot.get_free_slot_count() if plot else 0
+        gauges = {
+            "slot_heap_size": len(plot.slot_heap) if plot else 0,
+            "free_slots": free_slots,
+            "total_slots": total_slots,
+            "occupancy": round((total_slots - free_slots) / total_slots, 4) if total_slots else 0.0,
+        }
+        if plot and plot.query_cache is not None:
+            gauges["query_cache_hit_rate"] = plot.query_cache.stats()["hit_rate"]
+        return gauges
+
+    @staticmethod
+    def quantile_us(histogram, fraction):
+        """
+        :return: Float: upper bound in microseconds of the bucket which holds the given quantile
+        """
+        target = sum(histogram) * fraction
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return (1 << bucket) / 1000
+        return 0.0
+
+    def stats_line(self):
+        gauges = " ".join(f"{name}={value}" for name, value in self.gauges().items())
+        commands = " ".join(
+            f"{name}:count={self.counters[name]},p50<={self.quantile_us(histogram, 0.5)}us,"
+            f"p99<={self.quantile_us(histogram, 0.99)}us"
+            for name, histogram in self.histograms.items())
+        return f"commands={self.num_commands} {gauges} {commands}".rstrip()
+
+    def prometheus_text(self):
+        """
+        :return: String: counters, latency histograms and gauges in the Prometheus text exposition format
+        """
+        with self.lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        lines = ["# TYPE vpl_commands_total counter"]
+        for name, count in self.counters.items():
+            lines.append(f'vpl_commands_total{{command="{escape_label_value(name)}"}} {count}')
+        lines.append("# TYPE vpl_command_latency_seconds histogram")
+        for name, histogram in self.histograms.items():
+            latency_sum = self.latency_sums[name]
+            name = escape_label_value(name)
+            cumulative = 0
+            for bucket, count in enumerate(histogram):
+                cumulative += count
+                lines.append(f'vpl_command_latency_seconds_bucket{{command="{name}",le="{(1 << bucket) / 1e9:g}"}} '
+                             f'{cumulative}')
+            lines.append(f'vpl_command_latency_seconds_bucket{{command="{name}",le="+Inf"}} {cumulative}')
+            lines.append(f'vpl_command_latency_seconds_sum{{command="{name}"}} {latency_sum / 1e9:g}')
+            lines.append(f'vpl_command_latency_seconds_count{{command="{name}"}} {cumulative}')
+        for name, value in self.gauges().items():
+            lines.append(f"# TYPE vpl_{name} gauge")
+            lines.append(f"vpl_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Writes prometheus_text() to the file, the file is replaced atomically for the scraper
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
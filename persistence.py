@@ -0,0 +1,455 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from storage import REG_NUM_WIDTH, CompactSlots, LazySlots, PackedSlots
+from utils import FileUtility
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor
+
+SNAPSHOT_MAGIC = b"VPLS"
+SNAPSHOT_VERSION = 3
+SNAPSHOT_PREFIX = struct.Struct("<4sH")
+# magic, version, storage, allocator, total_slots, avail_slot, num_slots, heap_len, num_ages, num_age_slots,
+# from version 2 journal_generation, journal_offset and from version 3 num_sessions, num_open_sessions
+SNAPSHOT_HEADERS = {1: struct.Struct("<4sHBBqqQQQQ"), 2: struct.Struct("<4sHBBqqQQQQqq"),
+                    3: struct.Struct("<4sHBBqqQQQQqqQQ")}
+SNAPSHOT_HEADER = SNAPSHOT_HEADERS[SNAPSHOT_VERSION]
+STORAGE_CODES = {"list": 0, "compact": 1, "packed": 2, "lazy": 3}
+# the allocator byte was a zero pad byte before the segment tree allocator, older snapshots load as "heap"
+ALLOCATOR_CODES = {"heap": 0, "segment_tree": 1}
+EMPTY = -1
+# fsync policies of the journal: "none" leaves the writes to the OS, "batch" fsyncs once every BATCH_SIZE commands or
+# SYNC_INTERVAL seconds (group commit), "always" fsyncs every command before it is executed
+FSYNC_POLICIES = ("none", "batch", "always")
+BATCH_SIZE = 256
+SYNC_INTERVAL = 0.01
+# first line of a journal, the generation goes up by one every time a checkpoint empties the journal
+JOURNAL_HEADER = "#journal {}\n"
+JOURNAL_HEADER_PREFIX = b"#journal "
+
+# Snapshot file layout, all the integers are little endian int64 so every column can be memory mapped:
+#     header          SNAPSHOT_HEADER, None values of total_slots / avail_slot are stored as -1, journal_generation
+#                     and journal_offset give the end of the journaled commands contained in the snapshot, -1 if the
+#                     snapshot was saved without a journal
+#     ages            num_slots driver ages, -1 for an empty slot
+#     slot_heap       heap_len free slot indexes in heap order
+#     age keys        num_ages ages in the order of age_slot_dict
+#     age counts      num_ages number of slots of each age
+#     age slots       num_age_slots slot numbers of every age, in parking order
+#     reg_nums        num_slots * REG_NUM_WIDTH ascii bytes, zero filled for an empty slot
+#     sessions        slots, ages, park_times, leave_times columns of the num_sessions completed parking sessions
+#     open sessions   slots, ages, park_times columns of the num_open_sessions cars parked with a timestamp
+
+
+def fsync_directory(path):
+    """ Makes the rename of a file in the directory of the path durable """
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def save_snapshot(parkinglot_obj, path, journal_position=None, sessions=None):
+    """
+    Saves the full state of the parking lot to the snapshot file. The file is written next to the
+    path and renamed, so an existing snapshot is replaced atomically.
+    :param parkinglot_obj: ParkingLot object
+    :param path: path of the snapshot file
+    :param journal_position: Tuple: (journal generation, byte offset) of the end of the journaled commands
+                             contained in the snapshot, see Journal.position()
+    :param sessions: sessions.SessionStore of the parking sessions, None if no car was parked with a timestamp
+    :return: None
+    """
+    num_slots = len(parkinglot_obj.slots)
+    ages = array('q', [EMPTY]) * num_slots
+    reg_nums = bytearray(REG_NUM_WIDTH * num_slots)
+    for index, vehicle_data in enumerate(parkinglot_obj.slots):
+        if vehicle_data:
+            reg_num = vehicle_data["reg_num"].encode('ascii')
+            if len(reg_num) != REG_NUM_WIDTH:
+                raise ValueError(f"Registration number should be {REG_NUM_WIDTH} characters long")
+            ages[index] = vehicle_data["age"]
+            reg_nums[index * REG_NUM_WIDTH:(index + 1) * REG_NUM_WIDTH] = reg_num
+    age_keys, age_counts, age_slots = array('q'), array('q'), array('q')
+    for age, slots in parkinglot_obj.age_slot_dict.items():
+        if slots:
+            age_keys.append(age)
+            age_counts.append(len(slots))
+            age_slots.extend(slots)
+    slot_heap = array('q', parkinglot_obj.slot_heap)
+    session_columns = []
+    if sessions is not None:
+        open_sessions = sessions.open_sessions
+        session_columns = [sessions.slots, sessions.ages, sessions.park_times, sessions.leave_times,
+                           array('q', open_sessions), array('q', (age for age, _ in open_sessions.values())),
+                           array('q', (park_time for _, park_time in open_sessions.values()))]
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, SNAPSHOT_VERSION, STORAGE_CODES[parkinglot_obj.storage],
+        ALLOCATOR_CODES[parkinglot_obj.allocator_name],
+        EMPTY if parkinglot_obj.total_slots is None else parkinglot_obj.total_slots,
+        EMPTY if parkinglot_obj.avail_slot is None else parkinglot_obj.avail_slot,
+        num_slots, len(slot_heap), len(age_keys), len(age_slots),
+        *(journal_position if journal_position is not None else (EMPTY, EMPTY)),
+        len(sessions) if sessions is not None else 0, len(sessions.open_sessions) if sessions is not None else 0)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(header)
+        for column in (ages, slot_heap, age_keys, age_counts, age_slots):
+            column.tofile(snapshot_file)
+        snapshot_file.write(reg_nums)
+        for column in session_columns:
+            column.tofile(snapshot_file)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+
+def load_snapshot(path):
+    """
+    Loads the parking lot saved by save_snapshot(), the file is memory mapped and its columns are copied at once
+    :param path: path of the snapshot file
+    :return: ParkingLot object
+    """
+    return read_snapshot(path)[0]
+
+
+def read_snapshot(path):
+    """
+    :param path: path of the snapshot file
+    :return: Tuple: (ParkingLot object, journal position saved with the snapshot or None,
+             sessions.SessionStore of the saved parking sessions or None)
+    """
+    with open(path, 'rb') as snapshot_file, \
+            mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as snapshot:
+        magic, version = SNAPSHOT_PREFIX.unpack_from(snapshot)
+        if magic != SNAPSHOT_MAGIC or version not in SNAPSHOT_HEADERS:
+            raise ValueError(f"{path} is not a parking lot snapshot")
+        header = SNAPSHOT_HEADERS[version]
+        # a version 1 header has 10 fields, the fields added by later versions default to no journal position
+        # and no sessions
+        fields = header.unpack_from(snapshot)
+        fields += (EMPTY, EMPTY, 0, 0)[len(fields) - 10:]
+        storage_code, allocator_code, total_slots, avail_slot, num_slots, heap_len, num_ages, num_age_slots, \
+            journal_generation, journal_offset, num_sessions, num_open_sessions = fields[2:14]
+        offset = header.size
+        columns = []
+        for length in (num_slots, heap_len, num_ages, num_ages, num_age_slots):
+            column = array('q')
+            column.frombytes(snapshot[offset:offset + 8 * length])
+            columns.append(column)
+            offset += 8 * length
+        ages, slot_heap, age_keys, age_counts, age_slots = columns
+        reg_nums = snapshot[offset:offset + REG_NUM_WIDTH * num_slots]
+        offset += REG_NUM_WIDTH * num_slots
+        session_columns = []
+        for length in (num_sessions,) * 4 + (num_open_sessions,) * 3:
+            column = array('q')
+            column.frombytes(snapshot[offset:offset + 8 * length])
+            session_columns.append(column)
+            offset += 8 * length
+    storage = next(name for name, code in STORAGE_CODES.items() if code == storage_code)
+    allocator = next(name for name, code in ALLOCATOR_CODES.items() if code == allocator_code)
+    if storage == "compact":
+        slots = CompactSlots(num_slots)
+    elif storage == "packed":
+        slots = PackedSlots(num_slots)
+    elif storage == "lazy":
+        slots = LazySlots(num_slots)
+    else:
+        slots = [None] * num_slots
+    reg_slot_dict = dict()
+    for index, age in enumerate(ages):
+        if age != EMPTY:
+            reg_num = reg_nums[index * REG_NUM_WIDTH:(index + 1) * REG_NUM_WIDTH].decode('ascii')
+            slots[index] = {"reg_num": reg_num, "age": age}
+            reg_slot_dict[reg_num] = index
+    age_slot_dict = dict()
+    start = 0
+    for age, count in zip(age_keys, age_counts):
+        age_slot_dict[age] = age_slots[start:start + count]
+        start += count
+    plot = ParkingLot(slots=slots, total_slots=None if total_slots == EMPTY else total_slots,
+                      avail_slot=None if avail_slot == EMPTY else avail_slot, reg_slot_dict=reg_slot_dict,
+                      age_slot_dict=age_slot_dict, slot_heap=list(slot_heap), storage=storage,
+                      allocator=allocator)
+    sessions = None
+    if num_sessions or num_open_sessions:
+        from sessions import SessionStore
+        sessions = SessionStore()
+        sessions.slots, sessions.ages, sessions.park_times, sessions.leave_times = session_columns[:4]
+        open_slots, open_ages, open_park_times = session_columns[4:]
+        sessions.open_sessions = {slot: (age, park_time)
+                                  for slot, age, park_time in zip(open_slots, open_ages, open_park_times)}
+    return plot, None if journal_offset == EMPTY else (journal_generation, journal_offset), sessions
+
+
+class Journal:
+    """
+    Journal is an append only file of the mutating commands applied since the last snapshot,
+    one command per line in the input file format after a JOURNAL_HEADER line with the generation of the journal.
+    It is the write ahead log of the CommandProcessor, a command is written to the file (flushed to the OS, it
+    survives a crash of the process) before it is executed, the fsync policy decides when it survives a crash of the OS.
+    A checkpoint saves the generation and the size of the journal in the snapshot before it empties the journal
+    and starts the next generation, so a crash between the two never replays the commands of the snapshot again.
+    A command which was cut by a crash while it was written (the last line without a newline) is removed
+    when the journal is opened, it was never executed.
+       Usage:
+         path: path of the journal file
+         file: journal file opened in append mode
+         fsync: fsync policy, one of FSYNC_POLICIES
+         batch_size, interval: a "batch" journal fsyncs when batch_size commands are pending or interval
+                               seconds passed since the last fsync, sync() also fsyncs the pending commands
+         syncer: thread of a "batch" journal which fsyncs the pending commands every interval seconds, so the
+                 last commands are synced when no more commands come
+         lock: guards the file between the appends and the syncer thread
+         closed: set by close(), stops the syncer
+         pending: number of commands written since the last fsync
+         num_syncs: number of fsyncs done
+         last_offset: offset of the last appended command, it is removed by discard_last() if the command fails
+         skipped: (record number, command, error) of the commands which failed on replay and were skipped
+         generation: generation of the journal, 0 for a journal written without a header
+         header_size: size in bytes of the header line
+    """
+
+    def __init__(self, path, fsync="none", batch_size=BATCH_SIZE, interval=SYNC_INTERVAL, generation=1):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown journal fsync policy {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pending = 0
+        self.num_syncs = 0
+        self.last_sync = time.monotonic()
+        self.last_offset = None
+        self.skipped = list()
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.repair()
+        self.generation, self.header_size = self.read_header()
+        self.file = open(path, 'a')
+        if self.generation is None:
+            self.write_header(generation)
+        self.syncer = None
+        if fsync == "batch":
+            self.syncer = threading.Thread(target=self.sync_periodically, daemon=True)
+            self.syncer.start()
+
+    def read_header(self):
+        """
+        :return: Tuple: (generation, header size in bytes), (None, 0) for an empty journal
+        """
+        if not os.path.exists(self.path):
+            return None, 0
+        with open(self.path, 'rb') as journal_file:
+            line = journal_file.readline()
+        if not line:
+            return None, 0
+        if line.startswith(JOURNAL_HEADER_PREFIX):
+            return int(line[len(JOURNAL_HEADER_PREFIX):]), len(line)
+        return 0, 0
+
+    def write_header(self, generation):
+        """ Starts the empty journal with the header of the generation, the header is always fsynced """
+        header = JOURNAL_HEADER.format(generation)
+        self.file.write(header)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.generation = generation
+        self.header_size = len(header)
+
+    def position(self):
+        """
+        :return: Tuple: (generation, byte offset of the end of the journal), saved with a snapshot by checkpoint()
+        """
+        self.file.flush()
+        return self.generation, os.path.getsize(self.path)
+
+    def repair(self):
+        """
+        Truncates the journal file after its last complete line
+        :return: Integer: number of bytes of the incomplete command which were removed
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb+') as journal_file:
+            size = end = journal_file.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 65536)
+                journal_file.seek(start)
+                newline = journal_file.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                journal_file.truncate(end)
+        return size - end
+
+    def append(self, command_toks):
+        with self.lock:
+            self.last_offset = self.file.tell()
+            self.file.write(" ".join(command_toks) + "\n")
+            self.file.flush()
+            if self.fsync == "none":
+                return
+            self.pending += 1
+            if (self.fsync == "always" or self.pending >= self.batch_size
+                    or time.monotonic() - self.last_sync >= self.interval):
+                self._sync()
+
+    def sync(self):
+        """
+        Makes the pending commands durable with one fsync (group commit)
+        """
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        if not self.pending:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.num_syncs += 1
+        self.last_sync = time.monotonic()
+
+    def sync_periodically(self):
+        """ Body of the syncer thread, fsyncs the pending commands every interval till the journal is closed """
+        while not self.closed.wait(self.interval):
+            if self.pending:
+                self.sync()
+
+    def discard_last(self):
+        """
+        Removes the last appended command, called when the command raised an error instead of being executed,
+        so the failing command is not replayed by recover()
+        """
+        with self.lock:
+            if self.last_offset is None:
+                return
+            self.file.truncate(self.last_offset)
+            self.last_offset = None
+            if self.fsync == "always":
+                self.pending += 1
+                self._sync()
+
+    def flush(self):
+        self.file.flush()
+
+    def truncate(self):
+        """
+        Empties the journal and starts its next generation, called once a snapshot with all the journaled
+        commands and the position() of the journal is saved
+        """
+        with self.lock:
+            self.file.seek(0)
+            self.file.truncate()
+            self.pending = 0
+            self.last_offset = None
+            self.write_header(self.generation + 1)
+
+    def close(self):
+        self.closed.set()
+        if self.syncer is not None:
+            self.syncer.join()
+        if self.fsync != "none":
+            self.sync()
+        self.file.close()
+
+    def replay(self, cmd_proc_obj, snapshot_position=None):
+        """
+        Executes the journaled commands on the given CommandProcessor without journaling them again.
+        A command which raises an error is skipped and added to skipped, the replay goes on with the next command.
+        :param cmd_proc_obj: CommandProcessor object
+        :param snapshot_position: journal position saved with the snapshot of the parking lot, the commands of the
+                                  same generation up to that offset are already in the snapshot and are not replayed
+        :return: Integer: number of replayed commands, the skipped commands are not counted
+        """
+        self.flush()
+        start = self.header_size
+        if snapshot_position is not None and snapshot_position[0] == self.generation:
+            start = max(start, snapshot_position[1])
+        file_obj = FileUtility()
+        file_obj.load_file(self.path)
+        file_obj.file.seek(start)
+        journal, cmd_proc_obj.journal = cmd_proc_obj.journal, None
+        num_commands = 0
+        self.skipped = list()
+        try:
+            for record_num, command_toks in enumerate(file_obj.iter_commands(), 1):
+                try:
+                    cmd_proc_obj.process_command(command_toks)
+                except Exception as error:
+                    self.skipped.append((record_num, " ".join(command_toks), repr(error)))
+                    continue
+                num_commands += 1
+        finally:
+            cmd_proc_obj.journal = journal
+            file_obj.file.close()
+        return num_commands
+
+
+def checkpoint(cmd_proc_obj, snapshot_path):
+    """
+    Saves a snapshot of the parking lot and the parking sessions of the CommandProcessor and empties its journal.
+    The snapshot holds the position of the journal, a crash before the journal is emptied only replays
+    the commands journaled after that position.
+    :param cmd_proc_obj: CommandProcessor object with a journal
+    :param snapshot_path: path of the snapshot file
+    :return: None
+    """
+    journal = cmd_proc_obj.journal
+    save_snapshot(cmd_proc_obj.process_parking_obj.parkinglot_obj, snapshot_path,
+                  journal.position() if journal is not None else None, cmd_proc_obj.process_parking_obj.sessions)
+    if journal is not None:
+        journal.truncate()
+
+
+def recover(cmd_proc_obj, journal_path, fsync="none", batch_size=BATCH_SIZE, interval=SYNC_INTERVAL,
+            snapshot_position=None):
+    """
+    Replays the write ahead log into the parking lot of the CommandProcessor and attaches the log to it,
+    so the next mutating commands are appended to the same log. The output of the replayed commands is discarded.
+    :param cmd_proc_obj: CommandProcessor object, with a new parking lot or the one loaded from the last snapshot
+    :param journal_path: path of the journal file, a new journal is started if the file is not present
+    :param fsync: fsync policy of the journal, one of FSYNC_POLICIES
+    :param snapshot_position: journal position saved with the snapshot the parking lot was loaded from,
+                              a new journal starts at the generation after it
+    :return: Integer: number of replayed commands, the commands which failed are reported on stderr and skipped
+    """
+    journal = Journal(journal_path, fsync, batch_size, interval,
+                      snapshot_position[0] + 1 if snapshot_position is not None else 1)
+    emit = cmd_proc_obj.emit
+    cmd_proc_obj.set_emit(lambda line: None)
+    try:
+        num_commands = journal.replay(cmd_proc_obj, snapshot_position)
+    finally:
+        cmd_proc_obj.set_emit(emit)
+    for record_num, command, error in journal.skipped:
+        print(f"Skipped journal record {record_num} of {journal_path}: {command} ({error})", file=sys.stderr)
+    cmd_proc_obj.journal = journal
+    return num_commands
+
+
+def restore(snapshot_path, journal_path, fsync="none"):
+    """
+    Restores the parking lot and its parking sessions from the last snapshot and the commands journaled since then.
+    The output of the replayed commands is discarded, the restart time depends only on the journal tail.
+    :param snapshot_path: path of the snapshot file, a new parking lot is used if the file is not present
+    :param journal_path: path of the journal file
+    :param fsync: fsync policy of the journal, one of FSYNC_POLICIES
+    :return: CommandProcessor object with the restored parking lot and the journal attached
+    """
+    plot, position, sessions = read_snapshot(snapshot_path) if os.path.exists(snapshot_path) \
+        else (ParkingLot(), None, None)
+    cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+    cmd_proc_obj.process_parking_obj.sessions = sessions
+    recover(cmd_proc_obj, journal_path, fsync, snapshot_position=position)
+    return cmd_proc_obj
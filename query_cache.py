@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+# the queries answered from the cache, their results only change when a car of the queried age parks or leaves
+AGE_QUERIES = ("Slot_numbers_for_driver_of_age", "Vehicle_registration_number_for_driver_of_age")
+MAX_ENTRIES = 4096
+
+
+class QueryCache:
+    """
+    QueryCache is a bounded LRU cache of formatted query results, keyed by (command name, age).
+    ParkingLot invalidates the entries of an age when a car of that age parks or leaves, so a cached result is
+    always the same as a fresh query.
+       Usage:
+         entries: OrderedDict of (command name, age) mapped to (output line, return value), least recently used first
+         max_entries: the least recently used entry is evicted when the cache holds more entries
+         hits, misses, invalidations, evictions: counters of the cache
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        :param key: Tuple: (command name, age)
+        :return: Tuple: (output line, return value) of the cached result, None on a cache miss
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, line, value):
+        self.entries[key] = (line, value)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_age(self, age):
+        """ Drops the cached results of the age, called when a car of the age parks or leaves """
+        entries = self.entries
+        for name in AGE_QUERIES:
+            if entries.pop((name, age), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """
+        :return: Dict: counters, size and hit rate of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
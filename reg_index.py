@@ -0,0 +1,124 @@
+import re
+
+# a registration number has 4 segments: state, district, series and number, example- "KA-01-HH-1234"
+NUM_SEGMENTS = 4
+SEGMENT_WIDTHS = (2, 2, 2, 4)
+REG_PREFIX_PATTERN = re.compile(r'[A-Z0-9][A-Z0-9-]*')
+REG_GLOB_PATTERN = re.compile(r'[A-Z0-9?*]+(-[A-Z0-9?*]+){3}')
+
+
+def glob_to_regex(glob):
+    """
+    :param glob: String: registration number pattern, "?" matches one character and "*" any characters of a segment
+    :return: compiled regex of the pattern, example- "KA-*-H?-1234" -> KA-[A-Z0-9]*-H[A-Z0-9]-1234
+    """
+    return re.compile(re.escape(glob).replace(r'\?', '[A-Z0-9]').replace(r'\*', '[A-Z0-9]*'))
+
+
+class RegistrationTrie:
+    """
+    RegistrationTrie is an index of the parked registration numbers by their segments, state -> district -> series
+    -> number -> slot index, used for prefix and pattern queries without a scan of all the slots.
+    A prefix query walks down the segments of the prefix and collects the k slots below the node, a pattern
+    query only scans the children of the levels where its segment has a wildcard.
+       Usage:
+         root: nested dicts of the segments, the dicts of the last level map the number to the slot index
+         size: number of indexed registration numbers
+    """
+
+    def __init__(self, registrations=()):
+        self.root = dict()
+        self.size = 0
+        for reg_num, slot in registrations:
+            self.add(reg_num, slot)
+
+    def add(self, reg_num, slot):
+        state, district, series, number = reg_num.split("-")
+        numbers = self.root.setdefault(state, {}).setdefault(district, {}).setdefault(series, {})
+        if number not in numbers:
+            self.size += 1
+        numbers[number] = slot
+
+    def remove(self, reg_num):
+        """ Removes the registration number, the nodes left without children are removed too """
+        segments = reg_num.split("-")
+        path = [self.root]
+        for segment in segments[:-1]:
+            node = path[-1].get(segment)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].pop(segments[-1], None) is None:
+            return
+        self.size -= 1
+        for depth in range(NUM_SEGMENTS - 1, 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][segments[depth - 1]]
+
+    @staticmethod
+    def collect(node, depth, slots):
+        """ Appends the slots of all the registration numbers below the node, the root is at depth 0 """
+        if depth == NUM_SEGMENTS - 1:
+            slots.extend(node.values())
+        else:
+            for child in node.values():
+                RegistrationTrie.collect(child, depth + 1, slots)
+
+    def prefix_slots(self, prefix):
+        """
+        :param prefix: String: prefix of the registration number example- "KA", "KA-01", "KA-01-HH-12"
+        :return: List: slot indexes of the registration numbers which start with the prefix
+        """
+        segments = prefix.split("-")
+        if len(segments) > NUM_SEGMENTS:
+            return []
+        node = self.root
+        for segment in segments[:-1]:
+            node = node.get(segment)
+            if node is None:
+                return []
+        depth = len(segments) - 1
+        partial = segments[-1]
+        if len(partial) >= SEGMENT_WIDTHS[depth]:
+            child = node.get(partial)
+            if child is None:
+                return []
+            if depth == NUM_SEGMENTS - 1:
+                return [child]
+            slots = []
+            self.collect(child, depth + 1, slots)
+            return slots
+        slots = []
+        for segment, child in node.items():
+            if segment.startswith(partial):
+                if depth == NUM_SEGMENTS - 1:
+                    slots.append(child)
+                else:
+                    self.collect(child, depth + 1, slots)
+        return slots
+
+    def pattern_slots(self, pattern):
+        """
+        :param pattern: String: registration number pattern example- "KA-*-HH-12??"
+        :return: List: slot indexes of the registration numbers which match the pattern
+        """
+        segments = pattern.split("-")
+        if len(segments) != NUM_SEGMENTS:
+            return []
+        matchers = [None if not ("?" in segment or "*" in segment) else
+                    (True if segment == "*" else glob_to_regex(segment).fullmatch) for segment in segments]
+        nodes = [self.root]
+        for segment, matcher in zip(segments, matchers):
+            children = []
+            for node in nodes:
+                if matcher is None:
+                    child = node.get(segment)
+                    if child is not None:
+                        children.append(child)
+                elif matcher is True:
+                    children.extend(node.values())
+                else:
+                    children.extend(child for key, child in node.items() if matcher(key))
+            nodes = children
+        return nodes
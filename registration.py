@@ -0,0 +1,26 @@
+# Packed encoding of the registration numbers matching [A-Z]{2}-\d{2}-[A-Z]{2}-\d{4}, example- "KA-01-HH-1234".
+# The 10 characters without the dashes are read as one base 36 integer (digits 0-9 then letters A-Z), it is parsed
+# by int() in C, fits in 52 bits and is never 0 (the empty slot of storage.PackedSlots) as the state is letters.
+# The packed numbers sort in the same order as the registration numbers.
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NUM_CHARS = 10
+
+
+def pack_registration(reg_num):
+    """
+    :param reg_num: String: registration number example- "KA-01-HH-1234"
+    :return: Integer: the registration number packed in 52 bits
+    """
+    return int(reg_num.replace("-", ""), 36)
+
+
+def unpack_registration(packed):
+    """
+    :param packed: Integer: registration number packed by pack_registration()
+    :return: String: the registration number example- "KA-01-HH-1234"
+    """
+    chars = [""] * NUM_CHARS
+    for index in range(NUM_CHARS - 1, -1, -1):
+        packed, digit = divmod(packed, 36)
+        chars[index] = DIGITS[digit]
+    return f"{chars[0]}{chars[1]}-{chars[2]}{chars[3]}-{chars[4]}{chars[5]}-{''.join(chars[6:])}"
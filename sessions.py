@@ -0,0 +1,137 @@
+from array import array
+
+# parking fee of every started billing period, example- 10 per started hour
+HOURLY_RATE = 10
+BILLING_PERIOD = 3600
+PERCENTILES = (50, 90, 99)
+
+
+def import_numpy():
+    """
+    NumPy is imported by the first report, not at startup
+    :return: the numpy module, None if it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class SessionStore:
+    """
+    SessionStore is an append only columnar store of the completed parking sessions, a session is added when a car
+    parked with "Park ... at <timestamp>" leaves with "Leave <slot> at <timestamp>".
+    Every column is an array of int64, so the billing report runs one pass over the columns, vectorized with
+    NumPy when it is installed and a pure Python loop otherwise, both give the same report.
+       Usage:
+         slots, ages, park_times, leave_times: columns of the completed sessions, one row per session
+         open_sessions: dict of slot index mapped to (age, park timestamp) of the parked cars with a timestamp
+         rate: fee of every started billing period of a session
+         period: billing period in seconds
+    """
+
+    def __init__(self, rate=HOURLY_RATE, period=BILLING_PERIOD):
+        self.rate = rate
+        self.period = period
+        self.slots = array('q')
+        self.ages = array('q')
+        self.park_times = array('q')
+        self.leave_times = array('q')
+        self.open_sessions = dict()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def open(self, slot, age, timestamp):
+        self.open_sessions[slot] = (age, timestamp)
+
+    def discard(self, slot):
+        """ Forgets the open session of the slot, the car left without a timestamp """
+        self.open_sessions.pop(slot, None)
+
+    def fee(self, dwell):
+        """
+        :param dwell: Integer: parking time in seconds
+        :return: Integer: fee of the session, rate for every started billing period
+        """
+        return -(-dwell // self.period) * self.rate
+
+    def close(self, slot, timestamp):
+        """
+        Appends the session of the car parked in the slot
+        :param slot: Integer: index of the slot
+        :param timestamp: Integer: leave time in seconds
+        :return: Integer: dwell time in seconds, None if the car was parked without a timestamp
+        """
+        session = self.open_sessions.pop(slot, None)
+        if session is None:
+            return None
+        age, park_time = session
+        self.slots.append(slot)
+        self.ages.append(age)
+        self.park_times.append(park_time)
+        self.leave_times.append(timestamp)
+        return timestamp - park_time
+
+    def report(self, start=None, end=None):
+        """
+        :param start: Integer: only the sessions which left at or after start are reported
+        :param end: Integer: only the sessions which left before end are reported
+        :return: Tuple: (total revenue, number of sessions, dict of slot index mapped to (revenue, sessions),
+                 dict of age mapped to (revenue, sessions), dict of percentile mapped to dwell time)
+        """
+        np = import_numpy()
+        if np is not None:
+            return self._report_numpy(np, start, end)
+        return self._report_python(start, end)
+
+    def _report_numpy(self, np, start, end):
+        slots, ages, park_times, leave_times = (
+            np.frombuffer(column, dtype=np.int64) if len(column) else np.zeros(0, dtype=np.int64)
+            for column in (self.slots, self.ages, self.park_times, self.leave_times))
+        if start is not None or end is not None:
+            mask = np.ones(len(slots), dtype=bool)
+            if start is not None:
+                mask &= leave_times >= start
+            if end is not None:
+                mask &= leave_times < end
+            slots, ages, park_times, leave_times = slots[mask], ages[mask], park_times[mask], leave_times[mask]
+        dwell = leave_times - park_times
+        fees = -(-dwell // self.period) * self.rate
+        per_slot, per_age = {}, {}
+        for keys, grouped in ((slots, per_slot), (ages, per_age)):
+            unique_keys, groups = np.unique(keys, return_inverse=True)
+            revenue = np.bincount(groups, weights=fees, minlength=len(unique_keys)).astype(np.int64)
+            counts = np.bincount(groups, minlength=len(unique_keys))
+            grouped.update(zip(unique_keys.tolist(), zip(revenue.tolist(), counts.tolist())))
+        dwell.sort()
+        return int(fees.sum()), len(dwell), per_slot, per_age, self._percentiles(dwell.tolist())
+
+    def _report_python(self, start, end):
+        period, rate = self.period, self.rate
+        per_slot, per_age = {}, {}
+        dwells = []
+        total = 0
+        for slot, age, park_time, leave_time in zip(self.slots, self.ages, self.park_times, self.leave_times):
+            if (start is not None and leave_time < start) or (end is not None and leave_time >= end):
+                continue
+            dwell = leave_time - park_time
+            fee = -(-dwell // period) * rate
+            total += fee
+            dwells.append(dwell)
+            revenue, count = per_slot.get(slot, (0, 0))
+            per_slot[slot] = (revenue + fee, count + 1)
+            revenue, count = per_age.get(age, (0, 0))
+            per_age[age] = (revenue + fee, count + 1)
+        dwells.sort()
+        return (total, len(dwells), dict(sorted(per_slot.items())), dict(sorted(per_age.items())),
+                self._percentiles(dwells))
+
+    @staticmethod
+    def _percentiles(sorted_dwells):
+        """ Nearest rank percentiles of the sorted dwell times """
+        if not sorted_dwells:
+            return {}
+        return {percentile: sorted_dwells[max(0, -(-percentile * len(sorted_dwells) // 100) - 1)]
+                for percentile in PERCENTILES}
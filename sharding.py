@@ -0,0 +1,194 @@
+import multiprocessing
+import traceback
+
+from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor
+
+LOT_COMMAND = b"Lot"
+EMPTY_COMMAND_ERROR = "Cannot process the command. Invalid Command Format"
+COMMAND_ERROR = "Cannot process the command"
+
+
+class ShardError(RuntimeError):
+    """ Error raised by a command in a worker of the MultiLotEngine, the message holds the traceback of the worker """
+
+
+class LotShard:
+    """
+    LotShard holds the parking lots handled by one worker of the MultiLotEngine.
+    Each lot has its own ParkingLot, ParkingProcessor and CommandProcessor which are created on its first command.
+       Usage:
+         lots: dict of lot id mapped to the CommandProcessor of the lot
+         lines: output lines of the command being processed
+    """
+
+    def __init__(self, storage="list"):
+        self.storage = storage
+        self.lots = dict()
+        self.lines = list()
+
+    def get_command_processor(self, lot_id):
+        cmd_proc_obj = self.lots.get(lot_id)
+        if cmd_proc_obj is None:
+            cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot(storage=self.storage)))
+            cmd_proc_obj.set_emit(self.lines.append)
+            self.lots[lot_id] = cmd_proc_obj
+        return cmd_proc_obj
+
+    def process_batch(self, batch):
+        """
+        :param batch: list of (lot_id, command) bytes example- [(b"A1", b"Park KA-01-HH-1234 driver_age 21")]
+        :return: list with the output of each command, lines are prefixed with the lot id example- "Lot A1: 1,2"
+                None for the commands which have no output, a command which raises an error gets a single
+                COMMAND_ERROR line and the other commands and lots go on
+        """
+        results = []
+        lines = self.lines
+        for lot_id, command in batch:
+            try:
+                self.get_command_processor(lot_id).process_command(command.decode().split())
+            except Exception as error:
+                lines.clear()
+                lines.append(f"{COMMAND_ERROR} ({error!r})")
+            if lines:
+                prefix = f"Lot {lot_id.decode()}: "
+                results.append("\n".join(prefix + str(line) for line in lines))
+                lines.clear()
+            else:
+                results.append(None)
+        return results
+
+
+def shard_worker(conn, storage):
+    """
+    Worker process of the MultiLotEngine, processes the batches received on the pipe till None is received.
+    The errors of the commands are answered in their results, any other error stops the worker and is sent back
+    as a ShardError in place of the results.
+    """
+    shard = LotShard(storage)
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            break
+        try:
+            results = shard.process_batch(batch)
+        except Exception:
+            conn.send(ShardError(traceback.format_exc()))
+            break
+        conn.send(results)
+    conn.close()
+
+
+class MultiLotEngine:
+    """
+    MultiLotEngine processes the commands of many independent parking lots, sharded across worker processes.
+    Multi lot command format- "Lot <lot_id> <command>" example- "Lot A1 Park KA-01-HH-1234 driver_age 21"
+    Each lot is pinned to one worker, in the order in which the lots first appear, so the commands of a lot are
+    executed in the input order. The outputs are merged back in the input order, so the output does not
+    depend on the number of workers.
+       Usage:
+         workers: number of worker processes, 0 processes all the lots in the current process
+         batch_size: number of commands sent to the workers at once
+         shard_of_lot: dict of lot id mapped to the index of its worker
+    """
+    BATCH_SIZE = 20000
+
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, storage="list"):
+        if storage not in ("list", "compact", "packed", "lazy"):
+            raise ValueError(f"Unknown parking lot storage {storage}")
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        self.batch_size = batch_size
+        self.storage = storage
+        self.shard_of_lot = dict()
+        self.emit = print
+
+    def execute_commands(self, file_obj):
+        """
+        Will execute all the multi lot commands which are present in the input file
+        :param file_obj: FileUtility object with the loaded input file
+        :return: None
+        """
+        if not file_obj or not file_obj.file:
+            self.emit("Input File not found to process")
+            return
+        if self.workers == 0:
+            shard = LotShard(self.storage)
+            self.run(file_obj.iter_lines(), [shard.process_batch])
+            return
+        connections, processes = [], []
+        for _ in range(self.workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(child_conn, self.storage), daemon=True)
+            process.start()
+            child_conn.close()
+            connections.append(parent_conn)
+            processes.append(process)
+        try:
+            self.run(file_obj.iter_lines(), connections)
+        finally:
+            for conn, process in zip(connections, processes):
+                if process.is_alive():
+                    try:
+                        conn.send(None)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                conn.close()
+            for process in processes:
+                process.join()
+
+    def run(self, lines, shards):
+        """
+        Splits the lines in batches, sends each batch to the shards and emits the merged output
+        :param lines: iterable of the input lines as bytes
+        :param shards: pipe connections of the workers, or functions processing a batch in the current process
+        :return: None
+        """
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= self.batch_size:
+                self.run_batch(batch, shards)
+                batch = []
+        if batch:
+            self.run_batch(batch, shards)
+
+    def run_batch(self, batch, shards):
+        shard_batches = [[] for _ in shards]
+        order = []
+        for line in batch:
+            command_toks = line.split(None, 2)
+            if not command_toks:
+                order.append(EMPTY_COMMAND_ERROR)
+                continue
+            if len(command_toks) < 3 or command_toks[0] != LOT_COMMAND:
+                order.append('Invalid "Lot" Command Format')
+                continue
+            lot_id = command_toks[1]
+            shard_index = self.shard_of_lot.get(lot_id)
+            if shard_index is None:
+                shard_index = self.shard_of_lot[lot_id] = len(self.shard_of_lot) % len(shards)
+            shard_batches[shard_index].append((lot_id, command_toks[2]))
+            order.append(shard_index)
+        if callable(shards[0]):
+            shard_results = [iter(shards[0](shard_batches[0]))]
+        else:
+            for conn, shard_batch in zip(shards, shard_batches):
+                conn.send(shard_batch)
+            shard_results = [iter(self.receive(conn, shard_index)) for shard_index, conn in enumerate(shards)]
+        for entry in order:
+            output = next(shard_results[entry]) if entry.__class__ is int else entry
+            if output is not None:
+                self.emit(output)
+
+    @staticmethod
+    def receive(conn, shard_index):
+        """
+        :return: List: results of the batch sent to the worker
+        raises ShardError when a command failed in the worker or the worker exited
+        """
+        try:
+            results = conn.recv()
+        except EOFError:
+            raise ShardError(f"worker {shard_index} exited without results") from None
+        if isinstance(results, ShardError):
+            raise results
+        return results
@@ -0,0 +1,168 @@
+from array import array
+
+from itertools import repeat
+
+from registration import pack_registration, unpack_registration
+
+REG_NUM_WIDTH = 13
+MAX_PACKED_AGE = 0xFFFF
+
+
+class CompactSlots:
+    """
+    CompactSlots is a columnar, array backed replacement of the list of vehicle dicts used by ParkingLot.
+    It behaves like the list of slots: slots[i] returns {"reg_num": ..., "age": ...} or None for an empty slot
+    and slots[i] = {...} / None parks or vacates the slot, so ParkingProcessor runs on it unchanged.
+       Usage:
+         ages: array('H') with the driver age of each slot
+         reg_nums: fixed width ascii bytes of the registration number of each slot, empty slots are zero filled
+         large_ages: ages which do not fit in array('H') are kept here, the slot age is set to MAX_PACKED_AGE
+    """
+
+    __slots__ = ("ages", "reg_nums", "large_ages")
+
+    def __init__(self, num_of_slots=0):
+        self.ages = array('H', bytes(2 * num_of_slots))
+        self.reg_nums = bytearray(REG_NUM_WIDTH * num_of_slots)
+        self.large_ages = dict()
+
+    def __len__(self):
+        return len(self.ages)
+
+    def _index(self, index):
+        if index < 0:
+            index += len(self.ages)
+        if not 0 <= index < len(self.ages):
+            raise IndexError("slot index out of range")
+        return index
+
+    def __getitem__(self, index):
+        index = self._index(index)
+        offset = index * REG_NUM_WIDTH
+        if not self.reg_nums[offset]:
+            return None
+        age = self.ages[index]
+        if age == MAX_PACKED_AGE:
+            age = self.large_ages[index]
+        return {"reg_num": self.reg_nums[offset:offset + REG_NUM_WIDTH].decode('ascii'), "age": age}
+
+    def __setitem__(self, index, vehicle_data):
+        index = self._index(index)
+        offset = index * REG_NUM_WIDTH
+        self.large_ages.pop(index, None)
+        if vehicle_data is None:
+            self.reg_nums[offset:offset + REG_NUM_WIDTH] = bytes(REG_NUM_WIDTH)
+            self.ages[index] = 0
+            return
+        reg_num = vehicle_data["reg_num"].encode('ascii')
+        if len(reg_num) != REG_NUM_WIDTH:
+            raise ValueError(f"Registration number should be {REG_NUM_WIDTH} characters long")
+        age = vehicle_data["age"]
+        if age >= MAX_PACKED_AGE:
+            self.large_ages[index] = age
+            age = MAX_PACKED_AGE
+        self.reg_nums[offset:offset + REG_NUM_WIDTH] = reg_num
+        self.ages[index] = age
+
+    def __iter__(self):
+        for index in range(len(self.ages)):
+            yield self[index]
+
+
+class PackedSlots:
+    """
+    PackedSlots is the slot storage of the "packed" parking lot, the registration numbers are kept packed in
+    int64 (see registration.pack_registration) and only decoded when a slot is read for the output.
+    It behaves like the list of slots, same as CompactSlots.
+       Usage:
+         ages: array('H') with the driver age of each slot
+         reg_keys: array('q') with the packed registration number of each slot, 0 for an empty slot
+         large_ages: ages which do not fit in array('H') are kept here, the slot age is set to MAX_PACKED_AGE
+    """
+
+    __slots__ = ("ages", "reg_keys", "large_ages")
+
+    def __init__(self, num_of_slots=0):
+        self.ages = array('H', bytes(2 * num_of_slots))
+        self.reg_keys = array('q', bytes(8 * num_of_slots))
+        self.large_ages = dict()
+
+    def __len__(self):
+        return len(self.ages)
+
+    def __getitem__(self, index):
+        reg_key = self.reg_keys[index]
+        if not reg_key:
+            return None
+        age = self.ages[index]
+        if age == MAX_PACKED_AGE:
+            age = self.large_ages[index % len(self.ages)]
+        return {"reg_num": unpack_registration(reg_key), "age": age}
+
+    def __setitem__(self, index, vehicle_data):
+        if index < 0:
+            index += len(self.ages)
+        self.large_ages.pop(index, None)
+        if vehicle_data is None:
+            self.reg_keys[index] = 0
+            self.ages[index] = 0
+            return
+        self.set_packed(index, pack_registration(vehicle_data["reg_num"]), vehicle_data["age"])
+
+    def set_packed(self, index, reg_key, age):
+        """ Parks the car with the packed registration number in the slot """
+        if age >= MAX_PACKED_AGE:
+            self.large_ages[index] = age
+            age = MAX_PACKED_AGE
+        self.reg_keys[index] = reg_key
+        self.ages[index] = age
+
+    def __iter__(self):
+        for index in range(len(self.ages)):
+            yield self[index]
+
+
+class LazySlots:
+    """
+    LazySlots is the slot storage of the "lazy" parking lot, the list of vehicle dicts is materialized as cars park:
+    it only holds the slots up to the highest slot ever parked, the slots after it are empty.
+    Create_parking_lot is O(1) and a lot which stays mostly empty takes memory for the used slots only.
+    It behaves like the list of slots, same as CompactSlots.
+       Usage:
+         num_slots: number of slots of the parking lot
+         vehicles: list of the materialized slots, vehicle dict or None
+    """
+
+    __slots__ = ("num_slots", "vehicles")
+
+    def __init__(self, num_of_slots=0):
+        self.num_slots = num_of_slots
+        self.vehicles = []
+
+    def __len__(self):
+        return self.num_slots
+
+    def _index(self, index):
+        if index < 0:
+            index += self.num_slots
+        if not 0 <= index < self.num_slots:
+            raise IndexError("slot index out of range")
+        return index
+
+    def __getitem__(self, index):
+        index = self._index(index)
+        vehicles = self.vehicles
+        return vehicles[index] if index < len(vehicles) else None
+
+    def __setitem__(self, index, vehicle_data):
+        index = self._index(index)
+        vehicles = self.vehicles
+        if index >= len(vehicles):
+            if vehicle_data is None:
+                return
+            vehicles.extend(repeat(None, index + 1 - len(vehicles)))
+        vehicles[index] = vehicle_data
+
+    def __iter__(self):
+        yield from self.vehicles
+        yield from repeat(None, self.num_slots - len(self.vehicles))
@@ -1,5 +1,31 @@
+import asyncio
+import gzip
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
-from virtual_parking import ParkingProcessor, ParkingLot, CommandProcessor, FileUtility
+import unittest.mock
+import warnings
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
+from age_index import AgeIndex
+from concurrency import ConcurrentParkingLot, ReadWriteLock
+from gate_server import GateServer
+from instrumentation import Instrumentation
+from persistence import (FSYNC_POLICIES, SNAPSHOT_HEADER, SNAPSHOT_HEADERS, Journal, checkpoint, load_snapshot,
+                         read_snapshot, recover, restore, save_snapshot)
+from registration import pack_registration, unpack_registration
+import sessions as sessions_module
+from sharding import LotShard, MultiLotEngine, ShardError
+from utils import LazyPattern
+from virtual_parking import NUMBER_PATTERN, REG_NUM_PATTERN, ParkingProcessor, ParkingLot, CommandProcessor, FileUtility
 
 
 class ParkingLotTest(unittest.TestCase):
@@ -109,6 +135,14 @@ class CommandProcessorTest(unittest.TestCase):
         self.assertEqual(len(self.plot.slots), 0)
         self.assertEqual(self.plot.total_slots, None)
 
+    def test_register_command(self):
+        """ Testing register_command() adds a new command to the dispatch table """
+        cmd_proc_obj = CommandProcessor(self.file_obj, self.park_processor_obj)
+        received = []
+        cmd_proc_obj.register_command('Ping', received.append)
+        cmd_proc_obj.process_command("Ping gate-1".split())
+        self.assertEqual(received, [['Ping', 'gate-1']])
+
     def test_execute_command_valid(self):
         """
          Testing execute_command() function with use of create_parking_lot and \
@@ -119,7 +153,56 @@ class CommandProcessorTest(unittest.TestCase):
         cmd_proc_obj.execute_commands()
         self.assertEqual(len(self.plot.slots), 2)
         self.assertEqual(self.plot.total_slots, 2)
-        self.assertEqual(self.plot.age_slot_dict, {21: [], 12: [2]})
+        self.assertEqual({age: list(slots) for age, slots in self.plot.age_slot_dict.items()}, {21: [], 12: [2]})
+
+    def test_execute_commands_batch(self):
+        """ Testing execute_commands_batch() output is byte identical to execute_commands() output """
+        printed = io.StringIO()
+        self.file_obj.load_file("test_files/inp.txt")
+        with redirect_stdout(printed):
+            CommandProcessor(self.file_obj, self.park_processor_obj).execute_commands()
+        batched = io.BytesIO()
+        file_obj = FileUtility()
+        file_obj.load_file("test_files/inp.txt")
+        cmd_proc_obj = CommandProcessor(file_obj, ParkingProcessor(ParkingLot()))
+        cmd_proc_obj.execute_commands_batch(batched, chunk_lines=4)
+        self.assertEqual(batched.getvalue(), printed.getvalue().encode())
+        self.assertIs(cmd_proc_obj.emit, print)
+
+
+class FileUtilityTest(unittest.TestCase):
+    """
+        Test class: FileUtilityTest
+            Contains unittest cases to test the streaming of input files by FileUtility
+    """
+
+    def setUp(self) -> None:
+        with open("test_files/inp.txt") as input_file:
+            self.commands = [line.split() for line in input_file]
+
+    def test_iter_commands_small_blocks(self):
+        """ Testing iter_commands() with lines spanning across the blocks read from the file """
+        file_obj = FileUtility(block_size=5)
+        file_obj.load_file("test_files/inp.txt")
+        self.assertEqual(list(file_obj.iter_commands()), self.commands)
+
+    def test_iter_commands_gzip(self):
+        """ Testing iter_commands() with gzip compressed input file """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gz_path = os.path.join(tmp_dir, "inp.txt.gz")
+            with open("test_files/inp.txt", 'rb') as input_file, gzip.open(gz_path, 'wb') as gz_file:
+                gz_file.write(input_file.read())
+            file_obj = FileUtility()
+            file_obj.load_file(gz_path)
+            self.assertEqual(list(file_obj.iter_commands()), self.commands)
+            file_obj.file.close()
+
+    def test_load_file_missing(self):
+        """ Testing load_file() with a file which is not present """
+        file_obj = FileUtility()
+        with redirect_stdout(io.StringIO()):
+            file_obj.load_file("test_files/missing.txt")
+        self.assertEqual(file_obj.file, None)
 
 
 class ParkingProcessorTest(unittest.TestCase):
@@ -167,6 +250,15 @@ class ParkingProcessorTest(unittest.TestCase):
         self.assertEqual(self.plot.avail_slot, 3)
         self.assertEqual(self.plot.slot_heap[0], 1)
 
+    def test_exit_vehicle_keeps_age_order(self):
+        """
+             Testing exit_vehicle() function keeps the parking order of the remaining slots of that age
+        """
+        self.park_processor_obj.exit_vehicle("Leave 1".split())
+        self.park_processor_obj.park_vehicle("Park TS-08-GH-1645 driver_age 21".split())
+        slot_nums = self.park_processor_obj.get_slots_by_age("Slot_numbers_for_driver_of_age 21".split())
+        self.assertEqual(slot_nums, '2,1')
+
     def test_get_slots_by_age(self):
         """
              Testing get_slots_by_age() function with different inputs -
@@ -207,6 +299,1155 @@ class ParkingProcessorTest(unittest.TestCase):
         self.assertEqual(veh_nums, "KA-01-HH-1234,PB-01-HH-1234")
 
 
+class CompactStorageTest(unittest.TestCase):
+    """
+        Test class: CompactStorageTest
+            Contains unittest cases to test the ParkingLot "compact" slot storage
+    """
+
+    def setUp(self) -> None:
+        self.plot = ParkingLot(storage="compact")
+        self.plot.create_parkinglot(['Create_parking_lot', '3'])
+        self.park_processor_obj = ParkingProcessor(self.plot)
+
+    def test_park_and_exit(self):
+        """ Testing park_vehicle() and exit_vehicle() functions on compact storage """
+        self.park_processor_obj.park_vehicle("Park KA-01-HH-1234 driver_age 21".split())
+        self.park_processor_obj.park_vehicle("Park PB-01-HH-1234 driver_age 21".split())
+        self.assertEqual(self.plot.slots[1], {'reg_num': 'PB-01-HH-1234', 'age': 21})
+        self.park_processor_obj.exit_vehicle("Leave 1".split())
+        self.assertEqual(self.plot.slots[0], None)
+        self.assertEqual(self.park_processor_obj.get_vehiclenums_by_age(
+            "Vehicle_registration_number_for_driver_of_age 21".split()), "PB-01-HH-1234")
+
+    def test_large_age(self):
+        """ Testing ages which do not fit in the packed age column """
+        self.park_processor_obj.park_vehicle("Park KA-01-HH-1234 driver_age 70000".split())
+        self.assertEqual(self.plot.slots[0]['age'], 70000)
+        self.park_processor_obj.exit_vehicle("Leave 1".split())
+        self.assertEqual(self.plot.slots.large_ages, {})
+
+    def test_memory_footprint(self):
+        """ Comparing memory footprint of list and compact storage with 10^6 parked vehicles """
+        num_of_slots = 10 ** 6
+        footprint = {}
+        for storage in ("list", "compact"):
+            plot = ParkingLot(storage=storage)
+            plot.create_parkinglot(['Create_parking_lot', str(num_of_slots)])
+            for slot in range(num_of_slots):
+                plot.slots[slot] = {"reg_num": f"KA-{slot // 10000:02d}-HH-{slot % 10000:04d}", "age": slot % 80}
+            if storage == "compact":
+                footprint[storage] = sum(sys.getsizeof(column) for column in
+                                         (plot.slots.ages, plot.slots.reg_nums, plot.slots.large_ages))
+            else:
+                footprint[storage] = sys.getsizeof(plot.slots) + sum(
+                    sys.getsizeof(vehicle) + sys.getsizeof(vehicle['reg_num']) for vehicle in plot.slots)
+        self.assertLess(footprint['compact'] * 5, footprint['list'])
+
+
+class PackedStorageTest(unittest.TestCase):
+    """
+        Test class: PackedStorageTest
+            Contains unittest cases to test the ParkingLot "packed" storage and the packed registration numbers
+    """
+
+    def run_commands(self, storage, commands):
+        output = []
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot(storage=storage)))
+        cmd_proc_obj.set_emit(output.append)
+        for command_toks in commands:
+            cmd_proc_obj.process_command(command_toks)
+        return output, cmd_proc_obj.process_parking_obj.parkinglot_obj
+
+    def test_pack_registration(self):
+        """ Testing packed registration numbers decode back and keep the order of the registration numbers """
+        reg_nums = sorted(["AA-00-AA-0000", "ZZ-99-ZZ-9999", "KA-01-HH-1234", "KA-01-HH-1235", "KA-10-AB-0001"])
+        packed = [pack_registration(reg_num) for reg_num in reg_nums]
+        self.assertEqual(packed, sorted(packed))
+        self.assertEqual([unpack_registration(reg_key) for reg_key in packed], reg_nums)
+        self.assertLess(packed[-1], 1 << 52)
+
+    def test_same_output_as_list(self):
+        """ Testing the packed storage gives the same output as the list storage """
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file if line.split()]
+        commands += ["Slot_numbers_for_registration_prefix KA".split(),
+                     "Slot_numbers_for_registration_pattern *-*-*-1234".split(), "Leave 3".split()]
+        output, plot = self.run_commands("packed", commands)
+        list_output, list_plot = self.run_commands("list", commands)
+        self.assertEqual(output, list_output)
+        self.assertEqual(plot.reg_slot_dict, {pack_registration(reg_num): slot
+                                              for reg_num, slot in list_plot.reg_slot_dict.items()})
+        plot.enable_reg_index()
+        self.assertEqual(plot.reg_index.size, len(plot.reg_slot_dict))
+
+    def test_save_load_snapshot(self):
+        """ Testing a snapshot of the packed storage loads back with the packed registration numbers """
+        _, plot = self.run_commands("packed", [
+            "Create_parking_lot 4".split(), "Park KA-01-HH-1234 driver_age 21".split(),
+            "Park KA-01-HH-9999 driver_age 70000".split()])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_snapshot(plot, os.path.join(tmp_dir, "lot.snapshot"))
+            restored = load_snapshot(os.path.join(tmp_dir, "lot.snapshot"))
+        self.assertEqual(restored.storage, "packed")
+        self.assertEqual(restored.reg_slot_dict, plot.reg_slot_dict)
+        self.assertEqual(list(restored.slots), list(plot.slots))
+        self.assertEqual(restored.get_slot_by_reg("KA-01-HH-9999"), 1)
+
+
+class MultiLotEngineTest(unittest.TestCase):
+    """
+        Test class: MultiLotEngineTest
+            Contains unittest cases to test the sharded processing of multi lot commands
+    """
+
+    def execute(self, workers, batch_size=MultiLotEngine.BATCH_SIZE):
+        file_obj = FileUtility()
+        file_obj.load_file("test_files/multi_lot.txt")
+        engine = MultiLotEngine(workers, batch_size=batch_size)
+        output = []
+        engine.emit = output.append
+        engine.execute_commands(file_obj)
+        return output
+
+    def test_execute_commands_in_process(self):
+        """ Testing each lot keeps its own state and the output is merged in the input order """
+        output = self.execute(workers=0)
+        self.assertEqual(output[:2], ["Lot A: Created parking of 2 slots", "Lot B: Created parking of 3 slots"])
+        self.assertEqual(output[5], "Lot A: Sorry! No Parking spaces available")
+        self.assertEqual(output[7], 'Invalid "Lot" Command Format')
+        self.assertEqual(output[-2:], ["Lot A: Slot number 1 vacated, the car with vehicle registration number "
+                                       "KA-01-HH-1234 left the space, the driver of the car was of age 21",
+                                       "Lot A: 2"])
+
+    def test_blank_line_and_failing_command(self):
+        """ Testing a blank line gets the single lot error and a failing command of a lot gets an error line
+        while the other lots go on """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "lots.txt")
+            with open(path, "w") as input_file:
+                input_file.write("Lot A Create_parking_lot 2\nLot B Create_parking_lot 2\n\nLot A Leave 5\n"
+                                 "Lot B Park KA-01-HH-1234 driver_age 21\nLot A Park KA-01-HH-9999 driver_age 30\n")
+            for workers in (0, 2):
+                file_obj = FileUtility()
+                file_obj.load_file(path)
+                engine = MultiLotEngine(workers)
+                output = []
+                engine.emit = output.append
+                engine.execute_commands(file_obj)
+                file_obj.file.close()
+                self.assertEqual(output, [
+                    "Lot A: Created parking of 2 slots", "Lot B: Created parking of 2 slots",
+                    "Cannot process the command. Invalid Command Format",
+                    "Lot A: Cannot process the command (IndexError('list index out of range'))",
+                    "Lot B: Car with vehicle registration number KA-01-HH-1234 has been parked at slot number 1",
+                    "Lot A: Car with vehicle registration number KA-01-HH-9999 has been parked at slot number 1"])
+        parent_conn, child_conn = multiprocessing.Pipe()
+        child_conn.close()
+        with self.assertRaises(ShardError):
+            MultiLotEngine.receive(parent_conn, 0)
+        parent_conn.close()
+        with self.assertRaises(ValueError):
+            MultiLotEngine(0, storage="bogus")
+        engine = MultiLotEngine(0)
+        output = []
+        engine.emit = output.append
+        engine.run([b"Lot A Create_parking_lot 2", b"", b"Lot A Park KA-01-HH-1234 driver_age 21"],
+                   [LotShard().process_batch])
+        self.assertEqual(output[1], "Cannot process the command. Invalid Command Format")
+
+    def test_execute_commands_workers(self):
+        """ Testing the output does not depend on the number of workers and the batch size """
+        expected = self.execute(workers=0)
+        self.assertEqual(self.execute(workers=2, batch_size=3), expected)
+        self.assertEqual(self.execute(workers=3), expected)
+
+
+class PersistenceTest(unittest.TestCase):
+    """
+        Test class: PersistenceTest
+            Contains unittest cases to test snapshot, journal and restore of the parking lot state
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.tmp_dir.name, "lot.snapshot")
+        self.journal_path = os.path.join(self.tmp_dir.name, "lot.journal")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def assert_same_state(self, plot, expected):
+        self.assertEqual(list(plot.slots), list(expected.slots))
+        self.assertEqual(plot.total_slots, expected.total_slots)
+        self.assertEqual(plot.avail_slot, expected.avail_slot)
+        self.assertEqual(plot.reg_slot_dict, expected.reg_slot_dict)
+        self.assertEqual(plot.slot_heap, expected.slot_heap)
+        self.assertEqual({age: list(slots) for age, slots in plot.age_slot_dict.items() if slots},
+                         {age: list(slots) for age, slots in expected.age_slot_dict.items() if slots})
+
+    def test_save_load_snapshot(self):
+        """ Testing load_snapshot() restores the state saved by save_snapshot() for every storage """
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file if line.split()]
+        for storage in ("list", "compact", "packed", "lazy"):
+            plot = ParkingLot(storage=storage)
+            cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+            cmd_proc_obj.set_emit(lambda line: None)
+            for command_toks in commands:
+                cmd_proc_obj.process_command(command_toks)
+            save_snapshot(plot, self.snapshot_path)
+            restored = load_snapshot(self.snapshot_path)
+            self.assertEqual(restored.storage, storage)
+            self.assert_same_state(restored, plot)
+        plot = DataDump.create_parking_lot_data()
+        plot.allocator_name = "segment_tree"
+        save_snapshot(plot, self.snapshot_path)
+        restored = load_snapshot(self.snapshot_path)
+        self.assertEqual(restored.allocator_name, "segment_tree")
+        self.assertEqual(restored.get_emptyslot(), plot.get_emptyslot())
+
+    def test_load_older_snapshot_versions(self):
+        """ Testing the snapshots of version 1 (no journal position) and 2 (no sessions) still load """
+        plot = DataDump.create_parking_lot_data()
+        save_snapshot(plot, self.snapshot_path, (3, 120))
+        with open(self.snapshot_path, 'rb') as snapshot_file:
+            snapshot = snapshot_file.read()
+        fields = SNAPSHOT_HEADER.unpack_from(snapshot)
+        body = snapshot[SNAPSHOT_HEADER.size:]
+        for version, num_fields, position in ((1, 10, None), (2, 12, (3, 120))):
+            with open(self.snapshot_path, 'wb') as snapshot_file:
+                snapshot_file.write(SNAPSHOT_HEADERS[version].pack(fields[0], version, *fields[2:num_fields]))
+                snapshot_file.write(body)
+            restored, restored_position, sessions = read_snapshot(self.snapshot_path)
+            self.assert_same_state(restored, plot)
+            self.assertEqual(restored_position, position)
+            self.assertIsNone(sessions)
+
+    def test_restore_from_snapshot_and_journal(self):
+        """ Testing restore() replays only the commands journaled after the last checkpoint """
+        plot = ParkingLot()
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+        cmd_proc_obj.journal = Journal(self.journal_path)
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file]
+        with redirect_stdout(io.StringIO()):
+            for command_toks in commands[:8]:
+                cmd_proc_obj.process_command(command_toks)
+            checkpoint(cmd_proc_obj, self.snapshot_path)
+            for command_toks in commands[8:]:
+                cmd_proc_obj.process_command(command_toks)
+        cmd_proc_obj.journal.close()
+        with open(self.journal_path) as journal_file:
+            self.assertEqual(journal_file.read().splitlines(), ["#journal 2",
+                "Park PB-01-TG-2341 driver_age 40", "Park PB-01-TG-2301 driver_age 40",
+                "Park PB-01-TG-2361 driver_age 40", "Leave 2", "Park HR-29-TG-3098 driver_age 39"])
+        restored = restore(self.snapshot_path, self.journal_path)
+        restored.journal.close()
+        self.assert_same_state(restored.process_parking_obj.parkinglot_obj, plot)
+
+    def test_crash_during_checkpoint(self):
+        """ Testing a crash after the snapshot is saved and before the journal is emptied replays only the tail """
+        plot = ParkingLot()
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+        cmd_proc_obj.set_emit(lambda line: None)
+        recover(cmd_proc_obj, self.journal_path)
+        for command in ("Create_parking_lot 6", "Park KA-01-HH-1234 driver_age 30", "Park KA-01-HH-9999 driver_age 30"):
+            cmd_proc_obj.process_command(command.split())
+        save_snapshot(plot, self.snapshot_path, cmd_proc_obj.journal.position())
+        cmd_proc_obj.process_command("Park KA-01-HH-7777 driver_age 30".split())
+        cmd_proc_obj.journal.close()
+        restored = restore(self.snapshot_path, self.journal_path)
+        restored_plot = restored.process_parking_obj.parkinglot_obj
+        self.assert_same_state(restored_plot, plot)
+        self.assertEqual(list(restored_plot.age_slot_dict[30]), [1, 2, 3])
+        restored.set_emit(lambda line: None)
+        restored.process_command("Leave 1".split())
+        checkpoint(restored, self.snapshot_path)
+        restored.process_command("Park KA-01-HH-5555 driver_age 30".split())
+        restored.journal.close()
+        restored_again = restore(self.snapshot_path, self.journal_path)
+        restored_again.journal.close()
+        self.assert_same_state(restored_again.process_parking_obj.parkinglot_obj, restored_plot)
+        self.assertEqual(restored_again.journal.generation, 2)
+
+    def test_journal_fsync_policies(self):
+        """ Testing the number of fsyncs of each journal fsync policy """
+        for fsync, num_syncs in (("none", 0), ("always", 7), ("batch", 3)):
+            journal = Journal(self.journal_path, fsync, batch_size=3, interval=3600)
+            for slot in range(7):
+                journal.append(["Leave", str(slot + 1)])
+            journal.close()
+            self.assertEqual(journal.num_syncs, num_syncs)
+            os.remove(self.journal_path)
+        with self.assertRaises(ValueError):
+            Journal(self.journal_path, "sometimes")
+
+    def test_batch_journal_synced_when_idle(self):
+        """ Testing the syncer of a "batch" journal fsyncs the last commands without a next append or close() """
+        journal = Journal(self.journal_path, "batch", interval=0.01)
+        journal.append(["Create_parking_lot", "3"])
+        for _ in range(100):
+            if journal.num_syncs:
+                break
+            time.sleep(0.01)
+        self.assertEqual((journal.num_syncs, journal.pending), (1, 0))
+        journal.close()
+        self.assertFalse(journal.syncer.is_alive())
+
+    def test_recover_after_process_crash(self):
+        """ Testing every command executed before a crash without close() is in the log of each fsync policy """
+        script = ("import os, sys\n"
+                  "from persistence import recover\n"
+                  "from virtual_parking import CommandProcessor, ParkingLot, ParkingProcessor\n"
+                  "cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))\n"
+                  "recover(cmd_proc_obj, sys.argv[1], sys.argv[2])\n"
+                  "cmd_proc_obj.process_command(['Create_parking_lot', '6'])\n"
+                  "for index in range(5):\n"
+                  "    cmd_proc_obj.process_command(['Park', f'KA-01-HH-{index:04d}', 'driver_age', '21'])\n"
+                  "os._exit(0)\n")
+        for fsync in FSYNC_POLICIES:
+            result = subprocess.run([sys.executable, "-c", script, self.journal_path, fsync], capture_output=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            recovered = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+            self.assertEqual(recover(recovered, self.journal_path), 6)
+            recovered.journal.close()
+            self.assertEqual(recovered.process_parking_obj.parkinglot_obj.get_slot_by_reg("KA-01-HH-0004"), 4)
+            os.remove(self.journal_path)
+
+    def test_recover_write_ahead_log(self):
+        """ Testing recover() replays the log into a new parking lot and drops a command cut by a crash """
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file]
+        plot = ParkingLot()
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+        cmd_proc_obj.set_emit(lambda line: None)
+        self.assertEqual(recover(cmd_proc_obj, self.journal_path, "batch"), 0)
+        for command_toks in commands:
+            cmd_proc_obj.process_command(command_toks)
+        cmd_proc_obj.journal.close()
+        with open(self.journal_path, 'a') as journal_file:
+            journal_file.write("Park KA-01-HH-99")
+        recovered = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+        self.assertEqual(recover(recovered, self.journal_path), 10)
+        recovered.journal.close()
+        self.assert_same_state(recovered.process_parking_obj.parkinglot_obj, plot)
+        with open(self.journal_path) as journal_file:
+            self.assertEqual(journal_file.read().splitlines()[-1], "Park HR-29-TG-3098 driver_age 39")
+
+    def test_recover_after_failing_command(self):
+        """ Testing a command which raises is not kept in the log and a bad record is skipped on replay """
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+        cmd_proc_obj.set_emit(lambda line: None)
+        recover(cmd_proc_obj, self.journal_path, "always")
+        for command in ("Create_parking_lot 3", "Park KA-01-HH-1234 driver_age 21"):
+            cmd_proc_obj.process_command(command.split())
+        with self.assertRaises(IndexError):
+            cmd_proc_obj.process_command("Leave 9".split())
+        cmd_proc_obj.process_command("Park KA-01-HH-9999 driver_age 30".split())
+        cmd_proc_obj.journal.close()
+        recovered = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+        self.assertEqual(recover(recovered, self.journal_path), 3)
+        recovered.journal.close()
+        self.assert_same_state(recovered.process_parking_obj.parkinglot_obj,
+                               cmd_proc_obj.process_parking_obj.parkinglot_obj)
+        with open(self.journal_path, 'a') as journal_file:
+            journal_file.write("Leave 9\nLeave 1\n")
+        recovered = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+        with redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(recover(recovered, self.journal_path), 4)
+        recovered.journal.close()
+        self.assertEqual([record[:2] for record in recovered.journal.skipped], [(4, "Leave 9")])
+        self.assertIn("Skipped journal record 4", stderr.getvalue())
+        self.assertEqual(recovered.process_parking_obj.parkinglot_obj.reg_slot_dict, {"KA-01-HH-9999": 1})
+
+
+class GateServerTest(unittest.TestCase):
+    """
+        Test class: GateServerTest
+            Contains unittest cases to test the gate server with concurrent pipelined connections
+    """
+
+    def setUp(self) -> None:
+        self.plot = ParkingLot()
+        self.gate_server = GateServer(CommandProcessor(None, ParkingProcessor(self.plot)))
+
+    @staticmethod
+    async def close_gate(writer):
+        """ Closes the gate connection and lets the server read the end of the stream before the loop stops """
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.01)
+
+    def test_execute(self):
+        """ Testing execute() returns the output lines of the command with the end of response line """
+        self.assertEqual(self.gate_server.execute(b"Create_parking_lot 2\n"), b"Created parking of 2 slots\n.\n")
+        self.assertEqual(self.gate_server.execute(b"Slot_numbers_for_driver_of_age 21\n"), b"\n.\n")
+
+    def test_malformed_lines(self):
+        """ Testing a malformed line gets an error response and the gate connection keeps working """
+        self.gate_server.execute(b"Create_parking_lot 2\n")
+
+        async def gate(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"Leave\n\xff\xfe\nLeave 9\nVehicle_registration_number_for_driver_of_age x\n"
+                         b"Park KA-01-HH-1234 driver_age 21\n")
+            responses = [await reader.readuntil(b"\n.\n") for _ in range(5)]
+            await self.close_gate(writer)
+            return responses
+
+        async def run_gate():
+            server = await self.gate_server.start(port=0)
+            async with server:
+                return await gate(server.sockets[0].getsockname()[1])
+
+        responses = asyncio.run(run_gate())
+        self.assertEqual(responses[:4], [b"Cannot process the command\n.\n"] * 4)
+        self.assertEqual(responses[4], b"Car with vehicle registration number KA-01-HH-1234 has been parked at "
+                                       b"slot number 1\n.\n")
+
+    def test_batch_journal_response_after_fsync(self):
+        """ Testing a response is only sent once the "batch" fsync covering the command is done, the pipelined
+        commands share the fsync """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            journal = Journal(os.path.join(tmp_dir, "lot.journal"), "batch", batch_size=1000, interval=0.02)
+            self.gate_server.cmd_proc_obj.journal = journal
+
+            async def gate(port):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"Create_parking_lot 2\nPark KA-01-HH-1234 driver_age 21\n")
+                num_syncs = []
+                for _ in range(2):
+                    await reader.readuntil(b"\n.\n")
+                    num_syncs.append(journal.num_syncs)
+                await self.close_gate(writer)
+                return num_syncs
+
+            async def run_gate():
+                server = await self.gate_server.start(port=0)
+                async with server:
+                    return await gate(server.sockets[0].getsockname()[1])
+
+            num_syncs = asyncio.run(run_gate())
+            journal.close()
+        self.assertEqual(num_syncs, [1, 1])
+
+    def test_batch_journal_pipelined_group_commit(self):
+        """ Testing the pipelined commands of one gate share the fsyncs of a "batch" journal """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            journal = Journal(os.path.join(tmp_dir, "lot.journal"), "batch", batch_size=1000, interval=0.02)
+            self.gate_server.cmd_proc_obj.journal = journal
+            commands = ["Create_parking_lot 100"] + [f"Park KA-01-HH-{index:04d} driver_age 21" for index in range(100)]
+
+            async def gate(port):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write("".join(command + "\n" for command in commands).encode())
+                responses = [await reader.readuntil(b"\n.\n") for _ in commands]
+                num_syncs = journal.num_syncs
+                await self.close_gate(writer)
+                return responses, num_syncs
+
+            async def run_gate():
+                server = await self.gate_server.start(port=0)
+                async with server:
+                    return await gate(server.sockets[0].getsockname()[1])
+
+            responses, num_syncs = asyncio.run(run_gate())
+            journal.close()
+        self.assertEqual(responses[-1], b"Car with vehicle registration number KA-01-HH-0099 has been parked at "
+                                        b"slot number 100\n.\n")
+        self.assertLessEqual(num_syncs, 5)
+        self.assertGreaterEqual(num_syncs, 1)
+
+    def test_concurrent_gates(self):
+        """ Testing concurrent gates pipelining commands to the same parking lot """
+        self.gate_server.execute(b"Create_parking_lot 10\n")
+
+        async def gate(port, gate_num):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"".join(f"Park KA-0{gate_num}-HH-000{index} driver_age 2{gate_num}\n".encode()
+                                  for index in range(5)))
+            responses = [await reader.readuntil(b"\n.\n") for _ in range(5)]
+            await self.close_gate(writer)
+            return responses
+
+        async def run_gates():
+            server = await self.gate_server.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await asyncio.gather(gate(port, 1), gate(port, 2))
+
+        responses = asyncio.run(run_gates())
+        for gate_num, gate_responses in zip((1, 2), responses):
+            self.assertEqual([response.split(b" ")[5] for response in gate_responses],
+                             [f"KA-0{gate_num}-HH-000{index}".encode() for index in range(5)])
+        self.assertEqual(sorted(self.plot.reg_slot_dict.values()), list(range(10)))
+        self.assertEqual(len(self.plot.age_slot_dict[21]), 5)
+
+
+class AgeQueriesTest(unittest.TestCase):
+    """
+        Test class: AgeQueriesTest
+            Contains unittest cases to test the range and aggregate queries by driver age
+    """
+
+    def setUp(self) -> None:
+        self.plot = DataDump.create_parking_lot_data()
+        self.park_processor_obj = ParkingProcessor(self.plot)
+        self.park_processor_obj.emit = lambda line: None
+        self.park_processor_obj.park_vehicle("Park TS-08-GH-1645 driver_age 18".split())
+        self.park_processor_obj.park_vehicle("Park TS-08-GH-1646 driver_age 300".split())
+
+    def test_slots_by_age_range(self):
+        """ Testing get_slots_by_age_range() orders the slots by age and then by parking order """
+        slot_nums = self.park_processor_obj.get_slots_by_age_range("Slot_numbers_for_driver_of_age_between 18 25".split())
+        self.assertEqual(slot_nums, "4,1,2")
+        self.park_processor_obj.exit_vehicle("Leave 1".split())
+        slot_nums = self.park_processor_obj.get_slots_by_age_range("Slot_numbers_for_driver_of_age_between 19 40".split())
+        self.assertEqual(slot_nums, "2,3")
+        slot_nums = self.park_processor_obj.get_slots_by_age_range("Slot_numbers_for_driver_of_age_between 41 60".split())
+        self.assertEqual(slot_nums, None)
+
+    def test_count_by_age_range(self):
+        """ Testing get_count_by_age_range() stays in sync with Park and Leave """
+        count = self.park_processor_obj.get_count_by_age_range("Count_of_drivers_of_age_between 0 1000".split())
+        self.assertEqual(count, 5)
+        self.park_processor_obj.exit_vehicle("Leave 2".split())
+        count = self.park_processor_obj.get_count_by_age_range("Count_of_drivers_of_age_between 21 40".split())
+        self.assertEqual(count, 2)
+        count = self.park_processor_obj.get_count_by_age_range("Count_of_drivers_of_age_between 40 21".split())
+        self.assertEqual(count, 0)
+
+    def test_count_per_age_youngest_oldest(self):
+        """ Testing get_count_per_age(), get_youngest_age() and get_oldest_age() """
+        self.assertEqual(self.park_processor_obj.get_count_per_age(["Count_of_drivers_per_age"]), "18:1,21:2,40:1,300:1")
+        self.assertEqual(self.park_processor_obj.get_youngest_age(["Youngest_driver_age"]), 18)
+        self.assertEqual(self.park_processor_obj.get_oldest_age(["Oldest_driver_age"]), 300)
+        self.park_processor_obj.exit_vehicle("Leave 5".split())
+        self.park_processor_obj.exit_vehicle("Leave 4".split())
+        self.assertEqual(self.park_processor_obj.get_youngest_age(["Youngest_driver_age"]), 21)
+        self.assertEqual(self.park_processor_obj.get_oldest_age(["Oldest_driver_age"]), 40)
+
+    def test_huge_age(self):
+        """ Testing a huge age is indexed without a tree sized by the age """
+        self.park_processor_obj.park_vehicle("Park TS-08-GH-1647 driver_age 99999999999".split())
+        self.assertLess(len(self.plot.age_index.tree), 16)
+        count = self.park_processor_obj.get_count_by_age_range("Count_of_drivers_of_age_between 300 99999999999".split())
+        self.assertEqual(count, 2)
+        self.assertEqual(self.park_processor_obj.get_oldest_age(["Oldest_driver_age"]), 99999999999)
+
+    def test_age_index_matches_counts(self):
+        """ Testing the range counts of the age index against a count of the parked ages under churn """
+        rng = random.Random(3)
+        index = AgeIndex()
+        parked = []
+        for _ in range(2000):
+            if parked and rng.random() < 0.45:
+                age = parked.pop(rng.randrange(len(parked)))
+                index.remove(age)
+            else:
+                age = rng.choice((rng.randint(0, 40), rng.randint(0, 10 ** 12)))
+                parked.append(age)
+                index.add(age)
+            min_age, max_age = sorted(rng.choice(parked or [0]) + rng.randint(-5, 5) for _ in range(2))
+            self.assertEqual(index.count_between(min_age, max_age),
+                             sum(1 for age in parked if min_age <= age <= max_age))
+        self.assertEqual(index.ages, sorted(set(parked)))
+
+
+class InstrumentationTest(unittest.TestCase):
+    """
+        Test class: InstrumentationTest
+            Contains unittest cases to test the opt-in instrumentation of CommandProcessor
+    """
+
+    def setUp(self) -> None:
+        self.plot = ParkingLot()
+        self.cmd_proc_obj = CommandProcessor(None, ParkingProcessor(self.plot))
+        self.cmd_proc_obj.set_emit(lambda line: None)
+        self.stats = io.StringIO()
+        self.instrumentation = Instrumentation(interval=3, stream=self.stats)
+        self.instrumentation.attach(self.cmd_proc_obj)
+        for command in ("Create_parking_lot 4", "Park KA-01-HH-1234 driver_age 21", "Park KA-01-HH-1235 driver_age 21",
+                        "Leave 1", "Slot_numbers_for_driver_of_age 21"):
+            self.cmd_proc_obj.process_command(command.split())
+
+    def test_counters_and_gauges(self):
+        """ Testing per command counters and the parking lot gauges """
+        self.assertEqual(self.instrumentation.counters, {"Create_parking_lot": 1, "Park": 2, "Leave": 1,
+                                                         "Slot_numbers_for_driver_of_age": 1})
+        self.assertEqual(sum(self.instrumentation.histograms["Park"]), 2)
+        self.assertEqual(self.instrumentation.gauges(), {"slot_heap_size": 1, "free_slots": 3, "total_slots": 4,
+                                                         "occupancy": 0.25})
+        self.assertTrue(self.stats.getvalue().startswith("commands=3 slot_heap_size=0 free_slots=2"))
+
+    def test_prometheus_text_and_hooks(self):
+        """ Testing the prometheus export and the hook callbacks """
+        received = []
+        self.instrumentation.register_hook(lambda command_toks, latency_ns: received.append(command_toks[0]))
+        self.cmd_proc_obj.process_command("Leave 2".split())
+        self.assertEqual(received, ["Leave"])
+        text = self.instrumentation.prometheus_text()
+        self.assertIn('vpl_commands_total{command="Leave"} 2', text)
+        self.assertIn('vpl_command_latency_seconds_bucket{command="Park",le="+Inf"} 2', text)
+        self.assertIn("vpl_free_slots 4", text)
+
+    def test_unknown_commands_and_label_escaping(self):
+        """ Testing unknown commands share one label and label values are escaped in the prometheus export """
+        for command_toks in (["Fly"], ['Pa"rk\\'], ["Drive\nnow"], []):
+            self.cmd_proc_obj.process_command(command_toks)
+        self.assertEqual(self.instrumentation.counters["unknown"], 4)
+        self.assertEqual(len(self.instrumentation.histograms), 5)
+        self.cmd_proc_obj.register_command('Odd"\\name', lambda command_toks: None)
+        self.cmd_proc_obj.process_command(['Odd"\\name'])
+        text = self.instrumentation.prometheus_text()
+        self.assertIn('vpl_commands_total{command="unknown"} 4', text)
+        self.assertIn('vpl_commands_total{command="Odd\\"\\\\name"} 1', text)
+
+    def test_detach(self):
+        """ Testing detach() restores the uninstrumented process_command """
+        self.instrumentation.detach()
+        self.assertNotIn("process_command", vars(self.cmd_proc_obj))
+        self.cmd_proc_obj.process_command("Leave 2".split())
+        self.assertEqual(self.instrumentation.counters["Leave"], 1)
+
+
+class BulkCommandsTest(unittest.TestCase):
+    """
+        Test class: BulkCommandsTest
+            Contains unittest cases to test Park_many and Leave_many against sequential Park and Leave commands
+    """
+
+    def setUp(self) -> None:
+        self.outputs = {"bulk": [], "sequential": []}
+        self.cmd_proc_objs = {}
+        for mode, output in self.outputs.items():
+            self.cmd_proc_objs[mode] = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+            self.cmd_proc_objs[mode].set_emit(output.append)
+            self.cmd_proc_objs[mode].process_command("Create_parking_lot 40".split())
+
+    def execute(self, bulk_command, sequential_commands):
+        self.cmd_proc_objs["bulk"].process_command(bulk_command.split())
+        for command in sequential_commands:
+            self.cmd_proc_objs["sequential"].process_command(command.split())
+        self.assertEqual(self.outputs["bulk"], self.outputs["sequential"])
+
+    def test_park_many_leave_many(self):
+        """ Testing bulk commands give the same slots and output as sequential commands """
+        rng = random.Random(7)
+        for round_num in range(30):
+            cars = [(f"KA-{round_num:02d}-HH-{index:04d}", rng.randint(18, 30)) for index in range(rng.randint(1, 12))]
+            cars_toks = [f"{reg_num} driver_age {age}" for reg_num, age in cars]
+            if round_num % 5 == 0:
+                cars_toks.append("K-01-HH-1234 driver_age 20")
+            self.execute("Park_many " + " ".join(cars_toks), ["Park " + car_toks for car_toks in cars_toks])
+            slots = [str(rng.randint(1, 40)) for _ in range(rng.randint(1, 12))]
+            self.execute("Leave_many " + " ".join(slots), ["Leave " + slot for slot in slots])
+        bulk_plot = self.cmd_proc_objs["bulk"].process_parking_obj.parkinglot_obj
+        sequential_plot = self.cmd_proc_objs["sequential"].process_parking_obj.parkinglot_obj
+        self.assertEqual(bulk_plot.slots, sequential_plot.slots)
+        self.assertEqual(sorted(bulk_plot.slot_heap), sorted(sequential_plot.slot_heap))
+        self.assertEqual(bulk_plot.avail_slot, sequential_plot.avail_slot)
+
+    def test_invalid_format(self):
+        """ Testing Park_many and Leave_many with invalid command format """
+        self.cmd_proc_objs["bulk"].process_command("Park_many KA-01-HH-1234 driver_age".split())
+        self.cmd_proc_objs["bulk"].process_command(["Leave_many"])
+        self.assertEqual(self.outputs["bulk"][-2:], ['Invalid "Park_many" Command Format',
+                                                     'Invalid "Leave_many" Command Format'])
+
+    def test_leave_many_slots_outside_lot(self):
+        """ Testing Leave_many with slots outside the lot leaves the valid slots and keeps the journal in sync """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            journal_path = os.path.join(tmp_dir, "lot.journal")
+            cmd_proc_obj = self.cmd_proc_objs["bulk"]
+            recover(cmd_proc_obj, journal_path, "always")
+            for command in ("Create_parking_lot 3", "Park KA-01-HH-1234 driver_age 21",
+                            "Park KA-01-HH-9999 driver_age 30", "Leave_many 1 99 0 2", "Park PB-01-HH-1234 driver_age 40"):
+                cmd_proc_obj.process_command(command.split())
+            cmd_proc_obj.journal.close()
+            self.assertEqual(self.outputs["bulk"][-5:], [
+                "Slot number 1 vacated, the car with vehicle registration number KA-01-HH-1234 left the space, "
+                "the driver of the car was of age 21",
+                "Invalid slot number 99",
+                "Invalid slot number 0",
+                "Slot number 2 vacated, the car with vehicle registration number KA-01-HH-9999 left the space, "
+                "the driver of the car was of age 30",
+                "Car with vehicle registration number PB-01-HH-1234 has been parked at slot number 1"])
+            recovered = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+            self.assertEqual(recover(recovered, journal_path), 5)
+            recovered.journal.close()
+            self.assertEqual(list(recovered.process_parking_obj.parkinglot_obj.slots),
+                             list(cmd_proc_obj.process_parking_obj.parkinglot_obj.slots))
+            self.assertEqual(recovered.process_parking_obj.parkinglot_obj.slot_heap, [1])
+
+
+class SegmentTreeAllocatorTest(unittest.TestCase):
+    """
+        Test class: SegmentTreeAllocatorTest
+            Contains unittest cases to test the segment tree allocator against the heap allocator
+    """
+
+    def run_commands(self, allocator, commands):
+        output = []
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot(allocator=allocator)))
+        cmd_proc_obj.set_emit(output.append)
+        for command_toks in commands:
+            cmd_proc_obj.process_command(command_toks)
+        return output, cmd_proc_obj.process_parking_obj.parkinglot_obj
+
+    def test_same_slots_as_heap(self):
+        """ Testing both allocators give the same output for the input file and random Park / Leave sequences """
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file if line.split()]
+        rng = random.Random(3)
+        commands.append("Create_parking_lot 50".split())
+        for index in range(2000):
+            if rng.random() < 0.55:
+                commands.append(f"Park KA-01-HH-{index:04d} driver_age {rng.randint(18, 60)}".split())
+            elif rng.random() < 0.5:
+                commands.append(f"Leave_many {rng.randint(1, 50)} {rng.randint(1, 50)}".split())
+            else:
+                commands.append(f"Leave {rng.randint(1, 50)}".split())
+        heap_output, heap_plot = self.run_commands("heap", commands)
+        tree_output, tree_plot = self.run_commands("segment_tree", commands)
+        self.assertEqual(tree_output, heap_output)
+        self.assertEqual(tree_plot.get_free_slot_count(), heap_plot.get_free_slot_count())
+
+    def test_emptyslot_from_and_range_count(self):
+        """ Testing get_emptyslot_from() and get_free_slot_count() of a range of slots """
+        _, plot = self.run_commands("segment_tree", ["Create_parking_lot 10".split()] + [
+            f"Park KA-01-HH-{index:04d} driver_age 30".split() for index in range(6)] + ["Leave 2".split()])
+        self.assertEqual(plot.get_free_slot_count(), 5)
+        self.assertEqual(plot.get_free_slot_count(0, 6), 1)
+        self.assertEqual(plot.get_emptyslot_from(3), 6)
+        self.assertEqual(plot.get_emptyslot_from(0), 1)
+        self.assertEqual(plot.get_free_slot_count(0, 6), 0)
+        self.assertIsNone(plot.get_emptyslot_from(10))
+        with self.assertRaises(ValueError):
+            ParkingLot().get_emptyslot_from(0)
+        with self.assertRaises(ValueError):
+            ParkingLot(allocator="bitmap")
+
+
+class SessionsTest(unittest.TestCase):
+    """
+        Test class: SessionsTest
+            Contains unittest cases to test timestamped Park / Leave commands and the billing report
+    """
+
+    def setUp(self) -> None:
+        self.output = []
+        self.cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+        self.cmd_proc_obj.set_emit(self.output.append)
+        for command in ["Create_parking_lot 3", "Park KA-01-HH-1234 driver_age 21 at 1000",
+                        "Park KA-01-HH-1235 driver_age 30 at 1000", "Park KA-01-HH-1236 driver_age 40",
+                        "Leave 1 at 4600", "Leave 2 at 900", "Leave 2 at 1001", "Leave 3 at 2000"]:
+            self.cmd_proc_obj.process_command(command.split())
+
+    def test_tickets(self):
+        """ Testing Leave with a timestamp prints the ticket of the session """
+        self.assertEqual(self.output[4:], [
+            "Slot number 1 vacated, the car with vehicle registration number KA-01-HH-1234 left the space, "
+            "the driver of the car was of age 21",
+            "Ticket: parked for 3600 seconds, parking fee 10",
+            "Leave time should not be before the park time",
+            "Slot number 2 vacated, the car with vehicle registration number KA-01-HH-1235 left the space, "
+            "the driver of the car was of age 30",
+            "Ticket: parked for 1 seconds, parking fee 10",
+            "Slot number 3 vacated, the car with vehicle registration number KA-01-HH-1236 left the space, "
+            "the driver of the car was of age 40"])
+        self.assertEqual(len(self.cmd_proc_obj.process_parking_obj.sessions), 2)
+
+    def test_leave_many_tickets(self):
+        """ Testing Leave_many closes the sessions and prints the tickets like one Leave per slot """
+        outputs = []
+        for leave_commands in (["Leave_many 1 2 at 900", "Leave_many 1 2 3 at 4600"],
+                               ["Leave 1 at 900", "Leave 2 at 900", "Leave 1 at 4600", "Leave 2 at 4600",
+                                "Leave 3 at 4600"]):
+            output = []
+            cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot()))
+            cmd_proc_obj.set_emit(output.append)
+            for command in ["Create_parking_lot 3", "Park KA-01-HH-1234 driver_age 21 at 1000",
+                            "Park KA-01-HH-1235 driver_age 30 at 1000", "Park KA-01-HH-1236 driver_age 40"]:
+                cmd_proc_obj.process_command(command.split())
+            for command in leave_commands:
+                cmd_proc_obj.process_command(command.split())
+            outputs.append(output)
+            self.assertEqual(len(cmd_proc_obj.process_parking_obj.sessions), 2)
+            self.assertEqual(cmd_proc_obj.process_parking_obj.sessions.open_sessions, {})
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0].count("Ticket: parked for 3600 seconds, parking fee 10"), 2)
+
+    def test_billing_report(self):
+        """ Testing Billing_report over all the sessions and over a range of leave times, with NumPy when it is
+        installed and with the pure Python report """
+        reports = []
+        for fallback in (False, True):
+            del self.output[:]
+            with unittest.mock.patch.object(sessions_module, "import_numpy",
+                                            return_value=None) if fallback else nullcontext():
+                for command in ["Billing_report", "Billing_report 2000 5000", "Billing_report 1"]:
+                    self.cmd_proc_obj.process_command(command.split())
+            reports.append(list(self.output))
+        self.assertEqual(reports[0], reports[1])
+        self.assertEqual(self.output, [
+            "Total revenue 20 from 2 sessions", "Slot number 1: revenue 10 from 1 sessions",
+            "Slot number 2: revenue 10 from 1 sessions", "Driver age 21: revenue 10 from 1 sessions",
+            "Driver age 30: revenue 10 from 1 sessions", "Dwell time p50 1s p90 3600s p99 3600s",
+            "Total revenue 10 from 1 sessions", "Slot number 1: revenue 10 from 1 sessions",
+            "Driver age 21: revenue 10 from 1 sessions", "Dwell time p50 3600s p90 3600s p99 3600s",
+            'Invalid "Billing_report" Command Format'])
+
+    def test_sessions_in_snapshot(self):
+        """ Testing a checkpoint keeps the completed and the open sessions """
+        self.cmd_proc_obj.process_command("Park KA-01-HH-1237 driver_age 50 at 5000".split())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, "lot.snapshot")
+            journal_path = os.path.join(tmp_dir, "lot.journal")
+            recover(self.cmd_proc_obj, journal_path)
+            checkpoint(self.cmd_proc_obj, snapshot_path)
+            self.cmd_proc_obj.journal.close()
+            restored = restore(snapshot_path, journal_path)
+            restored.journal.close()
+            restored.journal = None
+        sessions = self.cmd_proc_obj.process_parking_obj.sessions
+        restored_sessions = restored.process_parking_obj.sessions
+        self.assertEqual(restored_sessions.report(), sessions.report())
+        self.assertEqual(restored_sessions.open_sessions, {0: (50, 5000)})
+        del self.output[:]
+        restored.set_emit(self.output.append)
+        restored.process_command("Leave 1 at 8600".split())
+        self.assertEqual(self.output[-1], "Ticket: parked for 3600 seconds, parking fee 10")
+
+    def test_numpy_report_matches_python(self):
+        """ Testing the NumPy report gives the same result as the pure Python report """
+        sessions = self.cmd_proc_obj.process_parking_obj.sessions
+        np = sessions_module.import_numpy()
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        rng = random.Random(5)
+        for _ in range(1000):
+            park_time = rng.randint(0, 10 ** 6)
+            sessions.open(rng.randint(0, 99), rng.randint(18, 80), park_time)
+            sessions.close(next(iter(sessions.open_sessions)), park_time + rng.randint(0, 50000))
+        self.assertEqual(sessions._report_numpy(np, None, None), sessions._report_python(None, None))
+        self.assertEqual(sessions._report_numpy(np, 10 ** 5, 10 ** 6), sessions._report_python(10 ** 5, 10 ** 6))
+
+
+class QueryCacheTest(unittest.TestCase):
+    """
+        Test class: QueryCacheTest
+            Contains unittest cases to test the age query cache and its invalidation
+    """
+
+    def run_commands(self, commands, max_entries=None):
+        output = []
+        plot = ParkingLot()
+        if max_entries:
+            plot.enable_query_cache(max_entries)
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+        cmd_proc_obj.set_emit(output.append)
+        for command in commands:
+            cmd_proc_obj.process_command(command.split())
+        return output, plot
+
+    def test_same_output_as_uncached(self):
+        """ Testing cached queries give the same output as fresh queries for random commands """
+        rng = random.Random(11)
+        commands = ["Create_parking_lot 30"]
+        for index in range(3000):
+            choice = rng.random()
+            if choice < 0.3:
+                commands.append(f"Park KA-01-HH-{index:04d} driver_age {rng.randint(18, 25)}")
+            elif choice < 0.45:
+                commands.append(f"Leave_many {rng.randint(1, 30)} {rng.randint(1, 30)}")
+            elif choice < 0.7:
+                commands.append(f"Slot_numbers_for_driver_of_age {rng.randint(18, 25)}")
+            else:
+                commands.append(f"Vehicle_registration_number_for_driver_of_age {rng.randint(18, 25)}")
+        output, _ = self.run_commands(commands)
+        for max_entries in (3, 1000):
+            cached_output, plot = self.run_commands(commands, max_entries)
+            self.assertEqual(cached_output, output)
+            self.assertGreater(plot.query_cache.hits, 0)
+            self.assertLessEqual(len(plot.query_cache.entries), max_entries)
+        self.assertGreater(self.run_commands(commands, 3)[1].query_cache.evictions, 0)
+
+    def test_invalidation_by_age(self):
+        """ Testing Park and Leave only invalidate the cached results of the age of the car """
+        output, plot = self.run_commands([
+            "Create_parking_lot 6", "Park KA-01-HH-1234 driver_age 21", "Park KA-01-HH-1235 driver_age 30",
+            "Slot_numbers_for_driver_of_age 21", "Slot_numbers_for_driver_of_age 30",
+            "Park KA-01-HH-1236 driver_age 21", "Slot_numbers_for_driver_of_age 21",
+            "Slot_numbers_for_driver_of_age 30", "Leave 1", "Slot_numbers_for_driver_of_age 21"], 100)
+        self.assertEqual(output[3:5] + output[6:8] + output[9:], ["1", "2", "1,3", "2", "3"])
+        self.assertEqual(plot.query_cache.stats(), {"hits": 1, "misses": 4, "hit_rate": 0.2, "invalidations": 2,
+                                                    "evictions": 0, "entries": 2})
+
+
+class RegistrationIndexTest(unittest.TestCase):
+    """
+        Test class: RegistrationIndexTest
+            Contains unittest cases to test the registration prefix and pattern queries with and without the trie
+    """
+
+    def run_commands(self, commands, reg_index):
+        output = []
+        plot = ParkingLot()
+        if reg_index:
+            plot.enable_reg_index()
+        cmd_proc_obj = CommandProcessor(None, ParkingProcessor(plot))
+        cmd_proc_obj.set_emit(output.append)
+        for command in commands:
+            cmd_proc_obj.process_command(command.split())
+        return output
+
+    def test_prefix_and_pattern(self):
+        """ Testing prefix and pattern queries of state, district and partial plates """
+        commands = ["Create_parking_lot 6", "Park KA-01-HH-1234 driver_age 21", "Park KA-02-HH-9999 driver_age 30",
+                    "Park MH-01-AB-1200 driver_age 40", "Park KA-01-HX-1299 driver_age 50", "Leave 2",
+                    "Slot_numbers_for_registration_prefix KA", "Slot_numbers_for_registration_prefix KA-01-H",
+                    "Slot_numbers_for_registration_prefix KA-01-HH-1234", "Slot_numbers_for_registration_prefix KA-02",
+                    "Slot_numbers_for_registration_pattern *-01-*-12??", "Slot_numbers_for_registration_pattern KA-*-H",
+                    "Slot_numbers_for_registration_prefix ka"]
+        expected = ["1,4", "1,4", "1", "No parked car matches the query", "1,3,4",
+                    'Invalid "Slot_numbers_for_registration_pattern" Command Format',
+                    'Invalid "Slot_numbers_for_registration_prefix" Command Format']
+        for reg_index in (False, True):
+            self.assertEqual(self.run_commands(commands, reg_index)[6:], expected)
+
+    def test_index_matches_scan(self):
+        """ Testing the trie gives the same results as a scan for random Park / Leave sequences """
+        rng = random.Random(13)
+        commands = ["Create_parking_lot 200"]
+        for index in range(3000):
+            choice = rng.random()
+            if choice < 0.4:
+                commands.append(f"Park {rng.choice(['KA', 'MH'])}-{rng.randint(1, 3):02d}-{rng.choice(['HH', 'HA'])}-"
+                                f"{rng.randint(0, 99):04d} driver_age 30")
+            elif choice < 0.7:
+                commands.append(f"Leave {rng.randint(1, 200)}")
+            elif choice < 0.85:
+                commands.append("Slot_numbers_for_registration_prefix " + rng.choice(["K", "KA-0", "MH-02-H", "KA-01-HA"]))
+            else:
+                commands.append("Slot_numbers_for_registration_pattern " + rng.choice(["*-01-*-00??", "KA-*-H?-*"]))
+        self.assertEqual(self.run_commands(commands, True), self.run_commands(commands, False))
+
+
+class StartupTest(unittest.TestCase):
+    """
+        Test class: StartupTest
+            Contains unittest cases to test the deferred imports, the lazy parsers and the "lazy" slot storage
+    """
+
+    def test_deferred_imports(self):
+        """ Testing a short run does not import the modules of the unused features """
+        deferred = ["gzip", "allocator", "query_cache", "reg_index", "registration", "sessions", "storage"]
+        result = subprocess.run([sys.executable, "-X", "importtime", "virtual_parking.py", "test_files/inp.txt"],
+                                capture_output=True, text=True, check=True)
+        imported = {line.rpartition("|")[2].strip() for line in result.stderr.splitlines()}
+        self.assertEqual([name for name in deferred if name in imported], [])
+
+    def test_lazy_patterns_match_re(self):
+        """ Testing a lazy pattern is compiled on its first match and matches like its regex """
+        lazy = LazyPattern(NUMBER_PATTERN.pattern)
+        self.assertNotIn("match", vars(lazy))
+        self.assertEqual(lazy.match("35a").group(), "35")
+        self.assertIsInstance(lazy.match.__self__, re.Pattern)
+        self.assertIsNone(lazy.fullmatch("35a"))
+        self.assertIsNone(REG_NUM_PATTERN.fullmatch("K-01-HH-1234"))
+        self.assertEqual(REG_NUM_PATTERN.match("KA-01-HH-12345").group(), "KA-01-HH-1234")
+
+    def test_sources_compile_without_warnings(self):
+        """ Testing no module has an invalid escape sequence, a SyntaxWarning from Python 3.12 """
+        for path in sorted(os.listdir(".")) + sorted("benchmarks/" + name for name in os.listdir("benchmarks")):
+            if path.endswith(".py"):
+                with open(path) as source_file, warnings.catch_warnings():
+                    warnings.simplefilter("error")
+                    compile(source_file.read(), path, "exec")
+
+    def test_lazy_storage(self):
+        """ Testing the lazy storage gives the same output as the list storage and only grows with the parked slots """
+        with open("test_files/inp.txt") as input_file:
+            commands = [line.split() for line in input_file if line.split()]
+        outputs = {}
+        for storage in ("list", "lazy"):
+            outputs[storage] = []
+            cmd_proc_obj = CommandProcessor(None, ParkingProcessor(ParkingLot(storage=storage)))
+            cmd_proc_obj.set_emit(outputs[storage].append)
+            for command_toks in commands + [["Create_parking_lot", "1000000"], ["Park", "KA-01-HH-1234",
+                                                                                "driver_age", "21"]]:
+                cmd_proc_obj.process_command(command_toks)
+        self.assertEqual(outputs["lazy"], outputs["list"])
+        slots = cmd_proc_obj.process_parking_obj.parkinglot_obj.slots
+        self.assertEqual((len(slots), len(slots.vehicles)), (1000000, 1))
+        self.assertEqual(slots[-1], None)
+        with self.assertRaises(IndexError):
+            slots[1000000] = None
+
+
+class ConcurrentParkingLotTest(unittest.TestCase):
+    """
+        Test class: ConcurrentParkingLotTest
+            Contains unittest cases to test the thread safe facade with concurrent gates and query kiosks
+    """
+
+    NUM_SLOTS = 60
+    MIN_GATE_COMMANDS = 1500
+    MIN_KIOSK_ITERATIONS = 300
+
+    def setUp(self) -> None:
+        self.plot = ParkingLot()
+        self.facade = ConcurrentParkingLot(CommandProcessor(None, ParkingProcessor(self.plot)))
+        self.facade.execute(["Create_parking_lot", str(self.NUM_SLOTS)])
+
+    @staticmethod
+    def check_invariants(plot):
+        """ Checks slots, reg_slot_dict, age_slot_dict and slot_heap describe the same parked cars """
+        parked = {slot: vehicle_data for slot, vehicle_data in enumerate(plot.slots) if vehicle_data}
+        assert plot.reg_slot_dict == {vehicle_data["reg_num"]: slot for slot, vehicle_data in parked.items()}
+        ages = {age: sorted(age_slots) for age, age_slots in plot.age_slot_dict.items() if age_slots}
+        expected_ages = {}
+        for slot, vehicle_data in parked.items():
+            expected_ages.setdefault(vehicle_data["age"], []).append(slot + 1)
+        assert ages == expected_ages
+        assert plot.age_index.counts == {age: len(age_slots) for age, age_slots in ages.items()}
+        assert all(plot.slot_heap[(index - 1) // 2] <= slot for index, slot in enumerate(plot.slot_heap) if index)
+        empty = [slot for slot in range(plot.avail_slot) if slot not in parked]
+        assert sorted(plot.slot_heap) == empty
+        assert all(slot < plot.avail_slot for slot in parked)
+        return len(parked)
+
+    def test_stress_invariants(self):
+        """ Testing concurrent Park / Leave and queries keep the parking lot consistent and their output separate,
+        the gates keep writing till every kiosk ran MIN_KIOSK_ITERATIONS queries and invariant checks """
+        errors = []
+        done = threading.Event()
+        kiosk_iterations = [0] * 4
+
+        def gate(gate_num):
+            rng = random.Random(gate_num)
+            try:
+                for index in itertools.count():
+                    if errors or (index >= self.MIN_GATE_COMMANDS
+                                  and min(kiosk_iterations) >= self.MIN_KIOSK_ITERATIONS):
+                        break
+                    if rng.random() < 0.55:
+                        reg_num = f"K{chr(65 + gate_num)}-{index // 10000 % 100:02d}-HH-{index % 10000:04d}"
+                        lines = self.facade.execute(["Park", reg_num, "driver_age", str(rng.randint(18, 25))])
+                        assert lines == ["Sorry! No Parking spaces available"] or (
+                            len(lines) == 1 and lines[0].startswith(
+                                f"Car with vehicle registration number {reg_num} has been parked")), lines
+                    else:
+                        slot = str(rng.randint(1, self.NUM_SLOTS))
+                        lines = self.facade.execute(["Leave", slot])
+                        assert lines == ["Slot Already vacant"] or (
+                            len(lines) == 1 and lines[0].startswith(f"Slot number {slot} vacated")), lines
+            except Exception as error:
+                errors.append(error)
+
+        def kiosk(kiosk_num):
+            rng = random.Random(100 + kiosk_num)
+            try:
+                while not done.is_set():
+                    # the gates park drivers of 18 to 25, the older ages are never parked
+                    age = rng.randint(18, 40)
+                    lines = self.facade.execute(["Slot_numbers_for_driver_of_age", str(age)])
+                    assert len(lines) == 1, lines
+                    lines = self.facade.execute(["Vehicle_registration_number_for_driver_of_age", str(age)])
+                    assert len(lines) == 1, lines
+                    lines = self.facade.execute(["Slot_numbers_for_driver_of_age_between", str(age), "45"])
+                    assert len(lines) == 1, lines
+                    lines = self.facade.execute(["Count_of_drivers_of_age_between", "18", "25"])
+                    assert len(lines) == 1 and 0 <= lines[0] <= self.NUM_SLOTS, lines
+                    self.facade.read(self.check_invariants)
+                    kiosk_iterations[kiosk_num] += 1
+            except Exception as error:
+                errors.append(error)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        try:
+            kiosks = [threading.Thread(target=kiosk, args=(num,)) for num in range(len(kiosk_iterations))]
+            gates = [threading.Thread(target=gate, args=(num,)) for num in range(3)]
+            for thread in kiosks + gates:
+                thread.start()
+            for thread in gates:
+                thread.join()
+            done.set()
+            for thread in kiosks:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(min(kiosk_iterations), self.MIN_KIOSK_ITERATIONS)
+        num_parked = self.check_invariants(self.plot)
+        self.assertEqual(self.plot.get_free_slot_count(), self.NUM_SLOTS - num_parked)
+        # the queries under the read lock never add the ages they did not find
+        self.assertLessEqual(set(self.plot.age_slot_dict), set(range(18, 26)))
+
+    def test_instrumented_queries(self):
+        """ Testing the instrumentation counts every query run concurrently under the read lock """
+        instrumentation = Instrumentation()
+        instrumentation.attach(self.facade.cmd_proc_obj)
+
+        def kiosk():
+            for _ in range(2000):
+                self.facade.execute(["Count_of_drivers_of_age_between", "18", "25"])
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            kiosks = [threading.Thread(target=kiosk) for _ in range(4)]
+            for thread in kiosks:
+                thread.start()
+            for thread in kiosks:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(instrumentation.counters["Count_of_drivers_of_age_between"], 8000)
+        self.assertEqual(sum(instrumentation.histograms["Count_of_drivers_of_age_between"]), 8000)
+        self.assertEqual(instrumentation.num_commands, 8000)
+        with instrumentation.lock:
+            thread = threading.Thread(target=kiosk)
+            thread.start()
+            thread.join(0.2)
+            self.assertTrue(thread.is_alive())
+            self.assertEqual(instrumentation.num_commands, 8000)
+        thread.join()
+        self.assertEqual(instrumentation.num_commands, 10000)
+
+    def test_read_write_lock(self):
+        """ Testing readers share the lock and a waiting writer blocks new readers """
+        lock = ReadWriteLock()
+        lock.acquire_read()
+        lock.acquire_read()
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), lock.release_write()))
+        writer.start()
+        while not lock.turnstile.locked():
+            time.sleep(0.001)
+        reader_done = threading.Event()
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), reader_done.set(), lock.release_read()))
+        reader.start()
+        self.assertFalse(reader_done.wait(0.05))
+        lock.release_read()
+        lock.release_read()
+        writer.join()
+        reader.join()
+        self.assertTrue(reader_done.is_set())
+        self.assertEqual((lock.readers, lock.turnstile.locked(), lock.no_readers.locked()), (0, False, False))
+
+    def test_cached_queries_take_write_lock(self):
+        """ Testing the age queries only run under the read lock when the query cache is disabled """
+        command_toks = ["Slot_numbers_for_driver_of_age", "21"]
+        self.assertTrue(self.facade.is_read_only(command_toks))
+        self.plot.enable_query_cache()
+        self.assertFalse(self.facade.is_read_only(command_toks))
+        self.assertTrue(self.facade.is_read_only(["Youngest_driver_age"]))
+        self.assertFalse(self.facade.is_read_only(["Park", "KA-01-HH-1234", "driver_age", "21"]))
+
+
 class DataDump:
     """
     This is a Utility class to dump the dummy data in the Parkinglot
@@ -1,14 +1,108 @@
+import sys
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
 class FileUtility:
     """
     Utility class to load the input file
+    The input is read as bytes in large blocks and streamed line by line, so memory use stays
+    constant whatever the size of the file.
+       Usage:
+         file: binary stream of the input, the path "-" reads from stdin and gzip compressed input is decompressed
+         block_size: number of bytes read from the file at once
     """
+    BLOCK_SIZE = 1 << 20
 
-    def __init__(self):
+    def __init__(self, block_size=BLOCK_SIZE):
         self.file = None
+        self.block_size = block_size
 
     def load_file(self, filepath):
         try:
-            self.file = open(filepath, 'r')
+            self.file = sys.stdin.buffer if filepath == "-" else open(filepath, 'rb')
+            if self.file.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+                import gzip
+                self.file = gzip.GzipFile(fileobj=self.file, mode='rb')
         except IOError:
             self.file = None
             print("Input File not found in given path")
+
+    def iter_lines(self):
+        """
+        Generator which reads the file in blocks of block_size bytes
+        :return: yields each line of the file as bytes without the line separator
+        """
+        remainder = b''
+        while True:
+            block = self.file.read(self.block_size)
+            if not block:
+                break
+            lines = (remainder + block).split(b'\n') if remainder else block.split(b'\n')
+            remainder = lines.pop()
+            yield from lines
+        if remainder:
+            yield remainder
+
+    def iter_commands(self):
+        """
+        Generator over the commands of the file
+        :return: yields the tokens of each line example- ["Park", "KA-01-HH-1234", "driver_age", "21"]
+        """
+        for line in self.iter_lines():
+            yield line.decode().split()
+
+
+class OutputBuffer:
+    """
+    Utility class to collect the output lines of the commands and write them to a stream in large chunks.
+    Lines are written the same way print() writes them, so the output is byte identical.
+       Usage:
+         stream: writable text stream (file opened with 'w', sys.stdout) or binary stream (sys.stdout.buffer)
+         chunk_lines: number of lines collected before they are written to the stream
+    """
+    CHUNK_LINES = 8192
+
+    def __init__(self, stream, chunk_lines=CHUNK_LINES):
+        self.stream = stream
+        self.chunk_lines = chunk_lines
+        self.binary = not hasattr(stream, 'encoding')
+        self.lines = []
+
+    def write_line(self, line):
+        self.lines.append(str(line))
+        if len(self.lines) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        data = "\n".join(self.lines) + "\n"
+        self.lines = []
+        self.stream.write(data.encode() if self.binary else data)
+        self.stream.flush()
+
+
+class LazyPattern:
+    """
+    LazyPattern is a regex of the command arguments which is compiled, and re imported, on its first match.
+    The first call of match / fullmatch replaces them with the ones of the compiled regex.
+       Usage:
+         pattern: regex source, example- r'\\d+'
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def compile(self):
+        import re
+        compiled = re.compile(self.pattern)
+        self.match = compiled.match
+        self.fullmatch = compiled.fullmatch
+        return compiled
+
+    def match(self, text):
+        return self.compile().match(text)
+
+    def fullmatch(self, text):
+        return self.compile().fullmatch(text)
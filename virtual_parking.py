@@ -1,9 +1,15 @@
-import re
 from heapq import heapify, heappush, heappop
 from collections import defaultdict
 import sys
 
-from utils import FileUtility
+from age_index import AgeIndex
+from utils import FileUtility, LazyPattern, OutputBuffer
+
+# Regexes of the command arguments, they are compiled on their first use.
+# The modules of the optional features (allocator, query_cache, reg_index, registration, sessions, storage)
+# are imported when the feature is used, a short run only imports what it executes.
+REG_NUM_PATTERN = LazyPattern(r'[A-Z]{2}-\d{2}-[A-Z]{2}-\d{4}')
+NUMBER_PATTERN = LazyPattern(r'\d+')
 
 
 class ParkingLot:
@@ -12,25 +18,68 @@ class ParkingLot:
        provides utility funtions :
          create_parkinglot() - this function to create a virtual parking lot with 'n' slots.
          get_emptyslot() - this function will return the next best available parking slot.
+         get_emptyslots() / release_slots() - bulk allocation / release of slots for Park_many and Leave_many.
+         occupy_slot() / vacate_slot() - park / remove a car and keep the redundant query data in sync.
        Usage:
          slots:   intialises as empty list to store the vehicle info when car is parked
          total_slots: to maintain the maximum number of slots available in the parking lot
          avail_slot: to maintain the available parking slot number when we are first filling the parking lot
          reg_slot_dict: this dict is used to store the data of registration number mapped to its slot number
-         age_slot_dict: this dict is used to store the data of all the slot numbers for a particular age
+         age_slot_dict: this dict is used to store the data of all the slot numbers for a particular age.
+                    slot numbers of an age are kept as keys of an insertion ordered dict, so a slot can be
+                    added or removed in O(1) while queries still return slots in the order the cars were parked
+         age_index: sorted index of the ages of the parked drivers for range and aggregate queries (see age_index.AgeIndex)
          slot_heap:  This is Min Heap used to store the slots which become empty after vehicle exits the parking lot.
                     Min heap is used to always get the minimum slot for the next car to park
+         emit: function called with every output line, print by default
+         storage: "list" stores each parked vehicle as a dict in a list,
+                  "compact" stores the vehicles in array backed columns (see storage.CompactSlots)
+                  which takes a fraction of the memory for lots with millions of slots,
+                  "packed" stores the vehicles in array backed columns with the registration numbers packed in
+                  int64 (see storage.PackedSlots), reg_slot_dict is keyed by the packed registration numbers,
+                  "lazy" creates the list of slots empty and grows it with the highest parked slot
+                  (see storage.LazySlots), for short runs on lots which stay mostly empty
+         reg_key: None, or registration.pack_registration which gives the reg_slot_dict key of the "packed" storage
+         allocator: None when the empty slots are handed out by avail_slot and slot_heap ("heap" allocator),
+                    allocator.SegmentTreeAllocator for the "segment_tree" allocator, which gives the same slots
+                    and also supports get_emptyslot_from() and range counts of get_free_slot_count()
+         query_cache: None, or query_cache.QueryCache of the formatted age query results (see enable_query_cache())
+         reg_index: None, or reg_index.RegistrationTrie of the parked registration numbers (see enable_reg_index()),
+                    without it the registration prefix and pattern queries scan all the slots
     """
 
     def __init__(self, slots=None, total_slots=None, avail_slot=None, reg_slot_dict=None,
-                 age_slot_dict=None, slot_heap=None):
+                 age_slot_dict=None, slot_heap=None, storage="list", allocator="heap"):
+        if storage not in ("list", "compact", "packed", "lazy"):
+            raise ValueError(f"Unknown parking lot storage {storage}")
+        if allocator not in ("heap", "segment_tree"):
+            raise ValueError(f"Unknown parking lot allocator {allocator}")
+        self.storage = storage
+        self.allocator_name = allocator
         self.slots = slots if slots else list()
         self.total_slots = total_slots
         self.avail_slot = avail_slot
         self.reg_slot_dict = reg_slot_dict if reg_slot_dict else dict()
-        self.age_slot_dict = defaultdict(list, age_slot_dict) if age_slot_dict else defaultdict(list)
+        self.reg_key = None
+        if storage == "packed":
+            from registration import pack_registration
+            self.reg_key = pack_registration
+        if self.reg_key and isinstance(next(iter(self.reg_slot_dict), None), str):
+            self.reg_slot_dict = {pack_registration(reg_num): slot for reg_num, slot in self.reg_slot_dict.items()}
+        self.age_slot_dict = defaultdict(dict, {age: dict.fromkeys(age_slots)
+                                                for age, age_slots in age_slot_dict.items()}) \
+            if age_slot_dict else defaultdict(dict)
         self.slot_heap = slot_heap if slot_heap else list()
         heapify(self.slot_heap)
+        self.age_index = AgeIndex({age: len(age_slots) for age, age_slots in self.age_slot_dict.items()})
+        self.query_cache = None
+        self.reg_index = None
+        self.allocator = None
+        if allocator == "segment_tree" and total_slots:
+            from allocator import SegmentTreeAllocator
+            self.allocator = SegmentTreeAllocator(
+                total_slots, [slot for slot, vehicle_data in enumerate(self.slots) if vehicle_data])
+        self.emit = print
 
     def create_parkinglot(self, command_toks):
         """
@@ -38,21 +87,36 @@ class ParkingLot:
         :param command_toks: Array with the command and value example- ["Create_parking_lot", "6"]
         :return: None
         """
-        if not len(command_toks) == 2 and not re.match(r'\d', command_toks[1]):
-            print('Invalid "Create_parking_lot" Command Format')
+        if not len(command_toks) == 2 and not NUMBER_PATTERN.match(command_toks[1]):
+            self.emit('Invalid "Create_parking_lot" Command Format')
         else:
             try:
                 num_of_slots = int(command_toks[1])
                 if not num_of_slots > 0:
-                    print("Number of Parking slots should be a Positive integer")
+                    self.emit("Number of Parking slots should be a Positive integer")
                     return
                 self.total_slots = int(command_toks[1])
-                self.slots = [None for _ in range(num_of_slots)]
-                print(f"Created parking of {num_of_slots} slots")
+                if self.storage == "compact":
+                    from storage import CompactSlots
+                    self.slots = CompactSlots(num_of_slots)
+                elif self.storage == "packed":
+                    from storage import PackedSlots
+                    self.slots = PackedSlots(num_of_slots)
+                elif self.storage == "lazy":
+                    from storage import LazySlots
+                    self.slots = LazySlots(num_of_slots)
+                else:
+                    self.slots = [None for _ in range(num_of_slots)]
+                if self.allocator_name == "segment_tree":
+                    from allocator import SegmentTreeAllocator
+                    self.allocator = SegmentTreeAllocator(num_of_slots)
+                if self.query_cache is not None:
+                    self.query_cache.clear()
+                self.emit(f"Created parking of {num_of_slots} slots")
                 if num_of_slots > 0:
                     self.avail_slot = 0
             except ValueError:
-                print('Invalid "Create_parking_lot" Command Format')
+                self.emit('Invalid "Create_parking_lot" Command Format')
 
     def get_emptyslot(self):
         """
@@ -63,6 +127,11 @@ class ParkingLot:
              if any slot is available in heap will return slotnum from slot_heap(comes only anyone leaves the parking)
              Min heap is used to always get the minimum slot for the next car to park
         """
+        if self.allocator is not None:
+            slot = self.allocator.allocate()
+            if slot is None:
+                self.emit("Sorry! No Parking spaces available")
+            return slot
         if not self.slot_heap and self.avail_slot < self.total_slots:
             slot = self.avail_slot
             self.avail_slot += 1
@@ -70,27 +139,223 @@ class ParkingLot:
         elif self.slot_heap:
             return heappop(self.slot_heap)
         else:
-            print("Sorry! No Parking spaces available")
+            self.emit("Sorry! No Parking spaces available")
+            return None
+
+    def get_emptyslots(self, count):
+        """
+        Bulk version of get_emptyslot(), allocates the slots of many cars at once
+        :param count: Integer: number of slots needed
+        :return: List: up to count least empty slots in the order get_emptyslot() would return them,
+                fewer slots are returned if the parking lot fills up
+        The slots in the heap are always smaller than avail_slot, so the heap is drained first: one pop per slot
+        for a few slots, or one sort of the heap when most of it is taken. The rest comes from avail_slot.
+        """
+        if self.total_slots is None or count <= 0:
+            return []
+        if self.allocator is not None:
+            return self.allocator.allocate_many(count)
+        heap = self.slot_heap
+        if count < len(heap) // 4:
+            slots = [heappop(heap) for _ in range(count)]
+        else:
+            heap.sort()
+            slots = heap[:count]
+            del heap[:count]
+        remaining = min(count - len(slots), self.total_slots - self.avail_slot)
+        if remaining > 0:
+            slots.extend(range(self.avail_slot, self.avail_slot + remaining))
+            self.avail_slot += remaining
+        return slots
+
+    def release_slot(self, slot):
+        """
+        Makes the empty slot available for the next car
+        """
+        if self.allocator is not None:
+            self.allocator.release(slot)
+        else:
+            heappush(self.slot_heap, slot)
+
+    def release_slots(self, slots):
+        """
+        Bulk version of release_slot(), few slots are pushed to the heap one by one,
+        many slots are merged in the heap with a single heapify
+        """
+        if self.allocator is not None:
+            self.allocator.release_many(slots)
+            return
+        heap = self.slot_heap
+        if len(slots) > len(heap) // 8:
+            heap.extend(slots)
+            heapify(heap)
+        else:
+            for slot in slots:
+                heappush(heap, slot)
+
+    def enable_query_cache(self, max_entries=None):
+        """
+        Caches the formatted results of the age queries, the entries of an age are invalidated when a car
+        of that age parks or leaves
+        :param max_entries: Integer: maximum number of cached results, the least recently used result is evicted,
+                            query_cache.MAX_ENTRIES by default
+        :return: QueryCache object
+        """
+        from query_cache import QueryCache
+        self.query_cache = QueryCache(max_entries) if max_entries else QueryCache()
+        return self.query_cache
+
+    def enable_reg_index(self):
+        """
+        Indexes the registration numbers of the parked cars in a trie for the prefix and pattern queries,
+        the index is maintained by occupy_slot() and remove_vehicle()
+        :return: RegistrationTrie object
+        """
+        from reg_index import RegistrationTrie
+        self.reg_index = RegistrationTrie(self.iter_registrations())
+        return self.reg_index
+
+    def iter_registrations(self):
+        """
+        :return: iterable of (registration number, slot index) of the parked cars, decoded for the "packed" storage
+        """
+        if self.reg_key is None:
+            return self.reg_slot_dict.items()
+        from registration import unpack_registration
+        return ((unpack_registration(reg_key), slot) for reg_key, slot in self.reg_slot_dict.items())
+
+    def get_slot_by_reg(self, reg_num):
+        """
+        :param reg_num: String: registration number of the vehicle
+        :return: Integer: index of the slot of the vehicle, None if the vehicle is not parked
+        """
+        return self.reg_slot_dict.get(reg_num if self.reg_key is None else self.reg_key(reg_num))
+
+    def get_emptyslot_from(self, slot):
+        """
+        Per level / per zone allocation, needs the "segment_tree" allocator
+        :param slot: Integer: index of the slot from which the search starts, example- first slot of a level
+        :return: Integer: first empty slot at or after the given slot, None if there is no such slot
+        """
+        if self.allocator_name != "segment_tree":
+            raise ValueError('get_emptyslot_from() needs the "segment_tree" allocator')
+        if self.allocator is None:
             return None
+        return self.allocator.allocate_from(slot)
+
+    def get_free_slot_count(self, start=None, end=None):
+        """
+        :param start: Integer: first slot index of the range, the range needs the "segment_tree" allocator
+        :param end: Integer: slot index after the last slot of the range
+        :return: Integer: number of empty slots in the parking lot or in the range of slots
+        """
+        if self.total_slots is None:
+            return 0
+        if self.allocator is not None:
+            return self.allocator.free_count(start or 0, end)
+        if start is not None or end is not None:
+            raise ValueError('Free slot count of a range needs the "segment_tree" allocator')
+        return self.total_slots - self.avail_slot + len(self.slot_heap)
+
+    def occupy_slot(self, slot, reg_num, age):
+        """
+        Parks the car in the slot and maintains the redundant data for ease of querying
+        :param slot: Integer: index of the empty slot returned by get_emptyslot()
+        :param reg_num: String: registration number of the vehicle
+        :param age: Integer: age of the driver
+        :return: None
+        """
+        if self.reg_key is None:
+            self.slots[slot] = {"reg_num": reg_num, "age": age}
+            self.reg_slot_dict[reg_num] = slot
+        else:
+            reg_key = self.reg_key(reg_num)
+            self.slots.set_packed(slot, reg_key, age)
+            self.reg_slot_dict[reg_key] = slot
+        self.age_slot_dict[age][slot + 1] = None
+        self.age_index.add(age)
+        if self.query_cache is not None:
+            self.query_cache.invalidate_age(age)
+        if self.reg_index is not None:
+            self.reg_index.add(reg_num, slot)
+
+    def remove_vehicle(self, slot):
+        """
+        Removes the car parked in the slot and its redundant data, the slot is not released
+        :param slot: Integer: index of the slot
+        :return: Dict: vehicle data of the car which left example- {"reg_num": "KA-01-HH-1234", "age": 21}
+                None if the slot is already vacant
+        """
+        vehicle_data = self.slots[slot]
+        if vehicle_data:
+            reg_key = vehicle_data['reg_num'] if self.reg_key is None else self.slots.reg_keys[slot]
+            self.reg_slot_dict.pop(reg_key, None)
+            self.slots[slot] = None
+            self.age_slot_dict[vehicle_data['age']].pop(slot + 1, None)
+            self.age_index.remove(vehicle_data['age'])
+            if self.query_cache is not None:
+                self.query_cache.invalidate_age(vehicle_data['age'])
+            if self.reg_index is not None:
+                self.reg_index.remove(vehicle_data['reg_num'])
+        return vehicle_data
+
+    def vacate_slot(self, slot):
+        """
+        Removes the car parked in the slot and its redundant data, the slot becomes available for the next car
+        :param slot: Integer: index of the slot
+        :return: Dict: vehicle data of the car which left, None if the slot is already vacant
+        """
+        vehicle_data = self.remove_vehicle(slot)
+        if vehicle_data:
+            self.release_slot(slot)
+        return vehicle_data
 
 
 class ParkingProcessor:
     """
     ParkingProcessor is factory which process the commands on the Parkinglot
+       Usage:
+         sessions: sessions.SessionStore of the parking sessions of the cars parked and left with a timestamp,
+                   None till the first car is parked with a timestamp (see get_sessions())
     """
 
     def __init__(self, parkinglot_obj):
         self.parkinglot_obj = parkinglot_obj
+        self.sessions = None
+        self.emit = print
+
+    def get_sessions(self):
+        """
+        :return: SessionStore object, created on first use
+        """
+        if self.sessions is None:
+            from sessions import SessionStore
+            self.sessions = SessionStore()
+        return self.sessions
+
+    @staticmethod
+    def split_timestamp(command_toks, num_toks):
+        """
+        Splits the optional "at <timestamp>" suffix of a command, example- "Leave 2 at 1700003600"
+        :param command_toks: Array with the command and value
+        :param num_toks: Integer: number of tokens of the command without the suffix
+        :return: Tuple: (command tokens without the suffix, Integer timestamp in seconds or None)
+        """
+        if (len(command_toks) == num_toks + 2 and command_toks[num_toks] == "at"
+                and NUMBER_PATTERN.fullmatch(command_toks[num_toks + 1])):
+            return command_toks[:num_toks], int(command_toks[num_toks + 1])
+        return command_toks, None
 
     def park_vehicle(self, command_toks):
         """
-        Command-  "Park KA-01-HH-1234 driver_age 21"
+        Command-  "Park KA-01-HH-1234 driver_age 21" or "Park KA-01-HH-1234 driver_age 21 at 1700000000"
         :param command_toks: Array with the command and value example- ["Park", "KA-01-HH-1234", "driver_age", "21"]
         :return: None
         """
-        reg_num = re.match(r'[A-Z]{2}-\d{2}-[A-Z]{2}-\d{4}', command_toks[1])
+        command_toks, timestamp = self.split_timestamp(command_toks, 4)
+        reg_num = REG_NUM_PATTERN.match(command_toks[1])
         reg_num = reg_num.group() if reg_num else None
-        age = re.match(r'\d+', command_toks[3])
+        age = NUMBER_PATTERN.match(command_toks[3])
         age = age.group() if age else None
         if len(command_toks) == 4 and not reg_num is None and command_toks[2] == "driver_age" and not age is None:
             reg_num = reg_num
@@ -99,41 +364,117 @@ class ParkingProcessor:
             if slot is None:
                 return
             # print("available slot: ", slot)
-            """Parking the Car in that slot """
-            self.parkinglot_obj.slots[slot] = {
-                "reg_num": reg_num, "age": age}
-            """Maintaing redundant data for ease of queriring"""
-            self.parkinglot_obj.reg_slot_dict[reg_num] = slot
-            self.parkinglot_obj.age_slot_dict[age].append(slot + 1)
-            print(f"Car with vehicle registration number {reg_num} has been parked at slot number {slot + 1}")
+            self.parkinglot_obj.occupy_slot(slot, reg_num, age)
+            if timestamp is not None:
+                self.get_sessions().open(slot, age, timestamp)
+            self.emit(f"Car with vehicle registration number {reg_num} has been parked at slot number {slot + 1}")
         else:
-            print('Invalid "Park" vehicle Command Format')
+            self.emit('Invalid "Park" vehicle Command Format')
 
     def exit_vehicle(self, command_toks):
         """
-        Command-  "Leave 2"
+        Command-  "Leave 2" or "Leave 2 at 1700003600", with a timestamp the ticket of the parking session is printed
         :param command_toks: Array with the command and value example- ["Leave","2"]
         :return: None
         """
-        slot = re.match(r'\d+', command_toks[1])
+        command_toks, timestamp = self.split_timestamp(command_toks, 2)
+        slot = NUMBER_PATTERN.match(command_toks[1])
         slot = slot.group() if slot else None
         if len(command_toks) == 2 and slot:
-            vehicle_data = self.parkinglot_obj.slots[int(slot) - 1]
-            if vehicle_data:
-                try:
-                    self.parkinglot_obj.slots[int(slot) - 1] = None
-                    if vehicle_data['reg_num'] in self.parkinglot_obj.reg_slot_dict:
-                        del self.parkinglot_obj.reg_slot_dict[vehicle_data['reg_num']]
-                    self.parkinglot_obj.age_slot_dict[vehicle_data['age']].remove(int(slot))
-                    heappush(self.parkinglot_obj.slot_heap, int(slot) - 1)
-                except ValueError:
-                    pass
-                print(
-                    f"Slot number {slot} vacated, the car with vehicle registration number {vehicle_data['reg_num']} left the space, the driver of the car was of age {vehicle_data['age']}")
-            else:
-                print(f"Slot Already vacant")
+            self.leave_slot(slot, timestamp, self.parkinglot_obj.vacate_slot)
+        else:
+            self.emit('Invalid "Leave" Command Format')
+
+    def leave_slot(self, slot, timestamp, remove_vehicle):
+        """
+        Takes the car out of the slot for "Leave" and "Leave_many" and ends its parking session,
+        with a timestamp the session is closed and its ticket is printed
+        :param slot: String: slot number example- "2"
+        :param timestamp: Integer: leave time in seconds, None for a command without a timestamp
+        :param remove_vehicle: ParkingLot.vacate_slot, or ParkingLot.remove_vehicle when the slots are released in bulk
+        :return: Dict: vehicle data of the car which left, None if no car left the slot
+        """
+        sessions = self.sessions
+        if timestamp is not None and sessions is not None:
+            session = sessions.open_sessions.get(int(slot) - 1)
+            if session and timestamp < session[1]:
+                self.emit("Leave time should not be before the park time")
+                return None
+        vehicle_data = remove_vehicle(int(slot) - 1)
+        if vehicle_data:
+            self.emit(
+                f"Slot number {slot} vacated, the car with vehicle registration number {vehicle_data['reg_num']} left the space, the driver of the car was of age {vehicle_data['age']}")
+            if sessions is not None and timestamp is None:
+                sessions.discard(int(slot) - 1)
+            elif sessions is not None:
+                dwell = sessions.close(int(slot) - 1, timestamp)
+                if dwell is not None:
+                    self.emit(f"Ticket: parked for {dwell} seconds, parking fee {sessions.fee(dwell)}")
         else:
-            print('Invalid "Leave" Command Format')
+            self.emit(f"Slot Already vacant")
+        return vehicle_data
+
+    def park_many(self, command_toks):
+        """
+        Command-  "Park_many KA-01-HH-1234 driver_age 21 PB-01-HH-1234 driver_age 40"
+        Parks all the cars with a single allocation of their slots. The slots and the output are the same as
+        one "Park" command per car.
+        :param command_toks: Array with the command and "reg_num driver_age age" of each car
+        :return: None
+        """
+        vehicle_toks = command_toks[1:]
+        if not vehicle_toks or len(vehicle_toks) % 3:
+            self.emit('Invalid "Park_many" Command Format')
+            return
+        vehicles = []
+        for index in range(0, len(vehicle_toks), 3):
+            reg_num = REG_NUM_PATTERN.match(vehicle_toks[index])
+            age = NUMBER_PATTERN.match(vehicle_toks[index + 2])
+            if reg_num and vehicle_toks[index + 1] == "driver_age" and age:
+                vehicles.append((reg_num.group(), int(age.group())))
+            else:
+                vehicles.append(None)
+        slots = iter(self.parkinglot_obj.get_emptyslots(len(vehicles) - vehicles.count(None)))
+        for vehicle in vehicles:
+            if vehicle is None:
+                self.emit('Invalid "Park" vehicle Command Format')
+                continue
+            slot = next(slots, None)
+            if slot is None:
+                self.parkinglot_obj.emit("Sorry! No Parking spaces available")
+                continue
+            self.parkinglot_obj.occupy_slot(slot, *vehicle)
+            self.emit(f"Car with vehicle registration number {vehicle[0]} has been parked at slot number {slot + 1}")
+
+    def leave_many(self, command_toks):
+        """
+        Command-  "Leave_many 2 5 7" or "Leave_many 2 5 7 at 1700003600"
+        Removes all the cars and releases their slots to the heap at once. The output and the parking sessions are
+        the same as one "Leave" command per slot, a slot number outside the parking lot is answered with an error line.
+        :param command_toks: Array with the command and the slot numbers example- ["Leave_many", "2", "5", "7"]
+        :return: None
+        """
+        command_toks, timestamp = self.split_timestamp(command_toks, len(command_toks) - 2)
+        if len(command_toks) < 2:
+            self.emit('Invalid "Leave_many" Command Format')
+            return
+        released = []
+        num_slots = len(self.parkinglot_obj.slots)
+        try:
+            for slot_tok in command_toks[1:]:
+                slot = NUMBER_PATTERN.match(slot_tok)
+                if not slot:
+                    self.emit('Invalid "Leave" Command Format')
+                    continue
+                slot = slot.group()
+                if not 0 < int(slot) <= num_slots:
+                    self.emit(f"Invalid slot number {slot}")
+                    continue
+                if self.leave_slot(slot, timestamp, self.parkinglot_obj.remove_vehicle):
+                    released.append(int(slot) - 1)
+        finally:
+            # the removed cars are gone even if a later slot fails, their slots are never lost
+            self.parkinglot_obj.release_slots(released)
 
     def get_slots_by_age(self, command_toks):
         """
@@ -142,19 +483,21 @@ class ParkingProcessor:
         :return: String: Returns the comma separated string with all the slots for the given age
                 None if no slots are present for the given age
         """
-        age = re.match(r'\d+', command_toks[1])
+        age = NUMBER_PATTERN.match(command_toks[1])
         age = age.group() if age else None
         if len(command_toks) == 2 and age:
-            result = self.parkinglot_obj.age_slot_dict[int(age)]
-            if not result is None:
-                print(",".join(str(i) for i in result))
-                return ",".join(str(i) for i in result)
-            else:
-                print("No parked car matches the query")
+            return self.answer_query("Slot_numbers_for_driver_of_age", int(age), self.format_slots_by_age)
         else:
-            print('Invalid "Slot_numbers_for_driver_of_age" Command Format')
+            self.emit('Invalid "Slot_numbers_for_driver_of_age" Command Format')
         return None
 
+    def format_slots_by_age(self, age):
+        """
+        :return: Tuple: (output line, return value) of "Slot_numbers_for_driver_of_age"
+        """
+        result = ",".join(map(str, self.parkinglot_obj.age_slot_dict.get(age, ())))
+        return result, result
+
     def get_slot_by_num(self, command_toks):
         """
         Command: "Slot_number_for_car_with_number PB-01-HH-1234"
@@ -163,17 +506,17 @@ class ParkingProcessor:
                 None if no slots are present for the given registration number of vehicle
         """
 
-        reg_num = re.match(r'[A-Z]{2}-\d{2}-[A-Z]{2}-\d{4}', command_toks[1])
+        reg_num = REG_NUM_PATTERN.match(command_toks[1])
         reg_num = reg_num.group() if reg_num else None
         if len(command_toks) == 2 and reg_num:
-            result = self.parkinglot_obj.reg_slot_dict.get(reg_num, None)
+            result = self.parkinglot_obj.get_slot_by_reg(reg_num)
             if not result is None:
-                print(result + 1)  # adding +1  we are storing indexes in reg_slot_dict
+                self.emit(result + 1)  # adding +1  we are storing indexes in reg_slot_dict
                 return result + 1
             else:
-                print("No parked car matches the query")
+                self.emit("No parked car matches the query")
         else:
-            print('Invalid "Slot_number_for_car_with_number"  Command Format')
+            self.emit('Invalid "Slot_number_for_car_with_number"  Command Format')
 
     def get_vehiclenums_by_age(self, command_toks):
         """
@@ -185,82 +528,365 @@ class ParkingProcessor:
         """
         # validating command and executing it
         """ Command: Vehicle_registration_number_for_driver_of_age 18 """
-        age = re.match(r'\d+', command_toks[1]).group()
+        age = NUMBER_PATTERN.match(command_toks[1]).group()
         if len(command_toks) == 2 and age:
-            slots = self.parkinglot_obj.age_slot_dict[int(age)]
-            if slots:
-                reg_nums = [self.parkinglot_obj.slots[slot - 1].get('reg_num') for slot in slots]
-                print(",".join(reg_nums))
-                return ",".join(reg_nums)
+            return self.answer_query("Vehicle_registration_number_for_driver_of_age", int(age),
+                                     self.format_vehiclenums_by_age)
+        else:
+            self.emit('Invalid "Vehicle_registration_number_for_driver_of_age" vehicle Command Format')
+
+    def format_vehiclenums_by_age(self, age):
+        """
+        :return: Tuple: (output line, return value) of "Vehicle_registration_number_for_driver_of_age"
+        """
+        slots = self.parkinglot_obj.age_slot_dict.get(age, ())
+        if not slots:
+            return "No parked car matches the query", None
+        parked = self.parkinglot_obj.slots
+        result = ",".join([parked[slot - 1]['reg_num'] for slot in slots])
+        return result, result
+
+    def answer_query(self, name, age, format_result):
+        """
+        Emits the result of an age query, from the query cache of the parking lot when it is enabled
+        :param name: String: command name of the query
+        :param age: Integer: queried age
+        :param format_result: function which returns the (output line, return value) of the query for the age
+        :return: return value of the query
+        """
+        query_cache = self.parkinglot_obj.query_cache
+        if query_cache is None:
+            line, value = format_result(age)
+        else:
+            key = (name, age)
+            result = query_cache.get(key)
+            if result is None:
+                line, value = format_result(age)
+                query_cache.put(key, line, value)
             else:
-                print("No parked car matches the query")
+                line, value = result
+        self.emit(line)
+        return value
+
+    def get_slots_by_reg_prefix(self, command_toks):
+        """
+        Command: "Slot_numbers_for_registration_prefix KA-01" - all the cars of a state, district or partial plate
+        :param command_toks: Array with the command and value example- ["Slot_numbers_for_registration_prefix", "KA"]
+        :return: String: Returns the comma separated string of the matching slots in increasing order
+                None if no parked car matches the prefix
+        """
+        from reg_index import REG_PREFIX_PATTERN
+        if not len(command_toks) == 2 or not REG_PREFIX_PATTERN.fullmatch(command_toks[1]):
+            self.emit('Invalid "Slot_numbers_for_registration_prefix" Command Format')
+            return None
+        prefix = command_toks[1]
+        if self.parkinglot_obj.reg_index is not None:
+            slots = self.parkinglot_obj.reg_index.prefix_slots(prefix)
+        else:
+            slots = [slot for reg_num, slot in self.parkinglot_obj.iter_registrations() if reg_num.startswith(prefix)]
+        return self.emit_slots(slots)
+
+    def get_slots_by_reg_pattern(self, command_toks):
+        """
+        Command: "Slot_numbers_for_registration_pattern KA-*-HH-12??" - "?" matches one character and "*" any
+        characters of a segment
+        :param command_toks: Array with the command and value example- ["Slot_numbers_for_registration_pattern", "*-01-HH-*"]
+        :return: String: Returns the comma separated string of the matching slots in increasing order
+                None if no parked car matches the pattern
+        """
+        from reg_index import REG_GLOB_PATTERN, glob_to_regex
+        if not len(command_toks) == 2 or not REG_GLOB_PATTERN.fullmatch(command_toks[1]):
+            self.emit('Invalid "Slot_numbers_for_registration_pattern" Command Format')
+            return None
+        if self.parkinglot_obj.reg_index is not None:
+            slots = self.parkinglot_obj.reg_index.pattern_slots(command_toks[1])
+        else:
+            match = glob_to_regex(command_toks[1]).fullmatch
+            slots = [slot for reg_num, slot in self.parkinglot_obj.iter_registrations() if match(reg_num)]
+        return self.emit_slots(slots)
+
+    def emit_slots(self, slots):
+        if not slots:
+            self.emit("No parked car matches the query")
+            return None
+        slots.sort()
+        result = ",".join([str(slot + 1) for slot in slots])
+        self.emit(result)
+        return result
+
+    def parse_age_range(self, command_toks):
+        """
+        :param command_toks: Array with the command and the age range example- ["Count_of_drivers_of_age_between", "18", "25"]
+        :return: Tuple: (min_age, max_age) None if the command format is invalid
+        """
+        if len(command_toks) == 3:
+            min_age, max_age = NUMBER_PATTERN.match(command_toks[1]), NUMBER_PATTERN.match(command_toks[2])
+            if min_age and max_age:
+                return int(min_age.group()), int(max_age.group())
+        self.emit(f'Invalid "{command_toks[0]}" Command Format')
+        return None
+
+    def get_slots_by_age_range(self, command_toks):
+        """
+        Command: "Slot_numbers_for_driver_of_age_between 18 25"
+        :param command_toks: Array with the command and values example- ["Slot_numbers_for_driver_of_age_between", "18", "25"]
+        :return: String: Returns the comma separated string with all the slots of the drivers in the age range,
+                ordered by age and then by parking order
+                None if no slots are present for the given age range
+        """
+        age_range = self.parse_age_range(command_toks)
+        if age_range is None:
+            return None
+        age_slot_dict = self.parkinglot_obj.age_slot_dict
+        result = ",".join(str(slot) for age in self.parkinglot_obj.age_index.ages_between(*age_range)
+                          for slot in age_slot_dict.get(age, ()))
+        if result:
+            self.emit(result)
+            return result
+        self.emit("No parked car matches the query")
+        return None
+
+    def get_count_by_age_range(self, command_toks):
+        """
+        Command: "Count_of_drivers_of_age_between 18 25"
+        :param command_toks: Array with the command and values example- ["Count_of_drivers_of_age_between", "18", "25"]
+        :return: Integer: Returns the number of parked cars with the driver in the age range
+        """
+        age_range = self.parse_age_range(command_toks)
+        if age_range is None:
+            return None
+        result = self.parkinglot_obj.age_index.count_between(*age_range)
+        self.emit(result)
+        return result
+
+    def get_count_per_age(self, command_toks):
+        """
+        Command: "Count_of_drivers_per_age"
+        :param command_toks: Array with the command example- ["Count_of_drivers_per_age"]
+        :return: String: Returns the comma separated "age:count" of all the parked drivers ordered by age
+                None if no cars are parked
+        """
+        if not len(command_toks) == 1:
+            self.emit('Invalid "Count_of_drivers_per_age" Command Format')
+            return None
+        age_index = self.parkinglot_obj.age_index
+        result = ",".join(f"{age}:{age_index.counts[age]}" for age in age_index.ages)
+        if result:
+            self.emit(result)
+            return result
+        self.emit("No parked car matches the query")
+        return None
+
+    def get_youngest_age(self, command_toks):
+        """
+        Command: "Youngest_driver_age"
+        :param command_toks: Array with the command example- ["Youngest_driver_age"]
+        :return: Integer: Returns the age of the youngest parked driver, None if no cars are parked
+        """
+        return self.emit_age(command_toks, self.parkinglot_obj.age_index.youngest())
+
+    def get_oldest_age(self, command_toks):
+        """
+        Command: "Oldest_driver_age"
+        :param command_toks: Array with the command example- ["Oldest_driver_age"]
+        :return: Integer: Returns the age of the oldest parked driver, None if no cars are parked
+        """
+        return self.emit_age(command_toks, self.parkinglot_obj.age_index.oldest())
+
+    def get_billing_report(self, command_toks):
+        """
+        Command: "Billing_report" or "Billing_report 1700000000 1702592000" for the sessions which left in the range
+        Prints the revenue of the parking sessions per slot and per driver age and the dwell time percentiles
+        :param command_toks: Array with the command and the optional range example- ["Billing_report"]
+        :return: Integer: total revenue of the reported sessions, None for an invalid command
+        """
+        if len(command_toks) not in (1, 3) or not all(NUMBER_PATTERN.fullmatch(tok) for tok in command_toks[1:]):
+            self.emit('Invalid "Billing_report" Command Format')
+            return None
+        start, end = (int(command_toks[1]), int(command_toks[2])) if len(command_toks) == 3 else (None, None)
+        total, num_sessions, per_slot, per_age, percentiles = self.get_sessions().report(start, end)
+        if not num_sessions:
+            self.emit("No completed parking sessions")
+            return total
+        self.emit(f"Total revenue {total} from {num_sessions} sessions")
+        for slot, (revenue, count) in per_slot.items():
+            self.emit(f"Slot number {slot + 1}: revenue {revenue} from {count} sessions")
+        for age, (revenue, count) in per_age.items():
+            self.emit(f"Driver age {age}: revenue {revenue} from {count} sessions")
+        self.emit("Dwell time " + " ".join(f"p{percentile} {dwell}s" for percentile, dwell in percentiles.items()))
+        return total
+
+    def emit_age(self, command_toks, age):
+        if not len(command_toks) == 1:
+            self.emit(f'Invalid "{command_toks[0]}" Command Format')
+            return None
+        if age is None:
+            self.emit("No parked car matches the query")
         else:
-            print('Invalid "Vehicle_registration_number_for_driver_of_age" vehicle Command Format')
+            self.emit(age)
+        return age
 
 
 class CommandProcessor:
     """
     CommandProcessor process all the commands in the file and routes each command based on its type.
-
+       Usage:
+         commands: dispatch table of command name mapped to the function which executes the command,
+                   new commands are added with register_command()
+         mutating_commands: names of the commands which change the state of the parking lot
+         journal: optional persistence.Journal, the write ahead log, every mutating command is appended to it
+                  before it is executed and removed again if the command raises an error (see persistence.recover())
     """
 
     def __init__(self, file_obj, process_parking_obj):
         self.file_obj = file_obj
         self.process_parking_obj = process_parking_obj
+        self.emit = print
+        self.commands = {
+            'Create_parking_lot': process_parking_obj.parkinglot_obj.create_parkinglot,
+            'Park': process_parking_obj.park_vehicle,
+            'Leave': process_parking_obj.exit_vehicle,
+            'Park_many': process_parking_obj.park_many,
+            'Leave_many': process_parking_obj.leave_many,
+            'Slot_numbers_for_driver_of_age': process_parking_obj.get_slots_by_age,
+            'Slot_number_for_car_with_number': process_parking_obj.get_slot_by_num,
+            'Vehicle_registration_number_for_driver_of_age': process_parking_obj.get_vehiclenums_by_age,
+            'Slot_numbers_for_driver_of_age_between': process_parking_obj.get_slots_by_age_range,
+            'Count_of_drivers_of_age_between': process_parking_obj.get_count_by_age_range,
+            'Count_of_drivers_per_age': process_parking_obj.get_count_per_age,
+            'Youngest_driver_age': process_parking_obj.get_youngest_age,
+            'Oldest_driver_age': process_parking_obj.get_oldest_age,
+            'Slot_numbers_for_registration_prefix': process_parking_obj.get_slots_by_reg_prefix,
+            'Slot_numbers_for_registration_pattern': process_parking_obj.get_slots_by_reg_pattern,
+            'Billing_report': process_parking_obj.get_billing_report,
+        }
+        self.mutating_commands = {'Create_parking_lot', 'Park', 'Leave', 'Park_many', 'Leave_many'}
+        self.journal = None
+
+    def register_command(self, name, handler, mutating=False):
+        """
+        Adds a new command to the dispatch table, an existing command with the same name is replaced
+        :param name: String - first token of the command example- "Park"
+        :param handler: function called with the command tokens example- ["Park", "KA-01-HH-1234", "driver_age", "21"]
+        :param mutating: True if the command changes the state of the parking lot, such commands are journaled
+        :return: None
+        """
+        self.commands[name] = handler
+        if mutating:
+            self.mutating_commands.add(name)
+        else:
+            self.mutating_commands.discard(name)
+
+    def set_emit(self, emit):
+        """
+        Routes the output of all the commands to the given function
+        :param emit: function called with every output line, example- print or OutputBuffer.write_line
+        :return: None
+        """
+        self.emit = emit
+        self.process_parking_obj.emit = emit
+        self.process_parking_obj.parkinglot_obj.emit = emit
 
     def execute_commands(self):
         """
-        Will execute all the commands which are present in the input file
+        Will execute all the commands which are present in the input file,
+        the commands are streamed from the file one line at a time
         :return: None
         """
-        if not self.file_obj and self.file_obj.file:
-            print("Input File not found to process")
+        if not self.file_obj or not self.file_obj.file:
+            self.emit("Input File not found to process")
             return
         line_num = 0
-        for line in self.file_obj.file:
+        for cmd_tokens in self.file_obj.iter_commands():
             line_num += 1
-            command = line.strip(" \n ")
-            cmd_tokens = command.split()
             if line_num == 0 and cmd_tokens[0] != "Create_parking_lot":
-                print("Command to create parking lot is missing in input file")
+                self.emit("Command to create parking lot is missing in input file")
                 break
             self.process_command(cmd_tokens)
 
+    def execute_commands_batch(self, stream=None, chunk_lines=OutputBuffer.CHUNK_LINES):
+        """
+        Batch mode of execute_commands(). The output of the commands is collected and written to
+        the stream in chunks of chunk_lines lines instead of one print() per command.
+        The output is byte identical to execute_commands().
+        :param stream: writable text or binary stream, sys.stdout.buffer by default
+        :param chunk_lines: number of output lines written to the stream at once
+        :return: None
+        """
+        output = OutputBuffer(stream if stream is not None else sys.stdout.buffer, chunk_lines)
+        self.set_emit(output.write_line)
+        try:
+            self.execute_commands()
+        finally:
+            output.flush()
+            self.set_emit(print)
+
     def process_command(self, command_toks):
         """
-        Router for the commands in the input file. This function process the command and
-        calls the relevant function to execute the command.
+        Router for the commands in the input file. This function looks up the command in the
+        dispatch table and calls the relevant function to execute the command.
         :param command_toks: array - each Command from the Input file
         :return: None
         """
         if not command_toks or not len(command_toks) > 0:
-            print("Cannot process the command. Invalid Command Format")
+            self.emit("Cannot process the command. Invalid Command Format")
             return
-        if command_toks[0] == 'Create_parking_lot':
-            self.process_parking_obj.parkinglot_obj.create_parkinglot(command_toks)
-        elif command_toks[0] == 'Park':
-            self.process_parking_obj.park_vehicle(command_toks)
-        elif command_toks[0] == 'Leave':
-            self.process_parking_obj.exit_vehicle(command_toks)
-        elif command_toks[0] == 'Slot_numbers_for_driver_of_age':
-            self.process_parking_obj.get_slots_by_age(command_toks)
-        elif command_toks[0] == 'Slot_number_for_car_with_number':
-            self.process_parking_obj.get_slot_by_num(command_toks)
-        elif command_toks[0] == 'Vehicle_registration_number_for_driver_of_age':
-            self.process_parking_obj.get_vehiclenums_by_age(command_toks)
+        handler = self.commands.get(command_toks[0])
+        if handler is None:
+            self.emit("Command Not matched with valid commands set")
         else:
-            print("Command Not matched with valid commands set")
+            if self.journal is not None and command_toks[0] in self.mutating_commands:
+                self.journal.append(command_toks)
+                try:
+                    handler(command_toks)
+                except Exception:
+                    # the failed command is taken out of the log, it would fail again on every recovery
+                    self.journal.discard_last()
+                    raise
+            else:
+                handler(command_toks)
 
 
 if __name__ == '__main__':
     filename = None
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    if args:
+        filename = args[0]
     if not filename:
         filename = input("Enter the input file path:\n")
-    plot = ParkingLot()
     file_obj = FileUtility()
     file_obj.load_file(filename)
-    process_prk_obj = ParkingProcessor(plot)
-    command_obj = CommandProcessor(file_obj, process_prk_obj)
-    command_obj.execute_commands()
+    if "multi-lot" in options:
+        from sharding import MultiLotEngine
+        engine = MultiLotEngine(int(options["workers"]) if options.get("workers") else None,
+                                storage=options.get("storage", "list"))
+        output = OutputBuffer(sys.stdout.buffer)
+        if "batch" in options:
+            engine.emit = output.write_line
+        engine.execute_commands(file_obj)
+        output.flush()
+    else:
+        plot = ParkingLot(storage=options.get("storage", "list"), allocator=options.get("allocator", "heap"))
+        if "reg-index" in options:
+            plot.enable_reg_index()
+        if "query-cache" in options:
+            plot.enable_query_cache(int(options["query-cache"] or 0))
+        process_prk_obj = ParkingProcessor(plot)
+        command_obj = CommandProcessor(file_obj, process_prk_obj)
+        if options.get("wal"):
+            from persistence import recover
+            recover(command_obj, options["wal"], options.get("fsync", "batch"))
+        instrumentation = None
+        if "stats-interval" in options or "prometheus" in options:
+            from instrumentation import Instrumentation
+            instrumentation = Instrumentation(int(options.get("stats-interval") or 0))
+            instrumentation.attach(command_obj)
+        if "batch" in options:
+            command_obj.execute_commands_batch()
+        else:
+            command_obj.execute_commands()
+        if instrumentation is not None and options.get("prometheus"):
+            instrumentation.write_prometheus(options["prometheus"])
+        if command_obj.journal is not None:
+            command_obj.journal.close()